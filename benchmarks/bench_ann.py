@@ -0,0 +1,78 @@
+"""
+Recall and latency of the IVF approximate index against the exact float32 matrix
+scan, for a few nprobe values, at the procurement index's dimension.
+
+Products are unit vectors drawn around --clusters random centres (embeddings of
+a catalog cluster by category), or uniformly with --clusters 0, which is the
+worst case for an inverted file; queries are drawn the same way. Recall is the
+share of the exact top --limit found by the index, averaged over the queries.
+
+    uv run python -m benchmarks.bench_ann --rows 100000 1000000
+    uv run python -m benchmarks.bench_ann --rows 1000000 --nlist 1024 --nprobe 4 16 64
+    uv run python -m benchmarks.bench_ann --rows 100000 --clusters 0
+"""
+import argparse
+import time
+
+import numpy as np
+
+from superlinked_app.ann import IVFIndex, IVFParams
+from superlinked_app.scoring import VectorMatrix
+
+# all-MiniLM-L12-v2 plus six NumberSpaces of 3 dimensions each
+DIMENSION = 384 + 6 * 3
+
+
+def sample(rng: np.random.Generator, centres: np.ndarray | None, rows: int) -> np.ndarray:
+    if centres is None:
+        vectors = rng.standard_normal((rows, DIMENSION))
+    else:
+        vectors = centres[rng.integers(len(centres), size=rows)] + 0.05 * rng.standard_normal((rows, DIMENSION))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def time_queries(matrix: VectorMatrix, queries: np.ndarray, limit: int, index: IVFIndex | None = None, nprobe=None):
+    results = []
+    start = time.perf_counter()
+    for query in queries:
+        candidates = index.probe(query, nprobe) if index is not None else None
+        results.append({row_id for row_id, _ in matrix.top_k(query, limit, candidates)})
+    return (time.perf_counter() - start) / len(queries), results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--clusters", type=int, default=200, help="centres the vectors are drawn around; 0 for uniform")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    centres = rng.standard_normal((args.clusters, DIMENSION)) if args.clusters else None
+    print(f"{'products':<10}{'lists':>7}{'train s':>9}{'nprobe':>8}{'recall':>8}{'ann ms':>9}{'exact ms':>10}{'speedup':>9}")
+    for rows in args.rows:
+        matrix = VectorMatrix(DIMENSION)
+        matrix.upsert([f"product:{row}" for row in range(rows)], sample(rng, centres, rows))
+        queries = sample(rng, centres, args.queries)
+        index = IVFIndex(matrix, IVFParams(nlist=args.nlist, min_rows=0, seed=args.seed))
+        start = time.perf_counter()
+        index.train()
+        training = time.perf_counter() - start
+
+        exact_seconds, exact_results = time_queries(matrix, queries, args.limit)
+        for nprobe in args.nprobe:
+            ann_seconds, ann_results = time_queries(matrix, queries, args.limit, index, nprobe)
+            recall = np.mean([len(found & exact) / len(exact) for found, exact in zip(ann_results, exact_results)])
+            print(
+                f"{rows:<10}{index.lists:>7}{training:>9.1f}{nprobe:>8}{recall:>8.3f}"
+                f"{ann_seconds * 1000:>9.2f}{exact_seconds * 1000:>10.2f}{exact_seconds / ann_seconds:>8.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
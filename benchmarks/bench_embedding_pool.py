@@ -0,0 +1,53 @@
+"""
+Product name embedding throughput with 1, 2 and 4 worker processes.
+
+Worker start-up (spawning and loading the model) is excluded from the timings;
+every pool embeds the same names and the vectors are checked against the
+single-worker run.
+
+    uv run python -m benchmarks.bench_embedding_pool --rows 5000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from superlinked_app.configs import settings
+from superlinked_app.embedding_pool import EmbeddingPool
+
+
+def run_pool(names: list[str], workers: int, batch_size: int) -> tuple[float, np.ndarray]:
+    pool = EmbeddingPool(settings.text_embedder_name, workers, batch_size)
+    try:
+        pool.embed(names[:1])  # start workers and load the model
+        start = time.perf_counter()
+        vectors = pool.embed(names)
+        return time.perf_counter() - start, vectors
+    finally:
+        pool.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default=settings.data_path)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=settings.embedding_worker_batch)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    names = pd.read_csv(args.path, nrows=args.rows, usecols=["name"])["name"].fillna("").astype(str).tolist()
+
+    print(f"{'workers':<10}{'seconds':>10}{'names/sec':>12}{'speedup':>10}")
+    baseline_seconds, baseline_vectors = None, None
+    for workers in args.workers:
+        seconds, vectors = run_pool(names, workers, args.batch_size)
+        if baseline_vectors is None:
+            baseline_seconds, baseline_vectors = seconds, vectors
+        elif not np.allclose(vectors, baseline_vectors, atol=1e-5):
+            raise SystemExit(f"{workers} workers produced different vectors than {args.workers[0]}")
+        print(f"{workers:<10}{seconds:>10.2f}{len(names) / seconds:>12.1f}{baseline_seconds / seconds:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Compare the chunked data loader (`chunk_size` rows per put) with batched ingestion.
+
+Each run loads the catalog into a fresh in-memory executor, so both paths pay for
+parsing, embedding and upserting every row.
+
+    uv run python -m benchmarks.bench_ingestion --rows 5000
+"""
+import argparse
+import time
+
+import pandas as pd
+from superlinked import framework as sl
+
+from superlinked_app.configs import settings
+from superlinked_app.index import procurement_index
+from superlinked_app.ingestion import SCHEMA_COLUMNS, ingest_frames, iter_csv_batches
+from superlinked_app.schema import product_schema
+
+
+def _fresh_source() -> sl.InMemorySource:
+    source = sl.InMemorySource(
+        product_schema,
+        parser=sl.DataFrameParser(schema=product_schema, mapping={product_schema.product_id: "product_id"}),
+    )
+    sl.InMemoryExecutor(sources=[source], indices=[procurement_index]).run()
+    return source
+
+
+def run_chunked_loader(path: str, rows: int, chunk_size: int) -> float:
+    source = _fresh_source()
+    start = time.perf_counter()
+    with pd.read_csv(path, nrows=rows, chunksize=chunk_size) as reader:
+        for chunk in reader:
+            source.put([chunk])
+    return time.perf_counter() - start
+
+
+def run_batched_loader(path: str, rows: int, max_rows: int, max_bytes: int) -> float:
+    source = _fresh_source()
+    frames = _take_rows(iter_csv_batches(path, max_rows, max_bytes), rows)
+    report = ingest_frames(source, frames)
+    return report.seconds
+
+
+def _take_rows(frames, rows: int):
+    remaining = rows
+    for frame in frames:
+        if remaining <= 0:
+            return
+        yield frame.iloc[:remaining]
+        remaining -= len(frame)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default=settings.data_path)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--chunk-size", type=int, default=settings.chunk_size)
+    parser.add_argument("--batch-rows", type=int, default=settings.ingest_batch_rows)
+    parser.add_argument("--batch-bytes", type=int, default=settings.ingest_batch_bytes)
+    args = parser.parse_args()
+
+    # Load the model once so neither run pays for it
+    warmup = pd.read_csv(args.path, nrows=1, usecols=SCHEMA_COLUMNS)
+    _fresh_source().put([warmup])
+
+    chunked = run_chunked_loader(args.path, args.rows, args.chunk_size)
+    batched = run_batched_loader(args.path, args.rows, args.batch_rows, args.batch_bytes)
+
+    print(f"{'loader':<28}{'seconds':>10}{'rows/sec':>12}")
+    print(f"{f'chunked ({args.chunk_size} rows)':<28}{chunked:>10.2f}{args.rows / chunked:>12.1f}")
+    print(f"{'batched':<28}{batched:>10.2f}{args.rows / batched:>12.1f}")
+    print(f"speedup: {chunked / batched:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Top-k search latency of the in-memory vector store: Superlinked's per-product
+scoring against the float32 matrix scorer, at 5k, 100k and 1M products.
+
+Products are random unit vectors of the procurement index's dimension (MiniLM
+plus six number spaces), written straight into each store; queries are random
+too. Every matrix result is checked against the per-product one. The per-product
+store holds one float64 Vector per product (about 3.5 GB at 1M rows), so limit
+it with --baseline-max-rows on small machines.
+
+With --brands, every product gets one of that many brands and every query
+filters on one of them; with --max-cost, every product gets a cost up to 1000
+and every query keeps those up to the given cost. The matrix is then timed with
+the filters checked row by row and answered by the filter and range indexes.
+
+    uv run python -m benchmarks.bench_vector_search --rows 5000 100000 1000000
+    uv run python -m benchmarks.bench_vector_search --rows 1000000 --brands 50 --baseline-max-rows 0
+    uv run python -m benchmarks.bench_vector_search --rows 1000000 --brands 5 --max-cost 20 --baseline-max-rows 0
+"""
+import argparse
+import time
+
+import numpy as np
+from superlinked.framework.common.calculation.distance_metric import DistanceMetric
+from superlinked.framework.common.data_types import Vector
+from superlinked.framework.common.interface.comparison_operand import ComparisonOperation
+from superlinked.framework.common.interface.comparison_operation_type import ComparisonOperationType
+from superlinked.framework.common.storage.field.field import Field
+from superlinked.framework.common.storage.field.field_data_type import FieldDataType
+from superlinked.framework.common.storage.field.field_data import VectorFieldData
+from superlinked.framework.common.storage.index_config import IndexConfig
+from superlinked.framework.common.storage.query.vdb_knn_search_params import VDBKNNSearchParams
+from superlinked.framework.common.storage.search_index.index_field_descriptor import (
+    IndexFieldDescriptor,
+    VectorIndexFieldDescriptor,
+)
+from superlinked.framework.common.storage.search_index.search_algorithm import SearchAlgorithm
+from superlinked.framework.common.storage.search_index.vector_component_precision import VectorComponentPrecision
+from superlinked.framework.storage.common.vdb_settings import VDBSettings
+
+from superlinked_app.vector_store import ProcurementInMemoryVDB
+
+# all-MiniLM-L12-v2 plus six NumberSpaces of 3 dimensions each
+DIMENSION = 384 + 6 * 3
+INDEX_NAME, VECTOR_FIELD = "procurement_index", "index_vector"
+BRAND_FIELD, COST_FIELD = Field(FieldDataType.STRING, "brand"), Field(FieldDataType.DOUBLE, "cost")
+
+
+def build_store(
+    vectors: np.ndarray, columns: dict[str, list], vectorized: bool, indexes: bool = True
+) -> ProcurementInMemoryVDB:
+    store = ProcurementInMemoryVDB(
+        VDBSettings(-1), snapshot_dir=None, vectorized_scoring=vectorized, filter_index=indexes, range_index=indexes
+    )
+    descriptor = VectorIndexFieldDescriptor(
+        VECTOR_FIELD, vectors.shape[1], DistanceMetric.INNER_PRODUCT, SearchAlgorithm.FLAT, VectorComponentPrecision.FLOAT32
+    )
+    fields = [IndexFieldDescriptor(field.data_type, field.name) for field in (BRAND_FIELD, COST_FIELD) if field.name in columns]
+    store.search_index_manager._index_configs[INDEX_NAME] = IndexConfig(INDEX_NAME, descriptor, fields)
+    row_ids = [f"product:{row}" for row in range(len(vectors))]
+    rows = [dict(zip(columns, values)) for values in zip(*columns.values())] if columns else [{} for _ in row_ids]
+    if vectorized:
+        store._matrix(VECTOR_FIELD, vectors.shape[1]).upsert(row_ids, vectors)
+        if columns:
+            store._vdb.update(zip(row_ids, rows))
+            store._update_filter_indexes(row_ids)
+    else:
+        for row_id, vector, row in zip(row_ids, vectors.astype(np.float64), rows):
+            store._vdb[row_id] = {VECTOR_FIELD: Vector(vector), **row}
+    return store
+
+
+def time_queries(
+    store: ProcurementInMemoryVDB, queries: np.ndarray, limit: int, filters: list[list] | None = None
+) -> tuple[float, list]:
+    results = []
+    start = time.perf_counter()
+    for number, query in enumerate(queries):
+        query_filters = filters[number] if filters else None
+        params = VDBKNNSearchParams(VectorFieldData(VECTOR_FIELD, Vector(query)), limit, [], query_filters, None)
+        results.append([entity.id_.object_id for entity in store._knn_search(INDEX_NAME, "product", params)])
+    return (time.perf_counter() - start) / len(queries), results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[5000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--baseline-max-rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--brands", type=int, default=0, help="filter every query on one of this many brands")
+    parser.add_argument("--max-cost", type=float, default=None, help="filter every query on cost <= this (of 1000)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    filtered = bool(args.brands) or args.max_cost is not None
+    header = f"{'products':<10}{'per-product ms':>16}{'matrix ms':>12}"
+    print(header + (f"{'indexed ms':>12}" if filtered else "") + f"{'speedup':>10}")
+    for rows in args.rows:
+        vectors = rng.standard_normal((rows, DIMENSION)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        queries = rng.standard_normal((args.queries, DIMENSION))
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        columns, filters = {}, [[] for _ in queries]
+        if args.brands:
+            names = [f"brand-{number}" for number in range(args.brands)]
+            columns[BRAND_FIELD.name] = [names[number] for number in rng.integers(args.brands, size=rows)]
+            for query_filters, number in zip(filters, rng.integers(args.brands, size=args.queries)):
+                query_filters.append(ComparisonOperation(ComparisonOperationType.EQUAL, BRAND_FIELD, names[number]))
+        if args.max_cost is not None:
+            columns[COST_FIELD.name] = rng.uniform(0, 1000, size=rows).round(2).tolist()
+            for query_filters in filters:
+                query_filters.append(ComparisonOperation(ComparisonOperationType.LESS_EQUAL, COST_FIELD, args.max_cost))
+
+        matrix_seconds, matrix_results = time_queries(
+            build_store(vectors, columns, True, indexes=False), queries, args.limit, filters
+        )
+        line = f"{rows:<10}{{baseline:>16}}{matrix_seconds * 1000:>12.2f}"
+        fastest = matrix_seconds
+        if filtered:
+            indexed_seconds, indexed_results = time_queries(
+                build_store(vectors, columns, True), queries, args.limit, filters
+            )
+            if indexed_results != matrix_results:
+                raise SystemExit(f"The filter indexes returned different products at {rows} rows")
+            line += f"{indexed_seconds * 1000:>12.2f}"
+            fastest = indexed_seconds
+        if rows > args.baseline_max_rows:
+            print(line.format(baseline="skipped"))
+            continue
+        baseline_seconds, baseline_results = time_queries(
+            build_store(vectors, columns, False), queries, args.limit, filters
+        )
+        if matrix_results != baseline_results:
+            raise SystemExit(f"Matrix scoring returned different products at {rows} rows")
+        print(line.format(baseline=f"{baseline_seconds * 1000:.2f}") + f"{baseline_seconds / fastest:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
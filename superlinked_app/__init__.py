@@ -1,7 +1,13 @@
-from . import schema
-from . import index  
-from . import query
-from . import configs
-from . import app
+import importlib
 
-__all__ = ["schema", "index", "query", "configs", "app"]
\ No newline at end of file
+__all__ = ["schema", "index", "query", "configs", "app"]
+
+
+def __getattr__(name: str):
+    # Submodules load on first access: importing one module (a CLI, a pool worker)
+    # must not build the whole app. The server still imports everything at startup.
+    if name in __all__:
+        module = importlib.import_module(f".{name}", __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,133 @@
+# procurement/admission.py
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+import numpy as np
+
+# Priority of the current request's LLM calls: lower values are admitted first
+HIGH_PRIORITY, NORMAL_PRIORITY, LOW_PRIORITY = 0, 1, 2
+PRIORITIES = {"high": HIGH_PRIORITY, "normal": NORMAL_PRIORITY, "low": LOW_PRIORITY}
+request_priority: ContextVar[int] = ContextVar("request_priority", default=NORMAL_PRIORITY)
+
+
+class AdmissionRejected(RuntimeError):
+    """The call was shed instead of waiting for a slot: the queue was full or waiting took too long."""
+
+    def __init__(self, reason: str, waited_seconds: float) -> None:
+        super().__init__(f"LLM extraction rejected ({reason} after {waited_seconds:.2f}s), try again later")
+        self.reason = reason
+        self.waited_seconds = waited_seconds
+
+
+class AdmissionController:
+    """
+    Admission control for calls to a rate-limited backend (the LLM). At most
+    `max_concurrency` calls run at once; the rest wait in a priority queue of at
+    most `max_queue` entries, ordered by priority and then arrival. A call is shed
+    with AdmissionRejected when the queue is full (a higher priority arrival takes
+    the place of the lowest priority waiter) or when it has waited longer than
+    `max_queue_wait_seconds`.
+
+    Each admitted call gets what is left of its `deadline_seconds` (counted from
+    when it started waiting) to pass on as its timeout, so a slow completion cannot
+    hold a request longer than the deadline.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        max_queue: int = 64,
+        max_queue_wait_seconds: float = 2.0,
+        deadline_seconds: float | None = 10.0,
+        window: int = 1024,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_queue_wait_seconds = max_queue_wait_seconds
+        self.deadline_seconds = deadline_seconds
+        self._condition = threading.Condition()
+        self._queue: list[tuple[int, int]] = []
+        self._evicted: set[tuple[int, int]] = set()
+        self._sequence = itertools.count()
+        self._active = 0
+        self._waits: deque[float] = deque(maxlen=window)
+        self.admitted = 0
+        self.shed = {"queue_full": 0, "queue_timeout": 0}
+        self.deadline_exceeded = 0
+
+    @contextmanager
+    def admit(self, priority: int | None = None) -> Iterator[float | None]:
+        """Wait for a slot and hold it for the block; yields the seconds left of the deadline (None if unbounded)."""
+        start = time.monotonic()
+        ticket = (request_priority.get() if priority is None else priority, next(self._sequence))
+        with self._condition:
+            if self._queue or self._active >= self.max_concurrency:
+                self._wait_for_turn(ticket, start)
+            self._active += 1
+            self.admitted += 1
+            waited = time.monotonic() - start
+            self._waits.append(waited)
+        try:
+            yield max(self.deadline_seconds - waited, 0.0) if self.deadline_seconds else None
+        finally:
+            with self._condition:
+                self._active -= 1
+                self._condition.notify_all()
+
+    def record_deadline_exceeded(self) -> None:
+        with self._condition:
+            self.deadline_exceeded += 1
+
+    def stats(self) -> dict:
+        with self._condition:
+            waits = np.asarray(self._waits)
+            return {
+                "active": self._active,
+                "queued": len(self._queue),
+                "max_concurrency": self.max_concurrency,
+                "admitted": self.admitted,
+                "shed": dict(self.shed),
+                "deadline_exceeded": self.deadline_exceeded,
+                "wait_seconds": {
+                    "p50": float(np.percentile(waits, 50)) if waits.size else 0.0,
+                    "p95": float(np.percentile(waits, 95)) if waits.size else 0.0,
+                    "max": float(waits.max()) if waits.size else 0.0,
+                },
+            }
+
+    def _wait_for_turn(self, ticket: tuple[int, int], start: float) -> None:
+        """Queue `ticket` until it is at the head with a free slot, or reject it. Holds the condition."""
+        if len(self._queue) >= self.max_queue:
+            lowest = max(self._queue, default=None)
+            if lowest is None or lowest[0] <= ticket[0]:
+                self._reject("queue_full", start)
+            self._queue.remove(lowest)
+            heapq.heapify(self._queue)
+            self._evicted.add(lowest)
+            self._condition.notify_all()
+        heapq.heappush(self._queue, ticket)
+        try:
+            while self._active >= self.max_concurrency or self._queue[0] != ticket:
+                remaining = self.max_queue_wait_seconds - (time.monotonic() - start)
+                if remaining <= 0:
+                    self._queue.remove(ticket)
+                    heapq.heapify(self._queue)
+                    self._reject("queue_timeout", start)
+                self._condition.wait(remaining)
+                if ticket in self._evicted:
+                    self._evicted.discard(ticket)
+                    self._reject("queue_full", start)
+            heapq.heappop(self._queue)
+        finally:
+            # Whoever is now at the head may be able to go
+            self._condition.notify_all()
+
+    def _reject(self, reason: str, start: float) -> None:
+        self.shed[reason] += 1
+        raise AdmissionRejected(reason, time.monotonic() - start)
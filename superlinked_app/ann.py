@@ -0,0 +1,206 @@
+# procurement/ann.py
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+from loguru import logger
+
+from .scoring import VectorMatrix
+
+# Training rows per list; k-means on fewer gives poor lists, on more costs time for little gain
+MIN_ROWS_PER_LIST, SAMPLE_ROWS_PER_LIST = 39, 64
+# Rows scored at once when assigning rows to lists, to bound the size of the score matrix
+CHUNK_ROWS = 16_384
+
+
+@dataclass(frozen=True)
+class IVFParams:
+    """Build and search parameters of an IVFIndex."""
+
+    # Lists (k-means centroids) the rows are partitioned into, at most
+    nlist: int = 1024
+    # Lists scored per search; more is slower and closer to exact
+    nprobe: int = 16
+    # Below this many rows searches stay exact and no index is built
+    min_rows: int = 50_000
+    # k-means iterations per training
+    iterations: int = 10
+    seed: int = 0
+
+
+class IVFIndex:
+    """
+    Inverted-file approximate index over the rows of a VectorMatrix. Rows are
+    partitioned into lists by spherical k-means on a sample of them; a search
+    scores the centroids, then only the rows of the `nprobe` best lists, so its
+    cost follows nprobe / nlist of the catalog instead of all of it.
+
+    The index trains once the matrix reaches `min_rows`, and retrains when it has
+    doubled since. In between, written rows are assigned to their nearest list as
+    they come, and rewritten rows move lists. Training runs in the writer's thread
+    and searches keep using the previous lists (or exact search) until it is done.
+    """
+
+    def __init__(self, matrix: VectorMatrix, params: IVFParams) -> None:
+        self.matrix = matrix
+        self.params = params
+        self._lock = threading.Lock()
+        self._training = False
+        self._rng = np.random.default_rng(params.seed)
+        self._centroids: np.ndarray | None = None
+        self._trained_rows = 0
+        self._assignment = np.full(0, -1, dtype=np.int32)
+        # Positions per list as appended; rows that moved are dropped when the list is next read
+        self._members: list[list[int]] = []
+        self._lists: list[np.ndarray | None] = []
+        # Rows written while a training runs, assigned again once it is done
+        self._written_while_training: list[np.ndarray] = []
+        self.trainings = 0
+
+    @property
+    def ready(self) -> bool:
+        return self._centroids is not None
+
+    @property
+    def lists(self) -> int:
+        return 0 if self._centroids is None else len(self._centroids)
+
+    def add(self, positions: np.ndarray) -> None:
+        """Assign the rows at `positions` (new or rewritten) to lists, training first if it is time to."""
+        if self._due_for_training():
+            self.train()
+            return
+        positions = np.asarray(positions, dtype=np.intp)
+        with self._lock:
+            if self._training:
+                self._written_while_training.append(positions)
+            if self._centroids is not None:
+                self._assign(positions)
+
+    def train(self) -> None:
+        """Partition the current rows into new lists."""
+        with self._lock:
+            if self._training:
+                return
+            self._training = True
+        try:
+            start = time.perf_counter()
+            matrix, _ = self.matrix.view()
+            rows = len(matrix)
+            lists = max(1, min(self.params.nlist, rows // MIN_ROWS_PER_LIST))
+            sample = matrix[self._rng.choice(rows, min(rows, lists * SAMPLE_ROWS_PER_LIST), replace=False)]
+            centroids = _spherical_kmeans(sample, lists, self.params.iterations, self._rng)
+            assignment = _nearest(matrix, centroids)
+            order = np.argsort(assignment, kind="stable")
+            bounds = np.searchsorted(assignment[order], np.arange(lists + 1))
+            with self._lock:
+                self._centroids, self._trained_rows = centroids, rows
+                self._assignment = np.full(max(rows, len(self._assignment)), -1, dtype=np.int32)
+                self._assignment[:rows] = assignment
+                self._lists = [order[bounds[c] : bounds[c + 1]] for c in range(lists)]
+                self._members = [array.tolist() for array in self._lists]
+                # Rows appended or rewritten while training may have been missed or read half-written
+                self._assign(np.concatenate([np.arange(rows, len(self.matrix)), *self._written_while_training]))
+                self._written_while_training = []
+                self.trainings += 1
+            logger.info(
+                "Trained IVF index: {} rows in {} lists in {:.1f}s", rows, lists, time.perf_counter() - start
+            )
+        finally:
+            with self._lock:
+                self._training = False
+                self._written_while_training = []
+
+    def probe(self, query: np.ndarray, nprobe: int | None = None) -> np.ndarray | None:
+        """Positions of the rows in the `nprobe` lists nearest to `query`, or None before training."""
+        with self._lock:
+            if self._centroids is None:
+                return None
+            nprobe = min(nprobe or self.params.nprobe, len(self._centroids))
+            scores = self._centroids @ query.astype(np.float32)
+            nearest = np.argpartition(-scores, nprobe - 1)[:nprobe] if nprobe < len(scores) else range(len(scores))
+            return np.concatenate([self._list(int(c)) for c in nearest])
+
+    def probed_rows(self, nprobe: int | None = None) -> int:
+        """Expected rows scored by a probe, for cost estimates."""
+        lists = self.lists
+        return 0 if not lists else round(len(self.matrix) * min(nprobe or self.params.nprobe, lists) / lists)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "ready": self._centroids is not None,
+                "lists": self.lists,
+                "nprobe": self.params.nprobe,
+                "trained_rows": self._trained_rows,
+                "trainings": self.trainings,
+            }
+
+    def _due_for_training(self) -> bool:
+        rows = len(self.matrix)
+        if self._training or rows < max(self.params.min_rows, 2 * MIN_ROWS_PER_LIST):
+            return False
+        return self._centroids is None or rows >= 2 * self._trained_rows
+
+    def _assign(self, positions: np.ndarray) -> None:
+        """Holds the lock."""
+        matrix, _ = self.matrix.view()
+        positions = positions[positions < len(matrix)]
+        self._reserve(len(matrix))
+        nearest = _nearest(matrix[positions], self._centroids)
+        for position, c in zip(positions.tolist(), nearest.tolist()):
+            old = int(self._assignment[position])
+            if old == c:
+                continue
+            if old != -1:
+                self._lists[old] = None
+            self._assignment[position] = c
+            self._members[c].append(position)
+            self._lists[c] = None
+
+    def _list(self, c: int) -> np.ndarray:
+        """Holds the lock."""
+        cached = self._lists[c]
+        if cached is None:
+            positions = np.unique(np.asarray(self._members[c], dtype=np.intp))
+            cached = positions[self._assignment[positions] == c]
+            self._members[c] = cached.tolist()
+            self._lists[c] = cached
+        return cached
+
+    def _reserve(self, rows: int) -> None:
+        if rows > len(self._assignment):
+            grown = np.full(max(rows, 2 * len(self._assignment)), -1, dtype=np.int32)
+            grown[: len(self._assignment)] = self._assignment
+            self._assignment = grown
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the centroid with the highest inner product, per vector."""
+    nearest = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), CHUNK_ROWS):
+        nearest[start : start + CHUNK_ROWS] = np.argmax(vectors[start : start + CHUNK_ROWS] @ centroids.T, axis=1)
+    return nearest
+
+
+def _spherical_kmeans(sample: np.ndarray, lists: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    """Unit-length centroids of `sample`, clustered by inner product."""
+    centroids = _normalized(sample[rng.choice(len(sample), lists, replace=False)].astype(np.float32))
+    for _ in range(iterations):
+        assignment = _nearest(sample, centroids)
+        sums = np.zeros_like(centroids)
+        order = np.argsort(assignment, kind="stable")
+        present, starts = np.unique(assignment[order], return_index=True)
+        sums[present] = np.add.reduceat(sample[order], starts, axis=0)
+        counts = np.bincount(assignment, minlength=lists)
+        # Lists left empty restart from random rows
+        empty = np.flatnonzero(counts == 0)
+        sums[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+        centroids = _normalized(sums)
+    return centroids
+
+
+def _normalized(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
@@ -2,9 +2,27 @@
 import superlinked.framework as sl
 from loguru import logger
 from .schema import product_schema
-from .index import procurement_index
-from .query import procurement_query
+from .index import procurement_index, product_text_space
+from .query import DEPARTMENTS, filters, procurement_query
 from .configs import settings
+from .delta import FingerprintStore
+from .embedding import (
+    install_embedding_cache,
+    install_embedding_pool,
+    install_speculative_embedding,
+    query_text_embedder,
+)
+from .admission import AdmissionController
+from .degraded import DegradedMode
+from .executor import ProcurementRestExecutor
+from .nlq_cache import ParamCache, SemanticParamCache
+from .nlq_handler import install_nlq_handler
+from .nlq_prompt import OptionPruner
+from .nlq_rules import RuleBasedParser
+from .planner import QueryPlanner
+from .ann import IVFParams
+from .validation import Quarantine, ValidatingDataFrameParser
+from .vector_store import ProcurementInMemoryVectorDatabase
 import os
 # Create REST source for real-time data input
 product_source: sl.RestSource = sl.RestSource(product_schema)
@@ -12,9 +30,13 @@ product_source: sl.RestSource = sl.RestSource(product_schema)
 # Data loader configuration for CSV
 logger.info("Data loader will load data from: %s", settings.data_path)
 
-product_data_loader_parser: sl.DataFrameParser = sl.DataFrameParser(
+# Malformed rows go to the quarantine file instead of failing their whole chunk
+product_quarantine = Quarantine(settings.quarantine_path)
+
+product_data_loader_parser: sl.DataFrameParser = ValidatingDataFrameParser(
     schema=product_schema,
-    mapping={product_schema.product_id: "product_id"}
+    mapping={product_schema.product_id: "product_id"},
+    quarantine=product_quarantine,
 )
 
 product_data_loader_config: sl.DataLoaderConfig = sl.DataLoaderConfig(
@@ -39,10 +61,80 @@ if settings.use_qdrant_vector_db:
     )
 else:
     logger.info("Using in-memory database")
-    vector_database = sl.InMemoryVectorDatabase()
+    vector_database = ProcurementInMemoryVectorDatabase(
+        settings.vector_snapshot_dir,
+        vectorized_scoring=settings.use_vectorized_scoring,
+        filter_index=settings.use_filter_index,
+        range_index=settings.use_range_index,
+        planner=QueryPlanner(settings.planner_oversample) if settings.use_query_planner else None,
+        ann=IVFParams(
+            nlist=settings.ann_nlist,
+            nprobe=settings.ann_nprobe,
+            min_rows=settings.ann_min_rows,
+            iterations=settings.ann_kmeans_iterations,
+        )
+        if settings.use_ann_index
+        else None,
+    )
+
+# Fingerprints must live exactly as long as the vectors they describe
+product_fingerprints = FingerprintStore(settings.fingerprint_path if settings.use_qdrant_vector_db else None)
+
+if settings.use_embedding_cache:
+    install_embedding_cache(settings.embedding_cache_dir)
+if settings.embedding_workers > 1:
+    install_embedding_pool(settings.embedding_workers, settings.embedding_worker_batch)
+filter_options = {filter_item.param_name: filter_item.options for filter_item in filters}
+# Query texts embedded ahead of time: the NLQ handler's guesses and batch search descriptions
+speculative_embeddings = install_speculative_embedding(product_text_space)
+# Same model as product descriptions, so a raw query embedding is often reused for the search.
+# Shared by the semantic cache and the option pruner; built after the speculative embeddings are
+# installed, so both take the query vectors started ahead of time
+query_embedder = query_text_embedder(product_text_space)
+install_nlq_handler(
+    ParamCache(settings.nlq_cache_size, settings.nlq_cache_ttl_seconds, settings.nlq_cache_path)
+    if settings.nlq_cache_size > 0
+    else None,
+    SemanticParamCache(
+        query_embedder,
+        settings.nlq_semantic_threshold,
+        verify_rate=settings.nlq_semantic_verify_rate,
+    )
+    if settings.nlq_semantic_threshold > 0
+    else None,
+    RuleBasedParser(
+        DEPARTMENTS,
+        filter_options["categories_include"],
+        filter_options["brands_include"],
+        min_confidence=settings.nlq_rules_min_confidence,
+    )
+    if settings.use_nlq_rules
+    else None,
+    OptionPruner(
+        query_embedder,
+        ["brands_include", "categories_include", "categories_exclude"],
+        settings.nlq_max_options,
+        settings.nlq_prompt_token_budget,
+    )
+    if settings.nlq_max_options > 0
+    else None,
+    speculative_embeddings if settings.nlq_speculative_embedding else None,
+    openai_base_url=settings.openai_base_url,
+    admission=AdmissionController(
+        settings.nlq_max_concurrency,
+        settings.nlq_max_queue,
+        settings.nlq_max_queue_wait_seconds,
+        settings.nlq_deadline_seconds,
+    )
+    if settings.nlq_max_concurrency > 0
+    else None,
+    degraded_mode=DegradedMode(settings.nlq_latency_budget_seconds, settings.nlq_degraded_similarity)
+    if settings.nlq_latency_budget_seconds > 0
+    else None,
+)
 
 # Create and register executor
-executor = sl.RestExecutor(
+executor = ProcurementRestExecutor(
     sources=[product_source, product_loader_source],
     indices=[procurement_index],
     queries=[
@@ -0,0 +1,198 @@
+# procurement/bulk.py
+import asyncio
+import codecs
+import json
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterable, Callable
+
+from loguru import logger
+
+_WHITESPACE = " \t\r\n"
+
+
+class BulkParseError(ValueError):
+    """The request body is not NDJSON or a JSON array of objects."""
+
+    # Set by bulk_ingest to the number of rows written before the bad row
+    rows_written: int = 0
+
+
+class RowStreamParser:
+    """
+    Incremental parser for a body that is either NDJSON (one object per line) or
+    a single JSON array of objects. Chunks can split rows, lines or UTF-8
+    characters anywhere; the format is picked from the first non-blank character.
+    """
+
+    def __init__(self) -> None:
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._format: str | None = None  # "ndjson" or "array"
+        self._array_closed = False
+        self._rows = 0
+
+    @property
+    def format(self) -> str | None:
+        return self._format
+
+    def feed(self, chunk: bytes) -> list[dict]:
+        self._buffer += self._decoder.decode(chunk)
+        return self._drain(final=False)
+
+    def close(self) -> list[dict]:
+        self._buffer += self._decoder.decode(b"", final=True)
+        rows = self._drain(final=True)
+        if self._format == "array" and not self._array_closed:
+            raise BulkParseError("JSON array is not closed")
+        return rows
+
+    def _drain(self, final: bool) -> list[dict]:
+        if self._format is None:
+            stripped = self._buffer.lstrip(_WHITESPACE)
+            if not stripped:
+                return []
+            self._format = "array" if stripped[0] == "[" else "ndjson"
+            self._buffer = stripped[1:] if self._format == "array" else stripped
+        if self._format == "ndjson":
+            return self._drain_lines(final)
+        return self._drain_array(final)
+
+    def _drain_lines(self, final: bool) -> list[dict]:
+        *lines, self._buffer = self._buffer.split("\n")
+        if final:
+            lines.append(self._buffer)
+            self._buffer = ""
+        rows = []
+        for line in lines:
+            if line.strip():
+                rows.append(self._row(line.strip()))
+        return rows
+
+    def _drain_array(self, final: bool) -> list[dict]:
+        rows = []
+        position = 0
+        while True:
+            while position < len(self._buffer) and self._buffer[position] in _WHITESPACE + ",":
+                position += 1
+            if position == len(self._buffer):
+                break
+            if self._buffer[position] == "]":
+                self._array_closed = True
+                if self._buffer[position + 1:].strip(_WHITESPACE):
+                    raise BulkParseError("Unexpected data after the JSON array")
+                position = len(self._buffer)
+                break
+            if self._array_closed:
+                raise BulkParseError("Unexpected data after the JSON array")
+            try:
+                value, end = self._json.raw_decode(self._buffer, position)
+            except json.JSONDecodeError as e:
+                if final:
+                    raise BulkParseError(f"Invalid JSON after row {self._rows}: {e.msg}") from e
+                break  # the row continues in the next chunk
+            rows.append(self._check_row(value))
+            position = end
+        self._buffer = self._buffer[position:]
+        return rows
+
+    def _row(self, text: str) -> dict:
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise BulkParseError(f"Invalid JSON on line {self._rows + 1}: {e.msg}") from e
+        return self._check_row(value)
+
+    def _check_row(self, value) -> dict:
+        if not isinstance(value, dict):
+            raise BulkParseError(f"Row {self._rows + 1} is not a JSON object")
+        self._rows += 1
+        return value
+
+
+@dataclass
+class BatchAck:
+    """Acknowledgment for one micro-batch once it has been written."""
+
+    batch: int
+    rows: int
+    # Time the batch sat parsed before the writer took it, and time spent embedding + upserting
+    queued_seconds: float
+    write_seconds: float
+
+
+@dataclass
+class BulkReport:
+    rows: int = 0
+    seconds: float = 0.0
+    batches: list[BatchAck] = field(default_factory=list)
+
+
+async def bulk_ingest(
+    chunks: AsyncIterable[bytes],
+    put: Callable[[list[dict]], None],
+    batch_rows: int,
+    max_pending_batches: int,
+) -> BulkReport:
+    """
+    Parse rows from `chunks` as they arrive and write them with `put` in batches
+    of `batch_rows`. At most `max_pending_batches` parsed batches wait for the
+    writer; beyond that the body is not read further, so a slow vector store
+    slows the client down instead of buffering the whole push in memory.
+    """
+    report = BulkReport()
+    start = time.perf_counter()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending_batches)
+
+    async def write_batches() -> None:
+        while (item := await queue.get()) is not None:
+            batch, ready_at = item
+            write_start = time.perf_counter()
+            await asyncio.to_thread(put, batch)
+            report.rows += len(batch)
+            report.batches.append(
+                BatchAck(len(report.batches) + 1, len(batch), write_start - ready_at, time.perf_counter() - write_start)
+            )
+            logger.debug("Bulk batch {} written ({} rows)", len(report.batches), len(batch))
+
+    writer = asyncio.create_task(write_batches())
+
+    async def enqueue(batch: list[dict] | None) -> None:
+        item = None if batch is None else (batch, time.perf_counter())
+        put_task = asyncio.create_task(queue.put(item))
+        done, _ = await asyncio.wait({put_task, writer}, return_when=asyncio.FIRST_COMPLETED)
+        if put_task not in done:
+            put_task.cancel()
+            writer.result()  # the writer stopped early: re-raise its error
+
+    parser = RowStreamParser()
+    pending: list[dict] = []
+    try:
+        async for chunk in chunks:
+            for row in parser.feed(chunk):
+                pending.append(row)
+                if len(pending) >= batch_rows:
+                    await enqueue(pending)
+                    pending = []
+        pending.extend(parser.close())
+        if pending:
+            await enqueue(pending)
+    except BulkParseError as e:
+        # Batches parsed before the bad row are still written, so the client knows where to resume
+        await enqueue(None)
+        await writer
+        e.rows_written = report.rows
+        raise
+    else:
+        await enqueue(None)
+        await writer
+    finally:
+        if not writer.done():
+            writer.cancel()
+    report.seconds = time.perf_counter() - start
+    logger.info(
+        "Bulk ingest ({}): {} rows in {} batches in {:.2f}s",
+        parser.format, report.rows, len(report.batches), report.seconds,
+    )
+    return report
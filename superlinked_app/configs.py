@@ -13,6 +13,8 @@ class Settings(BaseSettings):
     text_embedder_name: str = "sentence-transformers/all-MiniLM-L12-v2" 
     chunk_size: int = 10
     openai_model: str = "gpt-4o" 
+    # OpenAI-compatible endpoint for extraction, e.g. the local stub at http://localhost:8090/v1
+    openai_base_url: str | None = None
         
     openai_api_key: SecretStr
     qdrant_api_key: SecretStr
@@ -20,8 +22,85 @@ class Settings(BaseSettings):
     qdrant_collection_name: str = os.environ.get("QDRANT_COLLECTION_NAME")
     
 
-    data_path: str = "./data/csv/products_enriched.csv"  
+    data_path: str = "./data/csv/products_enriched.csv"
+    # Typed Arrow copy of data_path (`make snapshot`); used while it matches the CSV
+    snapshot_path: str = "./data/snapshot/products_enriched.arrow"
+    # Distinct brands/categories/departments, written with the snapshot
+    catalog_path: str = "./data/snapshot/catalog.json"
+    # Rows rejected by validation during CSV loads are appended here with the reason
+    quarantine_path: str = "./data/quarantine/products.csv"
     use_qdrant_vector_db: bool = True
+
+    # Batched ingestion: a batch is capped by row count and by CSV bytes
+    ingest_batch_rows: int = 2048
+    ingest_batch_bytes: int = 8 * 1024 * 1024
+    # In-memory vector store snapshot, written on shutdown and memory-mapped on startup
+    vector_snapshot_dir: str = "./data/vector_snapshot"
+    # In-memory store: score searches with one float32 matrix per index instead of product by product
+    use_vectorized_scoring: bool = True
+    # Vectorized scoring: answer department/category/brand filters from an inverted index of row positions
+    use_filter_index: bool = True
+    # Vectorized scoring: resolve cost/margin/return-rate/orders/revenue ranges from sorted columns
+    use_range_index: bool = True
+    # Vectorized scoring: choose pre- or post-filtering per search from field statistics, reported in metadata
+    use_query_planner: bool = True
+    # Post-filter plans fetch limit x this many candidates (divided by the selectivity when raised)
+    planner_oversample: float = 2.0
+    # Vectorized scoring: approximate (IVF) search over large catalogs, built once they reach ann_min_rows
+    use_ann_index: bool = False
+    ann_min_rows: int = 50_000
+    # IVF build: k-means lists the products are partitioned into (at most), and training iterations
+    ann_nlist: int = 1024
+    ann_kmeans_iterations: int = 10
+    # IVF search: lists scored per query; more is slower and closer to exact
+    ann_nprobe: int = 16
+    # Per-product content hashes, only persisted alongside Qdrant (in-memory starts empty)
+    fingerprint_path: str = "./data/fingerprints/products.npz"
+    # On-disk text embeddings keyed by model + text, shared by ingestion and queries
+    use_embedding_cache: bool = True
+    embedding_cache_dir: str = "./.cache/embeddings"
+    # Worker processes for embedding ingestion batches (1 = embed in the server process)
+    embedding_workers: int = 1
+    embedding_worker_batch: int = 256
+    # Load sentence-transformer models in the background at startup instead of on first use
+    warm_up_models: bool = True
+    # Rows per upsert for the streaming bulk ingest endpoint, and parsed batches allowed to wait for the vector store
+    bulk_batch_rows: int = 512
+    bulk_max_pending_batches: int = 2
+    # Single-product ingests are buffered and written together: up to this many rows, held at most this long (1 disables)
+    ingest_buffer_max_rows: int = 64
+    ingest_buffer_max_wait_ms: float = 5.0
+    # Params extracted from natural queries: in-memory LRU entries (0 disables), lifetime, optional SQLite file
+    nlq_cache_size: int = 1024
+    nlq_cache_ttl_seconds: float = 24 * 3600
+    nlq_cache_path: str | None = None
+    # Reuse params of an earlier query whose embedding is at least this similar (0 disables),
+    # and re-extract this fraction of such matches to measure how often reuse is wrong
+    nlq_semantic_threshold: float = 0.93
+    nlq_semantic_verify_rate: float = 0.0
+    # Answer natural queries with the local keyword/number rules when they account for this share of the words
+    use_nlq_rules: bool = True
+    nlq_rules_min_confidence: float = 0.8
+    # Brand/category options listed in the extraction prompt per query (0 sends all), and its approximate token budget
+    nlq_max_options: int = 25
+    nlq_prompt_token_budget: int = 3000
+    # Embed the raw query and the likely product description while the LLM extracts params
+    nlq_speculative_embedding: bool = True
+    # LLM extraction calls running at once (0 disables admission control), calls allowed to wait,
+    # longest wait before a call is shed, and the deadline per call including its wait
+    nlq_max_concurrency: int = 8
+    nlq_max_queue: int = 64
+    nlq_max_queue_wait_seconds: float = 2.0
+    nlq_deadline_seconds: float = 10.0
+    # Seconds a search waits for extraction before interpreting the query without the LLM (0 waits for it),
+    # and the similarity of an earlier query whose params are reused then
+    nlq_latency_budget_seconds: float = 5.0
+    nlq_degraded_similarity: float = 0.8
+    # Identical searches arriving while one is running share its response
+    coalesce_searches: bool = True
+    # Largest batch search request, and how many of its LLM extractions / searches run at once
+    search_batch_max_queries: int = 100
+    search_batch_concurrency: int = 8
     
     model_config = SettingsConfigDict(
         env_file=DEFAULT_ENV_FILENAME, 
@@ -0,0 +1,106 @@
+# procurement/degraded.py
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+from loguru import logger
+
+# Fallbacks in the order they are tried when the LLM does not answer in time
+SIMILAR_QUERY, LOCAL_PARSE, RAW_TEXT = "similar_query", "local_parse", "raw_text"
+
+
+@dataclass
+class Degradation:
+    """How the natural query of a search was interpreted when the LLM could not be used."""
+
+    fallback: str | None = None
+    reason: str | None = None
+
+
+_current: contextvars.ContextVar[Degradation | None] = contextvars.ContextVar("degradation", default=None)
+
+
+@contextmanager
+def degradation_scope() -> Iterator[Degradation]:
+    """Collect whether the searches run in the block fell back; `fallback` stays None if they did not."""
+    degradation = Degradation()
+    token = _current.set(degradation)
+    try:
+        yield degradation
+    finally:
+        _current.reset(token)
+
+
+class DegradedMode:
+    """
+    Latency budget for natural-query extraction. The LLM call runs on a worker
+    thread; if it has not returned within the budget (or it fails, or admission
+    control sheds it) the handler interprets the query without it, through the
+    fallbacks listed above, and the search is flagged as degraded. A call that
+    finishes late still completes in the background, so its params can be cached
+    for the next time the query comes in.
+    """
+
+    def __init__(
+        self,
+        budget_seconds: float,
+        similarity: float = 0.8,
+        text_param: str | None = "product_description",
+        max_workers: int = 32,
+    ) -> None:
+        self.budget_seconds = budget_seconds
+        self.similarity = similarity
+        self.text_param = text_param
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="nlq-extraction")
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.late_completions = 0
+        self.fallbacks = {SIMILAR_QUERY: 0, LOCAL_PARSE: 0, RAW_TEXT: 0}
+
+    def run(self, extract: Callable[[], dict], timeout: float, on_late: Callable[[dict], None]) -> dict:
+        """
+        Result of `extract` if it returns within `timeout` seconds. Otherwise raises
+        TimeoutError (or its exception) and hands a late result to `on_late`.
+        """
+        with self._lock:
+            self.requests += 1
+        # The call keeps the request's context, e.g. its admission priority
+        future = self._executor.submit(contextvars.copy_context().run, extract)
+        try:
+            return future.result(timeout=max(timeout, 0.0))
+        except FutureTimeoutError:
+            future.add_done_callback(lambda done: self._finish_late(done, on_late))
+            raise TimeoutError(f"no extraction within {self.budget_seconds}s") from None
+
+    def record(self, fallback: str, reason: str) -> None:
+        """Count a fallback and flag the current search as degraded."""
+        with self._lock:
+            self.fallbacks[fallback] += 1
+        if (degradation := _current.get()) is not None:
+            degradation.fallback, degradation.reason = fallback, reason
+
+    def stats(self) -> dict:
+        with self._lock:
+            degraded = sum(self.fallbacks.values())
+            return {
+                "budget_seconds": self.budget_seconds,
+                "requests": self.requests,
+                "degraded": degraded,
+                "degraded_rate": degraded / self.requests if self.requests else 0.0,
+                "fallbacks": dict(self.fallbacks),
+                "late_completions": self.late_completions,
+            }
+
+    def _finish_late(self, done, on_late: Callable[[dict], None]) -> None:
+        if done.exception() is not None:
+            return
+        with self._lock:
+            self.late_completions += 1
+        try:
+            on_late(done.result())
+        except Exception:
+            logger.exception("Storing a late NLQ extraction failed")
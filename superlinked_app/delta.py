@@ -0,0 +1,139 @@
+# procurement/delta.py
+import os
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+from superlinked import framework as sl
+
+from .schema import product_schema
+
+ID_COLUMN = product_schema.id.name
+# Only `name` feeds product_text_space; every other field is number spaces or payload
+EMBEDDED_COLUMNS = ["name"]
+PAYLOAD_TEXT_COLUMNS = [
+    field.name for field in product_schema.schema_fields
+    if isinstance(field, sl.String) and field.name not in EMBEDDED_COLUMNS
+]
+PAYLOAD_NUMERIC_COLUMNS = [
+    field.name for field in product_schema.schema_fields if isinstance(field, (sl.Float, sl.Integer))
+]
+
+
+def _hash_text(frame: pd.DataFrame, columns: list[str]) -> np.ndarray:
+    values = frame[columns].fillna("").astype(str)
+    return pd.util.hash_pandas_object(values, index=False).to_numpy(dtype=np.uint64)
+
+
+def _hash_mixed(frame: pd.DataFrame, text_columns: list[str], numeric_columns: list[str]) -> np.ndarray:
+    # Cast numbers to float64 so 3 and 3.0 (or an int column that gained a NaN) hash the same
+    values = pd.concat(
+        [frame[text_columns].fillna("").astype(str), frame[numeric_columns].astype("float64")],
+        axis=1,
+    )
+    return pd.util.hash_pandas_object(values, index=False).to_numpy(dtype=np.uint64)
+
+
+@dataclass
+class Delta:
+    """Classification of one batch against the stored fingerprints."""
+
+    frame: pd.DataFrame
+    ids: np.ndarray
+    name_hash: np.ndarray
+    payload_hash: np.ndarray
+    reembed: np.ndarray
+    payload_only: np.ndarray
+
+    @property
+    def unchanged_count(self) -> int:
+        return int(len(self.ids) - self.reembed.sum() - self.payload_only.sum())
+
+    def changed_frame(self) -> pd.DataFrame:
+        """
+        Rows that need to be written, whole: Superlinked has no stored value to fall
+        back on for a missing `name`. The embedding cache serves the unchanged names
+        of payload-only rows without running the model.
+        """
+        return self.frame[self.reembed | self.payload_only]
+
+
+class FingerprintStore:
+    """
+    Per-product content fingerprints: one hash of the embedded text (`name`) and
+    one of everything else. Kept on disk next to a persistent vector database so a
+    refresh only writes what changed since the last run.
+    """
+
+    def __init__(self, path: str | None = None) -> None:
+        self._path = path
+        self._ids = pd.Index([], dtype=object)
+        self._name_hash = np.empty(0, dtype=np.uint64)
+        self._payload_hash = np.empty(0, dtype=np.uint64)
+        if path and os.path.isfile(path):
+            self._load(path)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def diff(self, frame: pd.DataFrame) -> Delta:
+        ids = frame[ID_COLUMN].astype(str).to_numpy()
+        name_hash = _hash_text(frame, EMBEDDED_COLUMNS)
+        payload_hash = _hash_mixed(frame, PAYLOAD_TEXT_COLUMNS, PAYLOAD_NUMERIC_COLUMNS)
+
+        positions = self._ids.get_indexer(ids)
+        known = positions >= 0
+        name_same = np.zeros(len(ids), dtype=bool)
+        payload_same = np.zeros(len(ids), dtype=bool)
+        name_same[known] = self._name_hash[positions[known]] == name_hash[known]
+        payload_same[known] = self._payload_hash[positions[known]] == payload_hash[known]
+
+        return Delta(
+            frame=frame,
+            ids=ids,
+            name_hash=name_hash,
+            payload_hash=payload_hash,
+            reembed=~name_same,
+            payload_only=name_same & ~payload_same,
+        )
+
+    def commit(self, delta: Delta) -> None:
+        """Record the fingerprints of a batch once it has been written."""
+        changed = delta.reembed | delta.payload_only
+        ids = delta.ids[changed]
+        positions = self._ids.get_indexer(ids)
+        known = positions >= 0
+        self._name_hash[positions[known]] = delta.name_hash[changed][known]
+        self._payload_hash[positions[known]] = delta.payload_hash[changed][known]
+        if (~known).any():
+            self._ids = self._ids.append(pd.Index(ids[~known], dtype=object))
+            self._name_hash = np.concatenate([self._name_hash, delta.name_hash[changed][~known]])
+            self._payload_hash = np.concatenate([self._payload_hash, delta.payload_hash[changed][~known]])
+
+    def clear(self) -> None:
+        self._ids = pd.Index([], dtype=object)
+        self._name_hash = np.empty(0, dtype=np.uint64)
+        self._payload_hash = np.empty(0, dtype=np.uint64)
+
+    def save(self) -> None:
+        if not self._path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self._path)), exist_ok=True)
+        tmp_path = f"{self._path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                ids=self._ids.to_numpy(dtype=str),
+                name_hash=self._name_hash,
+                payload_hash=self._payload_hash,
+            )
+        os.replace(tmp_path, self._path)
+        logger.info("Saved {} product fingerprints to {}", len(self), self._path)
+
+    def _load(self, path: str) -> None:
+        with np.load(path) as data:
+            self._ids = pd.Index(data["ids"].astype(object))
+            self._name_hash = data["name_hash"].astype(np.uint64)
+            self._payload_hash = data["payload_hash"].astype(np.uint64)
+        logger.info("Loaded {} product fingerprints from {}", len(self), path)
@@ -0,0 +1,157 @@
+# procurement/embedding.py
+import time
+from functools import partial
+from pathlib import Path
+from typing import Callable, Sequence
+
+import numpy as np
+from loguru import logger
+from superlinked import framework as sl
+from superlinked.framework.common.dag.context import ExecutionContext, ExecutionEnvironment
+from superlinked.framework.common.data_types import Vector
+from superlinked.framework.common.space.config.embedding.text_similarity_embedding_config import (
+    TextSimilarityEmbeddingConfig,
+)
+from superlinked.framework.common.space.embedding import embedding_factory
+from superlinked.framework.common.space.embedding.sentence_transformer_embedding import (
+    SentenceTransformerEmbedding,
+)
+from superlinked.framework.common.space.embedding.sentence_transformer_manager import (
+    SentenceTransformerManager,
+)
+
+from .embedding_cache import EmbeddingCache
+from .embedding_pool import EmbeddingPool, load_sentence_transformer
+from .speculation import SpeculativeEmbeddings
+
+# One cache and one pool per model, shared by the ingestion and the query embedding nodes
+_caches: dict[str, EmbeddingCache] = {}
+_cache_dir: str | None = None
+_pools: dict[str, EmbeddingPool] = {}
+_pool_workers = 1
+_pool_batch_size = 256
+_speculations: dict[str, SpeculativeEmbeddings] = {}
+
+
+def get_embedding_cache(model_name: str) -> EmbeddingCache | None:
+    if _cache_dir is None:
+        return None
+    if model_name not in _caches:
+        _caches[model_name] = EmbeddingCache(_cache_dir, model_name)
+    return _caches[model_name]
+
+
+def get_embedding_pool(model_name: str, model_cache_dir: Path | None = None) -> EmbeddingPool | None:
+    if _pool_workers <= 1:
+        return None
+    if model_name not in _pools:
+        loader = partial(load_sentence_transformer, model_cache_dir=model_cache_dir)
+        _pools[model_name] = EmbeddingPool(model_name, _pool_workers, _pool_batch_size, loader=loader)
+    return _pools[model_name]
+
+
+def get_speculative_embeddings(model_name: str) -> SpeculativeEmbeddings | None:
+    return _speculations.get(model_name)
+
+
+class ProcurementTextEmbedding(SentenceTransformerEmbedding):
+    """
+    Sentence-transformer embedding that checks the on-disk cache before running
+    the model, and spreads large ingestion batches over the worker pool. Query
+    texts embedded ahead of time by SpeculativeEmbeddings are taken from there. Superlinked
+    creates one of these per text space for ingestion and one for queries, so both
+    paths read and fill the same cache.
+    """
+
+    def __init__(self, embedding_config: TextSimilarityEmbeddingConfig) -> None:
+        super().__init__(embedding_config)
+        self._disk_cache = get_embedding_cache(embedding_config.model_name)
+        self._pool = get_embedding_pool(embedding_config.model_name, embedding_config.model_cache_dir)
+        self._speculative = get_speculative_embeddings(embedding_config.model_name)
+
+    def embed_multiple(self, inputs, context: ExecutionContext) -> list[Vector]:
+        unique_inputs = list(dict.fromkeys(inputs))
+        by_text: dict[str, Vector] = {}
+        if self._speculative is not None and context.is_query_context:
+            speculated = self._speculative.take(unique_inputs)
+            by_text = {text: Vector(vector.astype(np.float64)) for text, vector in speculated.items()}
+        missing = [text for text in unique_inputs if text not in by_text]
+        if self._disk_cache is not None and missing:
+            cached, found = self._disk_cache.get_many(missing)
+            by_text.update(
+                (text, Vector(cached[row].astype(np.float64))) for row, text in enumerate(missing) if found[row]
+            )
+            missing = [text for row, text in enumerate(missing) if not found[row]]
+        if missing:
+            new_vectors = self._embed_missing(missing, context)
+            if self._disk_cache is not None:
+                self._disk_cache.put_many(missing, np.stack([vector.value for vector in new_vectors]))
+            by_text.update(zip(missing, new_vectors))
+        return [by_text[text] for text in inputs]
+
+    def _embed_missing(self, texts: list[str], context: ExecutionContext) -> list[Vector]:
+        # Queries are a handful of texts and latency-bound; only ingestion is worth fanning out
+        if self._pool is None or context.is_query_context or len(texts) <= _pool_batch_size:
+            return super().embed_multiple(texts, context)
+        return [Vector(row.astype(np.float64)) for row in self._pool.embed(texts)]
+
+
+def _register() -> None:
+    embedding_factory.EMBEDDING_BY_CONFIG_CLASS[TextSimilarityEmbeddingConfig] = ProcurementTextEmbedding
+
+
+def install_embedding_cache(directory: str) -> None:
+    """Route every TextSimilaritySpace through the disk cache. Call before the executor runs."""
+    global _cache_dir
+    _cache_dir = directory
+    _register()
+    logger.info("Embedding cache enabled at {}", directory)
+
+
+def install_embedding_pool(workers: int, batch_size: int) -> None:
+    """Embed large ingestion batches in `workers` processes. Call before the executor runs."""
+    global _pool_workers, _pool_batch_size
+    _pool_workers, _pool_batch_size = workers, batch_size
+    _register()
+    logger.info("Embedding ingestion batches with {} worker processes", workers)
+
+
+def install_speculative_embedding(space: sl.TextSimilaritySpace) -> SpeculativeEmbeddings:
+    """Let queries on `space` take text embeddings started ahead of time. Call before the executor runs."""
+    config = space.transformation_config.embedding_config
+    _register()
+    # Created before it is registered, so the worker embeds through the cache and model directly
+    speculative = SpeculativeEmbeddings(config.model_name, query_text_embedder(space))
+    _speculations[config.model_name] = speculative
+    return speculative
+
+
+def warm_up_text_models(index: sl.Index) -> None:
+    """
+    Load the model of every text space in `index` into Superlinked's model cache,
+    so the first request or ingest does not pay for it. Safe to run in a thread.
+    """
+    for space in index._spaces:
+        if not isinstance(space, sl.TextSimilaritySpace):
+            continue
+        config = space.transformation_config.embedding_config
+        manager = config.text_model_handler.create_manager(config.model_name, config.model_cache_dir)
+        if isinstance(manager, SentenceTransformerManager):
+            start = time.perf_counter()
+            manager._get_embedding_model(1)
+            logger.info("Loaded {} in {:.2f}s", config.model_name, time.perf_counter() - start)
+
+
+def query_text_embedder(space: sl.TextSimilaritySpace) -> Callable[[Sequence[str]], np.ndarray]:
+    """
+    Embed texts the way `space` embeds query text, through the same model and caches.
+    The model is loaded on the first call.
+    """
+    config = space.transformation_config.embedding_config
+    embedding = embedding_factory.EmbeddingFactory.create_embedding(config)
+
+    def embed(texts: Sequence[str]) -> np.ndarray:
+        vectors = embedding.embed_multiple(list(texts), ExecutionContext(ExecutionEnvironment.QUERY))
+        return np.array([vector.value for vector in vectors], dtype=np.float32)
+
+    return embed
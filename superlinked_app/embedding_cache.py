@@ -0,0 +1,221 @@
+# procurement/embedding_cache.py
+import fcntl
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Sequence
+
+import numpy as np
+from loguru import logger
+
+KEY_DTYPE = np.dtype([("hi", "<u8"), ("lo", "<u8")])
+INITIAL_CAPACITY = 4096
+# New keys are looked up in a dict until there are enough of them to re-sort the index
+PENDING_MERGE_THRESHOLD = 4096
+
+
+def text_key(model_name: str, text: str) -> tuple[int, int]:
+    """128-bit content address of `text` as embedded by `model_name`."""
+    digest = hashlib.blake2b(f"{model_name}\0{text}".encode("utf-8"), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little")
+
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed cache of text embeddings for one model.
+
+    Vectors live in a memory-mapped float32 matrix (`vectors.f32`) and their keys
+    in an append-only file of 16-byte records (`keys.bin`) in the same row order.
+    A key is only appended after its vector is on disk, so the key file is always
+    the source of truth for how many rows are valid. Lookups go through a sorted
+    copy of the keys, which keeps the in-memory index at 24 bytes per entry.
+    One process writes a cache directory at a time: it holds an exclusive lock on
+    `writer.lock`, and other processes (e.g. further uvicorn workers) open the
+    cache read-only, serving the rows written before they opened it.
+    """
+
+    def __init__(self, directory: str, model_name: str) -> None:
+        self._model_name = model_name
+        self._directory = os.path.join(directory, re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name))
+        self._lock = threading.Lock()
+        self._dimension: int | None = None
+        self._capacity = 0
+        self._count = 0
+        self._vectors: np.memmap | None = None
+        self._sorted_keys = np.empty(0, dtype=KEY_DTYPE)
+        self._sorted_rows = np.empty(0, dtype=np.int64)
+        self._pending: dict[tuple[int, int], int] = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock_file = self._acquire_writer_lock()
+        self._load()
+
+    @property
+    def read_only(self) -> bool:
+        return self._lock_file is None
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self._directory, "vectors.f32")
+
+    @property
+    def _keys_path(self) -> str:
+        return os.path.join(self._directory, "keys.bin")
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self._directory, "meta.json")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def get_many(self, texts: Sequence[str]) -> tuple[np.ndarray | None, np.ndarray]:
+        """Return (vectors, found): rows of `vectors` are only meaningful where `found` is True."""
+        found = np.zeros(len(texts), dtype=bool)
+        with self._lock:
+            if self._dimension is None or not texts:
+                self.misses += len(texts)
+                return None, found
+            rows = self._find_rows([text_key(self._model_name, text) for text in texts])
+            found = rows >= 0
+            vectors = np.zeros((len(texts), self._dimension), dtype=np.float32)
+            vectors[found] = self._vectors[rows[found]]
+            self.hits += int(found.sum())
+            self.misses += int((~found).sum())
+        return vectors, found
+
+    def put_many(self, texts: Sequence[str], vectors: np.ndarray) -> None:
+        if not len(texts):
+            return
+        if self.read_only:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            if self._dimension is None:
+                self._create(vectors.shape[1])
+            all_keys = [text_key(self._model_name, text) for text in texts]
+            existing = self._find_rows(all_keys)
+            keys, rows, seen = [], [], set()
+            for row, key in enumerate(all_keys):
+                if existing[row] >= 0 or key in seen:
+                    continue
+                seen.add(key)
+                keys.append(key)
+                rows.append(row)
+            if keys:
+                self._append(keys, vectors[rows])
+
+    def _find_rows(self, keys: list[tuple[int, int]]) -> np.ndarray:
+        rows = np.full(len(keys), -1, dtype=np.int64)
+        if len(self._sorted_keys):
+            needles = np.array(keys, dtype=KEY_DTYPE)
+            positions = np.minimum(np.searchsorted(self._sorted_keys, needles), len(self._sorted_keys) - 1)
+            matched = self._sorted_keys[positions] == needles
+            rows[matched] = self._sorted_rows[positions[matched]]
+        if self._pending:
+            for i in np.flatnonzero(rows < 0):
+                rows[i] = self._pending.get(keys[i], -1)
+        return rows
+
+    def _append(self, keys: list[tuple[int, int]], vectors: np.ndarray) -> None:
+        self._ensure_capacity(self._count + len(keys))
+        start = self._count
+        self._vectors[start:start + len(keys)] = vectors
+        self._vectors.flush()
+        with open(self._keys_path, "ab") as f:
+            f.write(np.array(keys, dtype=KEY_DTYPE).tobytes())
+        for offset, key in enumerate(keys):
+            self._pending[key] = start + offset
+        self._count += len(keys)
+        if len(self._pending) >= PENDING_MERGE_THRESHOLD:
+            self._merge_pending()
+
+    def _merge_pending(self) -> None:
+        keys = np.concatenate([self._sorted_keys, np.array(list(self._pending), dtype=KEY_DTYPE)])
+        rows = np.concatenate([self._sorted_rows, np.fromiter(self._pending.values(), dtype=np.int64)])
+        order = np.argsort(keys, kind="stable")
+        self._sorted_keys, self._sorted_rows = keys[order], rows[order]
+        self._pending.clear()
+
+    def _ensure_capacity(self, rows: int) -> None:
+        if rows <= self._capacity:
+            return
+        capacity = max(INITIAL_CAPACITY, self._capacity)
+        while capacity < rows:
+            capacity *= 2
+        if self._vectors is not None:
+            self._vectors.flush()
+            del self._vectors
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(capacity * self._dimension * 4)
+        self._capacity = capacity
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self._dimension))
+
+    def _acquire_writer_lock(self):
+        """The open lock file if this process may write the directory, None if another one does."""
+        os.makedirs(self._directory, exist_ok=True)
+        lock_file = open(os.path.join(self._directory, "writer.lock"), "a+b")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            logger.warning("Embedding cache at {} is written by another process; opening it read-only", self._directory)
+            return None
+        return lock_file
+
+    def _create(self, dimension: int) -> None:
+        self._dimension = dimension
+        with open(self._meta_path, "w", encoding="utf-8") as f:
+            json.dump({"model_name": self._model_name, "dimension": dimension}, f)
+        open(self._keys_path, "wb").close()
+        self._ensure_capacity(INITIAL_CAPACITY)
+
+    def _load(self) -> None:
+        if not os.path.isfile(self._meta_path):
+            return
+        with open(self._meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["model_name"] != self._model_name:
+            logger.warning("Ignoring embedding cache at {}: built for {}", self._directory, meta["model_name"])
+            return
+        self._dimension = int(meta["dimension"])
+        keys = np.empty(0, dtype=KEY_DTYPE)
+        if os.path.isfile(self._keys_path):
+            with open(self._keys_path, "rb" if self.read_only else "r+b") as f:
+                raw = f.read()
+                # A crash in the middle of an append leaves a torn last record; the writer may be appending one
+                valid = len(raw) - len(raw) % KEY_DTYPE.itemsize
+                if not self.read_only:
+                    f.truncate(valid)
+            keys = np.frombuffer(raw[:valid], dtype=KEY_DTYPE).copy()
+        vector_rows = 0
+        if os.path.isfile(self._vectors_path):
+            vector_rows = os.path.getsize(self._vectors_path) // (self._dimension * 4)
+        keys = keys[:vector_rows]
+        self._count = len(keys)
+        self._capacity = vector_rows
+        if vector_rows:
+            self._vectors = np.memmap(
+                self._vectors_path,
+                dtype=np.float32,
+                mode="r" if self.read_only else "r+",
+                shape=(vector_rows, self._dimension),
+            )
+        order = np.argsort(keys, kind="stable")
+        self._sorted_keys = keys[order]
+        self._sorted_rows = order.astype(np.int64)
+        logger.info("Loaded {} cached embeddings for {} from {}", self._count, self._model_name, self._directory)
+
+    def close(self) -> None:
+        """Flush the vectors and let another process write the directory."""
+        with self._lock:
+            if self._vectors is not None and not self.read_only:
+                self._vectors.flush()
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+
+    def stats(self) -> dict:
+        return {"entries": self._count, "hits": self.hits, "misses": self.misses, "read_only": self.read_only}
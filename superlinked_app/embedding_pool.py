@@ -0,0 +1,182 @@
+# procurement/embedding_pool.py
+import atexit
+import multiprocessing as mp
+import os
+import queue
+import threading
+import traceback
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Callable, Sequence
+
+import numpy as np
+from loguru import logger
+
+WORKER_POLL_SECONDS = 1.0
+
+
+def load_sentence_transformer(model_name: str, model_cache_dir: Path | None = None):
+    """Load the model the same way Superlinked does, so pool vectors match in-process ones."""
+    from superlinked.framework.common.settings import Settings
+    from superlinked.framework.common.space.embedding.model_manager import DEFAULT_MODEL_CACHE_DIR
+    from superlinked.framework.common.space.embedding.sentence_transformer_model_cache import (
+        SentenceTransformerModelCache,
+    )
+
+    # The space's directory, else the one Superlinked's ModelManager falls back to
+    model_cache_dir = model_cache_dir or Path(Settings().MODEL_CACHE_DIR or DEFAULT_MODEL_CACHE_DIR)
+    return SentenceTransformerModelCache.initialize_model(model_name, "cpu", model_cache_dir)
+
+
+def _encode(model, texts: list[str]) -> np.ndarray:
+    return np.asarray(model.encode(texts, prompt_name=getattr(model, "default_prompt_name", None)), dtype=np.float32)
+
+
+def _worker(model_name: str, loader: Callable, threads: int, tasks, results) -> None:
+    # Split the cores between workers; torch reads this when it is first imported
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    try:
+        model = loader(model_name)
+        results.put(("ready", _encode(model, [""]).shape[1], None))
+    except Exception:
+        results.put(("error", None, traceback.format_exc()))
+        return
+
+    attached: shared_memory.SharedMemory | None = None
+    while (task := tasks.get()) is not None:
+        task_id, shm_name, start, texts = task
+        try:
+            if attached is None or attached.name != shm_name:
+                if attached is not None:
+                    attached.close()
+                attached = shared_memory.SharedMemory(name=shm_name)
+            vectors = _encode(model, texts)
+            out = np.ndarray((start + len(texts), vectors.shape[1]), dtype=np.float32, buffer=attached.buf)
+            out[start:] = vectors
+            del out
+            results.put(("done", task_id, None))
+        except Exception:
+            results.put(("error", task_id, traceback.format_exc()))
+    if attached is not None:
+        attached.close()
+
+
+class EmbeddingPool:
+    """
+    Worker processes that each hold one copy of the model. Texts go out over a
+    queue in batches; vectors come back through a shared-memory buffer, each batch
+    writing its own row range, so the result is in input order without pickling
+    any arrays. Workers are started on first use.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        workers: int,
+        batch_size: int = 256,
+        loader: Callable = load_sentence_transformer,
+    ) -> None:
+        self._model_name = model_name
+        self._workers = workers
+        self._batch_size = batch_size
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._processes: list = []
+        self._tasks = None
+        self._results = None
+        self._dimension = 0
+        self._buffer: shared_memory.SharedMemory | None = None
+        self._next_task = 0
+        atexit.register(self.close)
+
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed `texts` across the workers; row i of the result belongs to texts[i]."""
+        texts = list(texts)
+        with self._lock:
+            self._start()
+            if not texts:
+                return np.empty((0, self._dimension), dtype=np.float32)
+            buffer = self._reserve(len(texts))
+            pending = set()
+            for start in range(0, len(texts), self._batch_size):
+                self._next_task += 1
+                pending.add(self._next_task)
+                self._tasks.put((self._next_task, buffer.name, start, texts[start:start + self._batch_size]))
+            while pending:
+                kind, task_id, error = self._receive()
+                if kind == "error":
+                    # Other batches may still be writing into the buffer; do not reuse it
+                    self._shutdown()
+                    raise RuntimeError(f"Embedding worker failed:\n{error}")
+                pending.discard(task_id)
+            view = np.ndarray((len(texts), self._dimension), dtype=np.float32, buffer=buffer.buf)
+            result = view.copy()
+            del view
+            return result
+
+    def close(self) -> None:
+        with self._lock:
+            for _ in self._processes:
+                self._tasks.put(None)
+            for process in self._processes:
+                process.join(timeout=10)
+                if process.is_alive():
+                    process.terminate()
+            self._processes = []
+            self._release_buffer()
+
+    def _start(self) -> None:
+        if self._processes:
+            return
+        context = mp.get_context("spawn")
+        self._tasks = context.Queue()
+        self._results = context.Queue()
+        threads = max(1, (os.cpu_count() or 1) // self._workers)
+        for _ in range(self._workers):
+            process = context.Process(
+                target=_worker,
+                args=(self._model_name, self._loader, threads, self._tasks, self._results),
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+        for _ in self._processes:
+            kind, dimension, error = self._receive()
+            if kind == "error":
+                self._shutdown()
+                raise RuntimeError(f"Embedding worker failed to start:\n{error}")
+            self._dimension = dimension
+        logger.info("Started {} embedding workers for {}", self._workers, self._model_name)
+
+    def _shutdown(self) -> None:
+        """Stop workers without waiting for them, used once a worker has failed."""
+        for process in self._processes:
+            process.terminate()
+        self._processes = []
+        self._release_buffer()
+
+    def _receive(self) -> tuple:
+        while True:
+            try:
+                return self._results.get(timeout=WORKER_POLL_SECONDS)
+            except queue.Empty:
+                if not all(process.is_alive() for process in self._processes):
+                    self._shutdown()
+                    raise RuntimeError("An embedding worker exited unexpectedly")
+
+    def _reserve(self, rows: int) -> shared_memory.SharedMemory:
+        size = rows * self._dimension * 4
+        if self._buffer is None or self._buffer.size < size:
+            self._release_buffer()
+            self._buffer = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        return self._buffer
+
+    def _release_buffer(self) -> None:
+        if self._buffer is not None:
+            self._buffer.close()
+            self._buffer.unlink()
+            self._buffer = None
@@ -0,0 +1,34 @@
+# procurement/executor.py
+from superlinked import framework as sl
+from superlinked.framework.dsl.query.query_descriptor import QueryDescriptor
+from superlinked.framework.dsl.query.result import QueryResult
+
+
+class ProcurementRestExecutor(sl.RestExecutor):
+    """
+    RestExecutor that keeps the RestApp the server starts from it, so our own
+    routes can run its queries. The executor's query route runs them on the event
+    loop; ours run them in worker threads.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.rest_app = None
+
+    def run(self):
+        self.rest_app = super().run()
+        return self.rest_app
+
+    def query(self, path: str, payload: dict, include_metadata: bool = False) -> QueryResult:
+        """Run the query registered at `path` with the request payload, like the executor's route does."""
+        if self.rest_app is None:
+            raise RuntimeError("The executor has not been started")
+        return self.rest_app.handler._query_handler(payload, path, include_metadata)
+
+    def query_descriptor(self, path: str) -> QueryDescriptor:
+        """The query served at `path`, e.g. /api/v1/search/procurement_query."""
+        config = self._endpoint_configuration
+        for rest_query in self._queries:
+            if path == f"{config.api_root_path.rstrip('/')}/{config.query_path_prefix}/{rest_query.path}":
+                return rest_query.query_descriptor
+        raise KeyError(path)
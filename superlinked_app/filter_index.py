@@ -0,0 +1,170 @@
+# procurement/filter_index.py
+import threading
+from typing import Any, Collection, Mapping, Sequence
+
+import numpy as np
+from superlinked.framework.common.interface.comparison_operand import ComparisonOperation
+from superlinked.framework.common.interface.comparison_operation_type import ComparisonOperationType
+
+MISSING = -1
+# Codes per row are allocated in steps of at least this many rows
+MIN_GROWTH = 1024
+_INCLUDE = (ComparisonOperationType.EQUAL, ComparisonOperationType.IN)
+_EXCLUDE = (ComparisonOperationType.NOT_EQUAL, ComparisonOperationType.NOT_IN)
+
+
+class CategoricalFilterIndex:
+    """
+    Inverted index over categorical fields (department, category, brand, ...),
+    keyed by row position in the VectorMatrix. Each value maps to the sorted
+    positions of the rows that have it, and each row keeps the code of its value
+    per field, so equality, `in_` and `not_in_` filters are answered with set
+    operations instead of evaluating every row:
+
+    - the most selective positive filter (`==` / `in_`) gives the starting
+      positions, the union of its values' position lists;
+    - every other indexed filter narrows those positions by their codes, so the
+      cost follows the size of the match set, not of the catalog;
+    - with only exclusions, the positions are the rows whose codes are not excluded.
+
+    Filters every row passes (such as the schema filter of an unfiltered search)
+    are dropped first, so they cost nothing and leave the positions at None.
+
+    Filters on other fields, OR groups and filters on missing values are left to
+    the caller to evaluate on the candidates.
+    """
+
+    def __init__(self, fields: Collection[str]) -> None:
+        self.fields = set(fields)
+        self._lock = threading.Lock()
+        self._rows = 0
+        self._codes = {field: np.full(0, MISSING, dtype=np.int32) for field in self.fields}
+        self._value_codes: dict[str, dict[Any, int]] = {field: {} for field in self.fields}
+        # Positions per code as appended; rows whose value changed are dropped when the list is next sorted
+        self._postings: dict[str, list[list[int]]] = {field: [] for field in self.fields}
+        self._sorted: dict[str, list[np.ndarray | None]] = {field: [] for field in self.fields}
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def update(self, position: int, row: Mapping[str, Any]) -> None:
+        """Index the current values of the row at `position`."""
+        with self._lock:
+            self._reserve(position + 1)
+            self._rows = max(self._rows, position + 1)
+            for field in self.fields:
+                code = self._code(field, row.get(field))
+                old = int(self._codes[field][position])
+                if code == old:
+                    continue
+                self._codes[field][position] = code
+                if old != MISSING:
+                    self._sorted[field][old] = None
+                if code != MISSING:
+                    self._postings[field][code].append(position)
+                    self._sorted[field][code] = None
+
+    def select(
+        self, filters: Sequence[ComparisonOperation]
+    ) -> tuple[np.ndarray | None, list[ComparisonOperation]]:
+        """
+        Positions of the rows passing the indexed filters (None for every row), and
+        the filters the index could not answer.
+        """
+        conditions, residual = [], []
+        for filter_ in filters:
+            condition = self._condition(filter_)
+            if condition is None:
+                residual.append(filter_)
+            else:
+                conditions.append(condition)
+        if not conditions:
+            return None, residual
+        with self._lock:
+            return self._positions(conditions), residual
+
+    def answers(self, filter_: ComparisonOperation) -> bool:
+        return self._condition(filter_) is not None
+
+    def stats(self) -> dict:
+        return {"rows": self._rows, "values": {field: len(codes) for field, codes in self._value_codes.items()}}
+
+    def _condition(self, filter_: ComparisonOperation) -> tuple[str, list, bool] | None:
+        """(field, values, exclude) of a filter the index answers, or None."""
+        field = getattr(filter_._operand, "name", None)
+        if filter_._group_key is not None or field not in self.fields:
+            return None
+        if filter_._op not in _INCLUDE and filter_._op not in _EXCLUDE:
+            return None
+        values = list(filter_._get_other_as_sequence())
+        # Rows without a value are not indexed; unhashable values cannot be looked up
+        if any(value is None or not isinstance(value, (str, int, float, bool)) for value in values):
+            return None
+        return field, values, filter_._op in _EXCLUDE
+
+    def _positions(self, conditions: list[tuple[str, list, bool]]) -> np.ndarray | None:
+        """Holds the lock."""
+        resolved = [
+            (field, np.unique([self._value_codes[field][v] for v in values if v in self._value_codes[field]]), exclude)
+            for field, values, exclude in conditions
+        ]
+        resolved = [condition for condition in resolved if not self._passes_every_row(*condition)]
+        if not resolved:
+            return None
+        positives = [condition for condition in resolved if not condition[2]]
+        if positives:
+            first = min(positives, key=lambda condition: self._estimate(condition[0], condition[1]))
+            return self._narrow(self._union(first[0], first[1]), [c for c in resolved if c is not first])
+        # Only exclusions of values some rows have: check every row's codes
+        positions = self._narrow(np.arange(self._rows), resolved)
+        return None if len(positions) == self._rows else positions
+
+    def _passes_every_row(self, field: str, wanted: np.ndarray, exclude: bool) -> bool:
+        if exclude:
+            return self._estimate(field, wanted) == 0
+        # Postings may still hold rows that moved to another value; count the current ones when it matters
+        return self._estimate(field, wanted) >= self._rows and sum(
+            len(self._posting(field, int(code))) for code in wanted
+        ) == self._rows
+
+    def _narrow(self, positions: np.ndarray, conditions: list[tuple[str, np.ndarray, bool]]) -> np.ndarray:
+        for field, wanted, exclude in conditions:
+            matches = np.isin(self._codes[field][positions], wanted)
+            positions = positions[~matches if exclude else matches]
+        return positions
+
+    def _estimate(self, field: str, wanted: np.ndarray) -> int:
+        return sum(len(self._postings[field][code]) for code in wanted)
+
+    def _union(self, field: str, wanted: np.ndarray) -> np.ndarray:
+        lists = [self._posting(field, int(code)) for code in wanted]
+        if not lists:
+            return np.empty(0, dtype=np.intp)
+        return lists[0] if len(lists) == 1 else np.sort(np.concatenate(lists))
+
+    def _posting(self, field: str, code: int) -> np.ndarray:
+        cached = self._sorted[field][code]
+        if cached is None:
+            positions = np.unique(np.asarray(self._postings[field][code], dtype=np.intp))
+            cached = positions[self._codes[field][positions] == code]
+            if len(cached) != len(self._postings[field][code]):
+                self._postings[field][code] = cached.tolist()
+            self._sorted[field][code] = cached
+        return cached
+
+    def _code(self, field: str, value: Any) -> int:
+        if value is None or not isinstance(value, (str, int, float, bool)):
+            return MISSING
+        value_codes = self._value_codes[field]
+        if value not in value_codes:
+            value_codes[value] = len(value_codes)
+            self._postings[field].append([])
+            self._sorted[field].append(None)
+        return value_codes[value]
+
+    def _reserve(self, rows: int) -> None:
+        for field, codes in self._codes.items():
+            if rows > len(codes):
+                grown = np.full(max(rows, len(codes) + max(MIN_GROWTH, len(codes) // 2)), MISSING, dtype=np.int32)
+                grown[: len(codes)] = codes
+                self._codes[field] = grown
@@ -0,0 +1,152 @@
+# procurement/ingestion.py
+import os
+import time
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+import pandas as pd
+from loguru import logger
+
+from .delta import FingerprintStore
+from .schema import product_schema
+from .snapshot import is_current, iter_snapshot_batches
+from .validation import Quarantine, validate_frame
+
+# Columns the schema actually uses; the CSV carries extra ones (sku, dates, ...)
+SCHEMA_COLUMNS = [product_schema.id.name] + [field.name for field in product_schema.schema_fields]
+
+ROW_SIZE_SAMPLE = 1000
+
+
+@dataclass
+class IngestionReport:
+    """Counters collected while pushing batches into a source."""
+
+    rows: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+    # Delta ingestion only: rows written with a new embedding / payload-only / skipped
+    reembedded: int = 0
+    payload_only: int = 0
+    unchanged: int = 0
+    # Rows that failed validation and were not written
+    quarantined: int = 0
+    # File the rows were read from, when ingesting the catalog
+    source: str = ""
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+
+def estimate_row_bytes(path: str, sample_rows: int = ROW_SIZE_SAMPLE) -> float:
+    """Average size in bytes of a CSV data row, measured on the first `sample_rows` rows."""
+    with open(path, "rb") as f:
+        f.readline()  # header
+        sizes = [len(line) for _, line in zip(range(sample_rows), f)]
+    return sum(sizes) / len(sizes) if sizes else 1.0
+
+
+def plan_batch_rows(path: str, max_rows: int, max_bytes: int) -> int:
+    """Rows per batch so that a batch stays under both the row and the byte budget."""
+    rows_within_bytes = int(max_bytes // estimate_row_bytes(path))
+    return max(1, min(max_rows, rows_within_bytes))
+
+
+def iter_csv_batches(path: str, max_rows: int, max_bytes: int) -> Iterator[pd.DataFrame]:
+    """Read the catalog CSV in large batches, parsing only the schema columns."""
+    batch_rows = plan_batch_rows(path, max_rows, max_bytes)
+    logger.info("Reading {} in batches of {} rows", path, batch_rows)
+    with pd.read_csv(path, usecols=SCHEMA_COLUMNS, chunksize=batch_rows) as reader:
+        yield from reader
+
+
+def ingest_frames(
+    source,
+    frames: Iterable[pd.DataFrame],
+    fingerprints: FingerprintStore | None = None,
+    quarantine: Quarantine | None = None,
+) -> IngestionReport:
+    """
+    Push each frame to `source` with a single `put`, so every batch is embedded
+    in one model call and written to the vector database in one bulk upsert.
+
+    With `fingerprints`, unchanged rows are skipped; rows whose name did not change
+    get their text vector from the embedding cache, so only renamed or new products
+    are re-embedded.
+
+    Every frame is validated first; rows that would fail Superlinked's parser are
+    dropped (and appended to `quarantine` if given) instead of failing the batch.
+    """
+    report = IngestionReport()
+    start = time.perf_counter()
+    for frame in frames:
+        report.rows += len(frame)
+        report.batches += 1
+        validated = validate_frame(frame)
+        frame = validated.frame
+        if len(validated.rejected):
+            report.quarantined += len(validated.rejected)
+            if quarantine is not None:
+                quarantine.write(validated.rejected)
+        delta = None
+        if fingerprints is not None:
+            delta = fingerprints.diff(frame)
+            report.reembedded += int(delta.reembed.sum())
+            report.payload_only += int(delta.payload_only.sum())
+            report.unchanged += delta.unchanged_count
+            frame = delta.changed_frame()
+        if len(frame):
+            source.put([frame])
+        if delta is not None:
+            fingerprints.commit(delta)
+        logger.debug("Ingested batch {} ({} rows written)", report.batches, len(frame))
+    report.seconds = time.perf_counter() - start
+    if fingerprints is not None:
+        fingerprints.save()
+        logger.info(
+            "Delta: {} re-embedded, {} payload-only, {} unchanged",
+            report.reembedded, report.payload_only, report.unchanged,
+        )
+    if report.quarantined:
+        logger.warning("{} rows failed validation and were not ingested", report.quarantined)
+    logger.info(
+        "Ingested {} rows in {} batches in {:.2f}s ({:.1f} rows/sec)",
+        report.rows, report.batches, report.seconds, report.rows_per_second,
+    )
+    return report
+
+
+def ingest_csv(
+    source,
+    path: str,
+    max_rows: int,
+    max_bytes: int,
+    fingerprints: FingerprintStore | None = None,
+    quarantine: Quarantine | None = None,
+) -> IngestionReport:
+    return ingest_frames(source, iter_csv_batches(path, max_rows, max_bytes), fingerprints, quarantine)
+
+
+def ingest_catalog(
+    source,
+    csv_path: str,
+    snapshot_path: str,
+    max_rows: int,
+    max_bytes: int,
+    fingerprints: FingerprintStore | None = None,
+    quarantine: Quarantine | None = None,
+) -> IngestionReport:
+    """Ingest from the Arrow snapshot when it matches the CSV, otherwise parse the CSV."""
+    if is_current(snapshot_path, csv_path):
+        logger.info("Loading the catalog from {}", snapshot_path)
+        frames = iter_snapshot_batches(snapshot_path, max_rows, max_bytes)
+        report = ingest_frames(source, frames, fingerprints, quarantine)
+        report.source = snapshot_path
+        return report
+    if snapshot_path and os.path.isfile(snapshot_path):
+        logger.warning("Snapshot {} is out of date with {}, reading the CSV", snapshot_path, csv_path)
+    logger.info("Loading the catalog from {}", csv_path)
+    report = ingest_csv(source, csv_path, max_rows, max_bytes, fingerprints, quarantine)
+    report.source = csv_path
+    return report
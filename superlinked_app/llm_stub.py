@@ -0,0 +1,205 @@
+# procurement/llm_stub.py
+"""
+Local stand-in for the OpenAI chat completions API, for benchmarking and load
+testing procurement_query without calling OpenAI.
+
+In replay mode extraction responses are served from a recordings file (one JSON
+object per line), keyed by the natural query, after a latency drawn from
+`--latency`. Queries that were never recorded get an empty extraction. In record
+mode requests are forwarded to `--upstream` with the caller's API key, and each
+response is appended to the recordings file together with its latency.
+
+    python -m superlinked_app.llm_stub --recordings data/llm_recordings.jsonl --record
+    python -m superlinked_app.llm_stub --recordings data/llm_recordings.jsonl --latency lognormal:0.9,0.4
+
+Point the app at it with OPENAI_BASE_URL=http://localhost:8090/v1.
+
+Latency specs: `none`, `fixed:SECONDS`, `uniform:LOW,HIGH`, `normal:MEAN,STD`,
+`lognormal:MEDIAN,SIGMA` and `recorded` (the latency measured when recording).
+"""
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Callable
+
+import httpx
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from loguru import logger
+
+from .nlq_cache import normalize_query
+
+DEFAULT_UPSTREAM = "https://api.openai.com/v1"
+
+
+def latency_sampler(spec: str, seed: int | None = None) -> Callable[[float | None], float]:
+    """Parse a latency spec into a function of the recorded latency (if any) returning seconds to wait."""
+    rng = np.random.default_rng(seed)
+    kind, _, args = spec.partition(":")
+    values = [float(value) for value in args.split(",") if value]
+    samplers = {
+        "none": lambda recorded: 0.0,
+        "fixed": lambda recorded: values[0],
+        "uniform": lambda recorded: rng.uniform(values[0], values[1]),
+        "normal": lambda recorded: max(0.0, rng.normal(values[0], values[1])),
+        "lognormal": lambda recorded: values[0] * float(np.exp(rng.normal(0.0, values[1]))),
+        "recorded": lambda recorded: recorded or 0.0,
+    }
+    expected_args = {"none": 0, "fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2, "recorded": 0}
+    if kind not in samplers or len(values) != expected_args[kind]:
+        raise ValueError(f"Invalid latency spec {spec!r}")
+    return samplers[kind]
+
+
+def _user_message(body: dict) -> str:
+    return next(
+        (message.get("content") or "" for message in reversed(body.get("messages", [])) if message.get("role") == "user"),
+        "",
+    )
+
+
+def _tool_name(body: dict) -> str | None:
+    choice = body.get("tool_choice")
+    if isinstance(choice, dict):
+        return choice.get("function", {}).get("name")
+    tools = body.get("tools") or []
+    return tools[0]["function"]["name"] if tools else None
+
+
+def _arguments(response: dict) -> str | None:
+    """Arguments of the tool call (or the content, for JSON modes) of a recorded chat completion."""
+    try:
+        message = response["choices"][0]["message"]
+    except (KeyError, IndexError, TypeError):
+        return None
+    if message.get("tool_calls"):
+        return message["tool_calls"][0]["function"]["arguments"]
+    return message.get("content")
+
+
+def completion(body: dict, arguments: str) -> dict:
+    """Chat completion answering `body` with `arguments`, as a tool call if the request offered tools."""
+    message: dict = {"role": "assistant", "content": None}
+    if (name := _tool_name(body)) is not None:
+        message["tool_calls"] = [
+            {"id": f"call_{uuid.uuid4().hex[:24]}", "type": "function", "function": {"name": name, "arguments": arguments}}
+        ]
+        finish_reason = "tool_calls"
+    else:
+        message["content"] = arguments
+        finish_reason = "stop"
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{"index": 0, "message": message, "finish_reason": finish_reason, "logprobs": None}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+class Recordings:
+    """Recorded extractions by normalized natural query, appended to a JSONL file as they are captured."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._entries: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[normalize_query(entry["query"])] = entry
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, query: str) -> dict | None:
+        return self._entries.get(normalize_query(query))
+
+    def add(self, query: str, arguments: str, latency_seconds: float, model: str) -> None:
+        entry = {"query": query, "arguments": arguments, "latency_seconds": round(latency_seconds, 4), "model": model}
+        with self._lock:
+            self._entries[normalize_query(query)] = entry
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+
+def create_stub_app(
+    recordings: Recordings,
+    latency: str = "recorded",
+    record: bool = False,
+    upstream: str = DEFAULT_UPSTREAM,
+    upstream_client: httpx.AsyncClient | None = None,
+    seed: int | None = None,
+) -> FastAPI:
+    """OpenAI-compatible app serving /v1/chat/completions from `recordings`, or recording from `upstream`."""
+    app = FastAPI(title="Procurement LLM stub")
+    sample_latency = latency_sampler(latency, seed)
+    client = upstream_client or httpx.AsyncClient(timeout=120)
+    app.state.counts = {"replayed": 0, "missing": 0, "recorded": 0}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request) -> JSONResponse:
+        body = await request.json()
+        query = _user_message(body)
+        if record:
+            start = time.perf_counter()
+            response = await client.post(
+                f"{upstream.rstrip('/')}/chat/completions",
+                json=body,
+                headers={"Authorization": request.headers.get("authorization", "")},
+            )
+            elapsed = time.perf_counter() - start
+            if response.status_code == 200 and (arguments := _arguments(response.json())) is not None:
+                recordings.add(query, arguments, elapsed, body.get("model", ""))
+                app.state.counts["recorded"] += 1
+            return JSONResponse(response.json(), status_code=response.status_code)
+
+        entry = recordings.get(query)
+        if entry is None:
+            app.state.counts["missing"] += 1
+            logger.warning("No recording for {!r}, answering with an empty extraction", query)
+        else:
+            app.state.counts["replayed"] += 1
+        await asyncio.sleep(sample_latency(entry["latency_seconds"] if entry else None))
+        return JSONResponse(completion(body, entry["arguments"] if entry else "{}"))
+
+    @app.get("/stats")
+    async def stats() -> dict:
+        return {"recordings": len(recordings), **app.state.counts}
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recordings", default="data/llm_recordings.jsonl", help="JSONL file of recorded responses")
+    parser.add_argument("--latency", default="recorded", help="latency distribution for replayed responses")
+    parser.add_argument("--record", action="store_true", help="forward to --upstream and record the responses")
+    parser.add_argument("--upstream", default=DEFAULT_UPSTREAM)
+    parser.add_argument("--seed", type=int, default=None, help="seed of the latency distribution")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    args = parser.parse_args()
+
+    recordings = Recordings(args.recordings)
+    logger.info(
+        "LLM stub {} {} ({} recordings), latency {}",
+        "recording to" if args.record else "replaying", args.recordings, len(recordings), args.latency,
+    )
+    app = create_stub_app(recordings, args.latency, args.record, args.upstream, seed=args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_config=None)
+
+
+if __name__ == "__main__":
+    main()
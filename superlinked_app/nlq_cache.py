@@ -0,0 +1,299 @@
+# procurement/nlq_cache.py
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Sequence
+
+import numpy as np
+from loguru import logger
+
+_WHITESPACE = re.compile(r"\s+")
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+# Semantic cache rows added at once when its matrix is full, at least
+MIN_GROWTH = 64
+
+
+def normalize_query(text: str) -> str:
+    """Case, surrounding/repeated whitespace and trailing punctuation do not change the extracted params."""
+    return _WHITESPACE.sub(" ", text.casefold()).strip().rstrip(".?!").strip()
+
+
+def prompt_fingerprint(*prompt_parts: str) -> str:
+    """Hash of everything besides the query that the LLM sees or is asked for."""
+    digest = hashlib.sha256()
+    for part in prompt_parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def cache_key(natural_query: str, *prompt_parts: str) -> str:
+    """
+    Key of an extraction: the normalized query plus everything else the LLM sees or
+    is asked for (system prompt, param descriptions and options, response schema, model).
+    Changing any of them in code starts a fresh set of entries.
+    """
+    return prompt_fingerprint(normalize_query(natural_query), *prompt_parts)
+
+
+class ParamCache:
+    """
+    Parameters extracted from natural queries, keyed by `cache_key`. An in-process
+    LRU of `max_entries` sits in front of an optional SQLite file shared by restarts
+    and by the server's worker processes. Entries expire `ttl_seconds` after they
+    were extracted.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 86400.0, path: str | None = None) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self._memory: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS nlq_params (key TEXT PRIMARY KEY, params TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def get(self, key: str) -> dict | None:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[0] > now:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return dict(entry[1])
+            if entry is not None:
+                del self._memory[key]
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT params, expires_at FROM nlq_params WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if row is not None:
+                    params = json.loads(row[0])
+                    self._remember(key, row[1], params)
+                    self.disk_hits += 1
+                    return dict(params)
+            self.misses += 1
+            return None
+
+    def put(self, key: str, params: dict) -> None:
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._remember(key, expires_at, params)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO nlq_params (key, params, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(params), expires_at),
+                )
+
+    def evict_expired(self) -> int:
+        """Drop expired entries from both tiers and return how many were removed from disk."""
+        now = time.time()
+        with self._lock:
+            for key in [key for key, (expires_at, _) in self._memory.items() if expires_at <= now]:
+                del self._memory[key]
+            if self._db is None:
+                return 0
+            removed = self._db.execute("DELETE FROM nlq_params WHERE expires_at <= ?", (now,)).rowcount
+        if removed:
+            logger.info("Evicted {} expired NLQ cache entries from {}", removed, self.path)
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM nlq_params")
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._memory),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+    def _remember(self, key: str, expires_at: float, params: dict) -> None:
+        self._memory[key] = (expires_at, params)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+
+@dataclass
+class SemanticMatch:
+    params: dict
+    similarity: float
+    natural_query: str
+
+
+class _QueryIndex:
+    """
+    Unit vectors of past queries for one prompt fingerprint; the oldest entry is
+    overwritten when full. Rows live in one matrix that grows by half its size up
+    to `max_entries`, so adding a query does not copy the others.
+    """
+
+    def __init__(self, dimension: int, max_entries: int) -> None:
+        self._matrix = np.zeros((0, dimension), dtype=np.float32)
+        self.queries: list[str] = []
+        self.params: list[dict] = []
+        self.max_entries = max_entries
+        self._next = 0
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._matrix[: len(self.queries)]
+
+    def add(self, vector: np.ndarray, natural_query: str, params: dict) -> None:
+        if len(self.queries) < self.max_entries:
+            self._reserve(len(self.queries) + 1)
+            self._matrix[len(self.queries)] = vector
+            self.queries.append(natural_query)
+            self.params.append(params)
+            return
+        self._matrix[self._next] = vector
+        self.queries[self._next] = natural_query
+        self.params[self._next] = params
+        self._next = (self._next + 1) % self.max_entries
+
+    def _reserve(self, rows: int) -> None:
+        if rows <= len(self._matrix):
+            return
+        capacity = min(self.max_entries, max(rows, len(self._matrix) + max(MIN_GROWTH, len(self._matrix) // 2)))
+        matrix = np.zeros((capacity, self._matrix.shape[1]), dtype=np.float32)
+        matrix[: len(self.queries)] = self._matrix[: len(self.queries)]
+        self._matrix = matrix
+
+
+def _numbers(text: str) -> list[str]:
+    return _NUMBER.findall(text)
+
+
+def _canonical(params: dict) -> dict:
+    """Params in a form where equal extractions compare equal (list order and float noise ignored)."""
+    canonical = {}
+    for name, value in params.items():
+        if isinstance(value, float):
+            value = round(value, 3)
+        elif isinstance(value, list):
+            value = sorted(map(str, value))
+        if value in (None, [], ""):
+            continue
+        canonical[name] = value
+    return canonical
+
+
+class SemanticParamCache:
+    """
+    Reuses the params extracted for an earlier query that means the same thing
+    ("popular dresses on a budget" / "cheap popular dresses"). Queries are embedded
+    with `embed` and compared by cosine similarity with past queries extracted under
+    the same prompt; a match at or above `threshold` that mentions the same numbers
+    is reused, since embeddings barely separate "under 5 dollars" from "under 50 dollars".
+
+    With `verify_rate` > 0 that fraction of matches is extracted again anyway and
+    compared with the reused params, to measure how often reuse changes the result.
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[Sequence[str]], np.ndarray],
+        threshold: float = 0.93,
+        max_entries: int = 4096,
+        verify_rate: float = 0.0,
+    ) -> None:
+        self.embed = embed
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.verify_rate = verify_rate
+        self._indexes: dict[str, _QueryIndex] = {}
+        self._lock = threading.Lock()
+        self._rng = np.random.default_rng()
+        self.hits = 0
+        self.misses = 0
+        self.verified = 0
+        self.disagreements = 0
+
+    def embed_query(self, natural_query: str) -> np.ndarray:
+        vector = np.asarray(self.embed([normalize_query(natural_query)])[0], dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def lookup(self, natural_query: str, vector: np.ndarray, fingerprint: str) -> SemanticMatch | None:
+        with self._lock:
+            match = self._closest(natural_query, vector, fingerprint, self.threshold)
+            if match is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return match
+
+    def nearest(self, natural_query: str, vector: np.ndarray, fingerprint: str, threshold: float) -> SemanticMatch | None:
+        """Like lookup with a different threshold, e.g. a looser one for a fallback; not counted in the stats."""
+        with self._lock:
+            return self._closest(natural_query, vector, fingerprint, threshold)
+
+    def _closest(self, natural_query: str, vector: np.ndarray, fingerprint: str, threshold: float) -> SemanticMatch | None:
+        index = self._indexes.get(fingerprint)
+        if index is None or not index.queries:
+            return None
+        similarities = index.vectors @ vector
+        numbers = _numbers(natural_query)
+        for row in np.argsort(-similarities):
+            if similarities[row] < threshold:
+                break
+            if _numbers(index.queries[row]) == numbers:
+                return SemanticMatch(dict(index.params[row]), float(similarities[row]), index.queries[row])
+        return None
+
+    def add(self, natural_query: str, vector: np.ndarray, fingerprint: str, params: dict) -> None:
+        with self._lock:
+            if fingerprint not in self._indexes:
+                self._indexes[fingerprint] = _QueryIndex(len(vector), self.max_entries)
+            self._indexes[fingerprint].add(vector, natural_query, params)
+
+    def should_verify(self) -> bool:
+        return self.verify_rate > 0 and self._rng.random() < self.verify_rate
+
+    def record_verification(self, match: SemanticMatch, natural_query: str, fresh: dict) -> bool:
+        """Count whether reusing `match` would have given the same params as extracting `natural_query`."""
+        same = _canonical(match.params) == _canonical(fresh)
+        with self._lock:
+            self.verified += 1
+            self.disagreements += not same
+        if not same:
+            logger.info(
+                "Semantic NLQ match {!r} ~ {!r} ({:.3f}) differs from a fresh extraction",
+                natural_query, match.natural_query, match.similarity,
+            )
+        return same
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": sum(len(index.queries) for index in self._indexes.values()),
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "verified": self.verified,
+            "disagreements": self.disagreements,
+            "disagreement_rate": self.disagreements / self.verified if self.verified else 0.0,
+        }
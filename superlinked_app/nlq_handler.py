@@ -0,0 +1,340 @@
+# procurement/nlq_handler.py
+import json
+import threading
+import time
+from functools import reduce
+from typing import Any, Mapping
+
+import httpx
+import instructor
+from instructor.core import InstructorRetryException
+from loguru import logger
+from openai import APITimeoutError, OpenAI
+from superlinked.framework.common.exception import QueryException
+from superlinked.framework.common.nlq.open_ai import (
+    TEMPERATURE_VALUE,
+    OpenAIClient,
+    OpenAIClientConfig,
+)
+from superlinked.framework.common.settings import Settings
+from superlinked.framework.dsl.query import query_param_value_setter
+from superlinked.framework.dsl.query.clause_params import NLQClauseParams
+from superlinked.framework.dsl.query.nlq.nlq_clause_collector import NLQClauseCollector
+from superlinked.framework.dsl.query.nlq.nlq_handler import NLQHandler
+from superlinked.framework.dsl.query.nlq.param_filler.query_param_model_builder import QueryParamModelBuilder
+from superlinked.framework.dsl.query.nlq.param_filler.query_param_prompt_builder import QueryParamPromptBuilder
+from superlinked.framework.dsl.query.query_descriptor import QueryDescriptor
+
+from .admission import AdmissionController
+from .degraded import LOCAL_PARSE, RAW_TEXT, SIMILAR_QUERY, DegradedMode
+from .nlq_cache import ParamCache, SemanticParamCache, cache_key, normalize_query, prompt_fingerprint
+from .nlq_prompt import OptionPruner, estimate_tokens
+from .nlq_rules import RuleBasedParser
+from .speculation import SpeculativeEmbeddings
+
+# Shared by every query that has a natural_query param, like the embedding caches
+_param_cache: ParamCache | None = None
+_semantic_cache: SemanticParamCache | None = None
+_rule_parser: RuleBasedParser | None = None
+_option_pruner: OptionPruner | None = None
+_speculative: SpeculativeEmbeddings | None = None
+_admission: AdmissionController | None = None
+_degraded_mode: DegradedMode | None = None
+_openai_base_url: str | None = None
+_clients: dict[tuple[str, str, str | None], "ProcurementOpenAIClient"] = {}
+_clients_lock = threading.Lock()
+
+
+def get_param_cache() -> ParamCache | None:
+    return _param_cache
+
+
+def get_semantic_cache() -> SemanticParamCache | None:
+    return _semantic_cache
+
+
+def get_rule_parser() -> RuleBasedParser | None:
+    return _rule_parser
+
+
+def get_option_pruner() -> OptionPruner | None:
+    return _option_pruner
+
+
+def get_admission_controller() -> AdmissionController | None:
+    return _admission
+
+
+def get_degraded_mode() -> DegradedMode | None:
+    return _degraded_mode
+
+
+class ProcurementOpenAIClient(OpenAIClient):
+    """OpenAIClient for a configurable endpoint (e.g. the local LLM stub)."""
+
+    def __init__(self, config: OpenAIClientConfig, base_url: str | None = None) -> None:
+        self._openai = OpenAI(api_key=config.api_key, base_url=base_url)
+        self._client = instructor.from_openai(self._openai)
+        self._openai_model = config.model
+
+    def query(self, prompt: str, instructor_prompt: str, response_model, timeout: float | None = None) -> dict:
+        """
+        Like OpenAIClient.query, but safe to call from several threads at once: it does
+        not redirect stderr to hide tokenizer warnings, which swaps file descriptor 2 for
+        the whole process. With a `timeout` for the whole call, each attempt, instructor's
+        validation retries included, gets only the time left, and none starts once it has
+        passed. The OpenAI client does not retry on its own then.
+        """
+        if timeout is None:
+            create, options = self._client.chat.completions.create, {}
+        else:
+            deadline = time.monotonic() + timeout
+            openai = self._openai.with_options(max_retries=0)
+
+            def create_within_deadline(*args, **kwargs):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise APITimeoutError(httpx.Request("POST", f"{openai.base_url}chat/completions"))
+                return openai.chat.completions.create(*args, **{**kwargs, "timeout": remaining})
+
+            # The timeout also stops instructor's retries (stop_after_delay)
+            create, options = instructor.patch(create=create_within_deadline), {"timeout": timeout}
+
+        max_retries = Settings().SUPERLINKED_NLQ_MAX_RETRIES
+        try:
+            response = create(
+                model=self._openai_model,
+                response_model=response_model,
+                max_retries=max_retries,
+                messages=[{"role": "system", "content": instructor_prompt}, {"role": "user", "content": prompt}],
+                temperature=TEMPERATURE_VALUE,
+                **options,
+            )
+        except InstructorRetryException:
+            logger.warning(
+                "LLM validation followup failed after {} retries. Try increasing SUPERLINKED_NLQ_MAX_RETRIES.",
+                max_retries,
+            )
+            raise
+        return response.model_dump()
+
+
+def _openai_client(config: OpenAIClientConfig) -> ProcurementOpenAIClient:
+    """One client per key, model and endpoint, so HTTP connections are reused across queries."""
+    key = (config.api_key, config.model, _openai_base_url)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = ProcurementOpenAIClient(config, _openai_base_url)
+        return _clients[key]
+
+
+class ProcurementNLQHandler(NLQHandler):
+    """
+    NLQHandler that calls the LLM only when it has to: repeated natural queries
+    come from the param cache, queries the keyword/number rules fully understand
+    are parsed locally, and paraphrases of earlier ones come from the semantic cache.
+    The prompt sent for the rest lists only the brand/category options relevant to
+    the query, and the texts the search will probably embed are embedded while the
+    LLM runs. With a latency budget, a query the LLM does not answer in time is
+    interpreted without it. Superlinked creates one per query execution.
+    """
+
+    def __init__(self, client_config: OpenAIClientConfig) -> None:
+        super().__init__(client_config)
+        self._client_config = client_config
+
+    def fill_params(self, natural_query, clauses, space_weight_param_info, system_prompt=None) -> dict:
+        received = time.perf_counter()
+        clause_collector = NLQClauseCollector(clauses, space_weight_param_info)
+        if clause_collector.all_params_have_value_set:
+            return {}
+        model_class = QueryParamModelBuilder.build(clause_collector)
+        instructor_prompt = QueryParamPromptBuilder.calculate_instructor_prompt(clause_collector, system_prompt)
+        # Keys use the unpruned prompt, so they do not depend on which options a query kept.
+        # The prompt already carries the system prompt and every param description and option
+        schema = json.dumps(model_class.model_json_schema(), sort_keys=True)
+        fingerprint = prompt_fingerprint(instructor_prompt, schema, self._client_config.model)
+
+        key = cache_key(natural_query, fingerprint)
+        if _param_cache is not None and (params := _param_cache.get(key)) is not None:
+            logger.debug("NLQ params for {!r} served from cache", natural_query)
+            return params
+
+        parsed = None
+        if _rule_parser is not None:
+            parsed = _rule_parser.parse(natural_query)
+            handled = parsed.confidence >= _rule_parser.min_confidence
+            _rule_parser.record(handled)
+            if handled:
+                logger.debug("NLQ params for {!r} parsed locally ({:.2f})", natural_query, parsed.confidence)
+                # Only params the request left open; explicit ones are not part of the model
+                return {name: value for name, value in parsed.params.items() if name in model_class.model_fields}
+
+        if _speculative is not None:
+            # The semantic cache embeds the normalized query; the LLM often returns the rules' description
+            guesses = [normalize_query(natural_query), " ".join(natural_query.split())]
+            if parsed is not None and parsed.params.get("product_description"):
+                guesses.append(parsed.params["product_description"])
+            _speculative.start(guesses)
+
+        match = vector = None
+        if _semantic_cache is not None:
+            try:
+                vector = _semantic_cache.embed_query(natural_query)
+            except Exception:
+                logger.exception("Embedding {!r} for the semantic NLQ cache failed", natural_query)
+        if vector is not None:
+            match = _semantic_cache.lookup(natural_query, vector, fingerprint)
+            if match is not None and not _semantic_cache.should_verify():
+                logger.debug("NLQ params for {!r} reused from {!r} ({:.3f})", natural_query, match.natural_query, match.similarity)
+                if _param_cache is not None:
+                    _param_cache.put(key, match.params)
+                return match.params
+
+        if _option_pruner is not None:
+            pruned = _option_pruner.prune(
+                natural_query,
+                clauses,
+                lambda narrowed: QueryParamPromptBuilder.calculate_instructor_prompt(
+                    NLQClauseCollector(narrowed, space_weight_param_info), system_prompt
+                ),
+                vector,
+            )
+            model_class = QueryParamModelBuilder.build(NLQClauseCollector(pruned.clauses, space_weight_param_info))
+            instructor_prompt = pruned.prompt
+        else:
+            logger.info("NLQ prompt for {!r}: ~{} tokens", natural_query, estimate_tokens(instructor_prompt))
+
+        def remember(params: dict) -> None:
+            if match is not None:
+                _semantic_cache.record_verification(match, natural_query, params)
+            elif vector is not None:
+                _semantic_cache.add(natural_query, vector, fingerprint, params)
+            if _param_cache is not None:
+                _param_cache.put(key, params)
+
+        start = time.perf_counter()
+        if _degraded_mode is None:
+            params = self._execute_query(natural_query, instructor_prompt, model_class)
+        else:
+            try:
+                params = _degraded_mode.run(
+                    lambda: self._execute_query(natural_query, instructor_prompt, model_class),
+                    _degraded_mode.budget_seconds - (start - received),
+                    remember,
+                )
+            except Exception as e:
+                return self._fallback(natural_query, model_class, fingerprint, parsed, match, vector, e)
+        logger.info("Extracted NLQ params in {:.2f}s", time.perf_counter() - start)
+        remember(params)
+        return params
+
+    def _fallback(self, natural_query, model_class, fingerprint, parsed, match, vector, error: Exception) -> dict:
+        """Params for a query the LLM did not extract in time: a similar query's, the rules', or the raw text."""
+        fields = model_class.model_fields
+        if match is None and vector is not None:
+            match = _semantic_cache.nearest(natural_query, vector, fingerprint, _degraded_mode.similarity)
+        if match is not None:
+            fallback, params = SIMILAR_QUERY, match.params
+        elif parsed is not None and any(name in fields for name in parsed.params):
+            fallback, params = LOCAL_PARSE, {name: value for name, value in parsed.params.items() if name in fields}
+        else:
+            text_param = _degraded_mode.text_param
+            fallback, params = RAW_TEXT, ({text_param: natural_query} if text_param in fields else {})
+        _degraded_mode.record(fallback, str(error))
+        logger.warning("NLQ extraction for {!r} degraded to {} ({})", natural_query, fallback, error)
+        return params
+
+    def _execute_query(self, query: str, instructor_prompt: str, model_class) -> dict:
+        if _admission is None:
+            return self._call_llm(query, instructor_prompt, model_class, None)
+        # AdmissionRejected is not wrapped, so the server can answer it with 503
+        with _admission.admit() as timeout:
+            try:
+                return self._call_llm(query, instructor_prompt, model_class, timeout)
+            except QueryException as e:
+                if _caused_by(e, APITimeoutError):
+                    _admission.record_deadline_exceeded()
+                raise
+
+    def _call_llm(self, query: str, instructor_prompt: str, model_class, timeout: float | None) -> dict:
+        try:
+            return _openai_client(self._client_config).query(query, instructor_prompt, model_class, timeout)
+        except Exception as e:
+            raise QueryException(f"Error executing natural language query: {str(e)}") from e
+
+
+def _caused_by(error: BaseException, error_type: type[BaseException]) -> bool:
+    """Whether `error` or an exception it was raised from is an `error_type` (instructor wraps API errors)."""
+    while error is not None:
+        if isinstance(error, error_type):
+            return True
+        error = error.__cause__
+    return False
+
+
+def extract_params(query_descriptor: QueryDescriptor, params: Mapping[str, Any]) -> dict:
+    """
+    Params the natural query in `params` resolves to, without running the search.
+    Follows the first steps of Superlinked's QueryParamValueSetter.set_values, so the
+    extraction goes through the installed handler and its caches.
+    """
+    descriptor = query_descriptor.append_missing_mandatory_clauses()
+    query_param_value_setter.QueryParamValueSetter.validate_params(descriptor, params)
+    descriptor = descriptor.replace_clauses([clause.alter_param_values(params, True) for clause in descriptor.clauses])
+    nlq_params = reduce(lambda nlq, clause: clause.get_altered_nql_params(nlq), descriptor.clauses, NLQClauseParams())
+    if nlq_params.client_config is None or nlq_params.natural_query is None:
+        return {}
+    return query_param_value_setter.NLQHandler(nlq_params.client_config).fill_params(
+        nlq_params.natural_query,
+        descriptor.clauses,
+        descriptor._space_weight_param_info,
+        nlq_params.system_prompt,
+    )
+
+
+def install_nlq_handler(
+    param_cache: ParamCache | None,
+    semantic_cache: SemanticParamCache | None = None,
+    rule_parser: RuleBasedParser | None = None,
+    option_pruner: OptionPruner | None = None,
+    speculative: SpeculativeEmbeddings | None = None,
+    openai_base_url: str | None = None,
+    admission: AdmissionController | None = None,
+    degraded_mode: DegradedMode | None = None,
+) -> None:
+    """Route natural-query extraction through ProcurementNLQHandler. Call before the executor runs."""
+    global _param_cache, _semantic_cache, _rule_parser, _option_pruner, _speculative, _openai_base_url
+    global _admission, _degraded_mode
+    _param_cache, _semantic_cache, _rule_parser = param_cache, semantic_cache, rule_parser
+    _option_pruner, _speculative, _openai_base_url = option_pruner, speculative, openai_base_url
+    _admission, _degraded_mode = admission, degraded_mode
+    query_param_value_setter.NLQHandler = ProcurementNLQHandler
+    if param_cache is not None:
+        logger.info(
+            "NLQ param cache enabled ({} entries in memory, ttl {}s, disk: {})",
+            param_cache.max_entries, param_cache.ttl_seconds, param_cache.path or "off",
+        )
+    if semantic_cache is not None:
+        logger.info(
+            "NLQ semantic cache enabled (threshold {}, verify rate {})",
+            semantic_cache.threshold, semantic_cache.verify_rate,
+        )
+    if rule_parser is not None:
+        logger.info("NLQ rule parser enabled (min confidence {})", rule_parser.min_confidence)
+    if option_pruner is not None:
+        logger.info(
+            "NLQ option pruning enabled (up to {} options, budget ~{} tokens)",
+            option_pruner.max_options, option_pruner.token_budget,
+        )
+    if speculative is not None:
+        logger.info("Speculative embedding of likely query texts enabled for {}", speculative.model_name)
+    if openai_base_url is not None:
+        logger.info("NLQ extraction calls {}", openai_base_url)
+    if admission is not None:
+        logger.info(
+            "NLQ admission control enabled ({} concurrent, queue {}, max wait {}s, deadline {}s)",
+            admission.max_concurrency, admission.max_queue, admission.max_queue_wait_seconds, admission.deadline_seconds,
+        )
+    if degraded_mode is not None:
+        logger.info("NLQ degraded mode enabled (latency budget {}s)", degraded_mode.budget_seconds)
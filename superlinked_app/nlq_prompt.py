@@ -0,0 +1,164 @@
+# procurement/nlq_prompt.py
+import dataclasses
+import re
+import threading
+from dataclasses import dataclass
+from typing import Callable, Sequence
+
+import numpy as np
+from loguru import logger
+from superlinked.framework.common.interface.evaluated import Evaluated
+from superlinked.framework.dsl.query.param import Param
+from superlinked.framework.dsl.query.query_clause.query_clause import QueryClause
+from superlinked.framework.dsl.query.typed_param import TypedParam
+
+from .nlq_rules import FILLER_WORDS
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough OpenAI token count: about four characters of English per token."""
+    return len(text) // 4 + 1
+
+
+def _stems(text: str) -> set[str]:
+    words = (word[:-1] if word.endswith("s") and len(word) > 3 else word for word in _WORD.findall(text.lower()))
+    return {word for word in words if len(word) > 2 and word not in FILLER_WORDS}
+
+
+@dataclass
+class PrunedPrompt:
+    clauses: list[QueryClause]
+    prompt: str
+    tokens: int
+    full_tokens: int
+    # Options left per pruned param
+    options: dict[str, int]
+
+
+class OptionPruner:
+    """
+    Narrows long option lists (brands, categories) in the extraction prompt to the
+    values plausibly relevant to the query. Options whose words appear in the query
+    are always kept; the rest are ranked by embedding similarity to the query and
+    cut to `max_options`. If the rendered prompt still exceeds `token_budget`, the
+    longest list is halved until it fits or every list is down to `min_options`.
+
+    The LLM can only pick from the options it was shown, so the response model is
+    built from the pruned clauses too.
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[Sequence[str]], np.ndarray],
+        param_names: Sequence[str],
+        max_options: int = 25,
+        token_budget: int = 3000,
+        min_options: int = 5,
+    ) -> None:
+        self.embed = embed
+        self.param_names = set(param_names)
+        self.max_options = max_options
+        self.token_budget = token_budget
+        self.min_options = min_options
+        self._option_vectors: dict[frozenset, tuple[list[str], np.ndarray]] = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.full_tokens = 0
+        self.sent_tokens = 0
+        self.over_budget = 0
+
+    def prune(
+        self,
+        natural_query: str,
+        clauses: Sequence[QueryClause],
+        render: Callable[[Sequence[QueryClause]], str],
+        query_vector: np.ndarray | None = None,
+    ) -> PrunedPrompt:
+        full_tokens = estimate_tokens(render(clauses))
+        prunable = [index for index, clause in enumerate(clauses) if self._prunable(clause)]
+        if prunable and query_vector is None:
+            query_vector = self._unit(self.embed([natural_query]))[0]
+        ranked = {
+            index: self._rank(natural_query, QueryClause.get_param(clauses[index].value_param).options, query_vector)
+            for index in prunable
+        }
+        limits = {index: min(len(options), self.max_options) for index, (options, _) in ranked.items()}
+
+        while True:
+            pruned = list(clauses)
+            for index, (options, mentioned) in ranked.items():
+                pruned[index] = _with_options(clauses[index], options[: max(limits[index], mentioned)])
+            prompt = render(pruned)
+            tokens = estimate_tokens(prompt)
+            shrinkable = [index for index in limits if limits[index] > self.min_options]
+            if tokens <= self.token_budget or not shrinkable:
+                break
+            longest = max(shrinkable, key=limits.get)
+            limits[longest] = max(self.min_options, limits[longest] // 2)
+
+        kept = {}
+        for index in ranked:
+            param = QueryClause.get_param(pruned[index].value_param)
+            kept[param.name] = len(param.options)
+        with self._lock:
+            self.requests += 1
+            self.full_tokens += full_tokens
+            self.sent_tokens += tokens
+            self.over_budget += tokens > self.token_budget
+        log = logger.warning if tokens > self.token_budget else logger.info
+        log(
+            "NLQ prompt for {!r}: ~{} tokens (~{} unpruned, budget {}), options kept {}",
+            natural_query, tokens, full_tokens, self.token_budget, kept,
+        )
+        return PrunedPrompt(pruned, prompt, tokens, full_tokens, kept)
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "token_budget": self.token_budget,
+            "avg_prompt_tokens": self.sent_tokens / self.requests if self.requests else 0.0,
+            "avg_unpruned_tokens": self.full_tokens / self.requests if self.requests else 0.0,
+            "over_budget": self.over_budget,
+        }
+
+    def _prunable(self, clause: QueryClause) -> bool:
+        value_param = getattr(clause, "value_param", None)
+        if value_param is None or isinstance(value_param, Evaluated):
+            return False
+        param = QueryClause.get_param(value_param)
+        return param.name in self.param_names and len(param.options) > self.min_options
+
+    def _rank(self, natural_query: str, options: set, query_vector: np.ndarray) -> tuple[list, int]:
+        """Options ordered mentioned-first, then by similarity, and how many were mentioned."""
+        names, vectors = self._vectors(options)
+        query_words = _stems(natural_query)
+        mentioned = np.array([bool(_stems(name) & query_words) for name in names])
+        similarities = vectors @ query_vector
+        order = np.lexsort((-similarities, ~mentioned))
+        return [names[row] for row in order], int(mentioned.sum())
+
+    def _vectors(self, options: set) -> tuple[list[str], np.ndarray]:
+        key = frozenset(options)
+        with self._lock:
+            cached = self._option_vectors.get(key)
+        if cached is None:
+            names = sorted(str(option) for option in options if option is not None)
+            cached = names, self._unit(self.embed(names))
+            with self._lock:
+                self._option_vectors[key] = cached
+        return cached
+
+    @staticmethod
+    def _unit(vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms > 0, norms, 1.0)
+
+
+def _with_options(clause: QueryClause, options: Sequence) -> QueryClause:
+    typed_param = QueryClause.get_typed_param(clause.value_param)
+    param = typed_param.param
+    narrowed = Param(param.name, param.description, param.default, list(options))
+    return dataclasses.replace(clause, value_param=TypedParam(narrowed, typed_param.valid_param_value_types))
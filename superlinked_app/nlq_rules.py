@@ -0,0 +1,302 @@
+# procurement/nlq_rules.py
+"""
+Local parser for natural queries that only need keyword and number rules, e.g.
+"products with cost less than 5 dollars" or "cheap popular dresses for women".
+
+The weight keywords come from the param descriptions in nlq.py and the
+department/category/brand vocabularies from the filter options in query.py, so
+the rules follow the prompt when either changes. Replay a query log to see how
+much traffic the rules would answer without the LLM:
+
+    python -m superlinked_app.nlq_rules queries.txt
+"""
+import argparse
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Mapping, Sequence
+
+from .nlq import (
+    cost_description,
+    profit_margin_description,
+    reliability_description,
+    return_rate_description,
+    revenue_performance_description,
+    sales_performance_description,
+)
+
+WEIGHT_DESCRIPTIONS = {
+    "cost_weight": cost_description,
+    "reliability_weight": reliability_description,
+    "profit_margin_weight": profit_margin_description,
+    "return_rate_weight": return_rate_description,
+    "sales_performance_weight": sales_performance_description,
+    "revenue_performance_weight": revenue_performance_description,
+}
+# Same scale as the default description weight, so preference and text stay balanced
+KEYWORD_WEIGHT = 1.0
+
+DEPARTMENT_ALIASES = {
+    "Women": ["women", "womens", "women's", "woman", "ladies", "female"],
+    "Men": ["men", "mens", "men's", "man", "male"],
+    "Kids": ["kids", "kid", "children", "child", "boys", "girls"],
+}
+
+# (param, comparator) for each numeric field; comparators are "max" (less than) and "min"
+NUMERIC_FIELDS = {
+    "cost": (r"unit cost|cost(?:s|ing)?|price[ds]?", {"max": "max_cost", "min": "min_cost"}),
+    "revenue": (r"revenue|earnings?", {"min": "min_revenue"}),
+    "margin": (r"profit margin|margins?", {"min": "min_profit_margin"}),
+    "return_rate": (r"return rates?|returns", {"max": "max_return_rate"}),
+    "orders": (r"orders", {"min": "min_orders"}),
+}
+_LESS = r"less than|fewer than|lower than|cheaper than|no more than|at most|up to|under|below|max(?:imum)?|<=?"
+_MORE = r"more than|greater than|higher than|no less than|at least|over|above|exceeding|min(?:imum)?|>=?"
+_NUMBER = r"\$?\s*(\d+(?:,\d{3})*(?:\.\d+)?)\s*(?:(k|thousand|m|million)(?![a-z]))?\s*(?:dollars?|usd|bucks|%|percent)?"
+_MULTIPLIERS = {"k": 1e3, "thousand": 1e3, "m": 1e6, "million": 1e6}
+
+FILLER_WORDS = {
+    "a", "all", "and", "any", "are", "as", "at", "by", "find", "for", "from", "get", "give", "has", "have",
+    "i", "in", "is", "items", "item", "list", "looking", "me", "need", "of", "on", "or", "please", "product",
+    "products", "show", "some", "that", "the", "to", "want", "we", "which", "with", "dollars", "dollar",
+    "usd", "rate", "than", "their", "its", "stuff", "options", "search",
+}
+NEGATIONS = r"except|excluding|without|not|no|other than"
+
+
+def description_keywords(description: str) -> tuple[list[str], list[str]]:
+    """Quoted keywords listed after 'Positive'/'Negative' (or 'example') in a param description."""
+    positive, negative = [], []
+    labels = re.compile(r"(positive(?: weight)?|negative(?: weight)?|neutral[^:]*|example)\s*:", re.IGNORECASE)
+    parts = labels.split(description)
+    for label, text in zip(parts[1::2], parts[2::2]):
+        keywords = [keyword.lower() for keyword in re.findall(r"'([^']+)'", text)]
+        if label.lower().startswith("negative"):
+            negative.extend(keywords)
+        elif not label.lower().startswith("neutral"):
+            positive.extend(keywords)
+    return positive, negative
+
+
+def _word_pattern(phrases: Sequence[str]) -> str:
+    ordered = sorted(set(phrases), key=len, reverse=True)
+    return r"(?<![\w'])(" + "|".join(re.escape(phrase) for phrase in ordered) + r")(?![\w'])"
+
+
+def _category_aliases(categories: Sequence[str]) -> dict[str, str]:
+    aliases: dict[str, str] = {}
+    exact = {category.lower(): category for category in categories}
+    for category in categories:
+        for part in [category] + [part.strip() for part in category.split("&")]:
+            word = part.lower()
+            for alias in {word, word[:-2] if word.endswith("es") else word, word[:-1] if word.endswith("s") else word}:
+                # "socks" means the Socks category, not Socks & Hosiery
+                if alias and alias not in exact:
+                    aliases.setdefault(alias, category)
+    return {**aliases, **exact}
+
+
+def _number(value: str, multiplier: str | None) -> float:
+    return float(value.replace(",", "")) * _MULTIPLIERS.get((multiplier or "").lower(), 1.0)
+
+
+@dataclass
+class RuleParse:
+    params: dict
+    # Share of the query's content words the rules accounted for
+    confidence: float
+    unknown_words: list[str] = field(default_factory=list)
+
+
+class RuleBasedParser:
+    """
+    Resolves numeric ranges, department/category/brand mentions and weight keywords
+    with regular expressions. `parse` reports how much of the query it understood;
+    callers use the result only when that reaches `min_confidence`.
+    """
+
+    def __init__(
+        self,
+        departments: Sequence[str],
+        categories: Sequence[str],
+        brands: Sequence[str],
+        weight_descriptions: Mapping[str, str] = WEIGHT_DESCRIPTIONS,
+        min_confidence: float = 0.8,
+    ) -> None:
+        self.min_confidence = min_confidence
+        self._departments = {
+            alias: department for department in departments for alias in DEPARTMENT_ALIASES.get(department, [department.lower()])
+        }
+        self._categories = _category_aliases(categories)
+        # Short brands ("DC", "Lee") only match with their exact case, so "dc" or "lee" in prose do not
+        self._brands = {brand.lower(): brand for brand in brands if brand and len(brand) > 3}
+        self._exact_case_brands = {brand: brand for brand in brands if brand and len(brand) <= 3}
+        self._keywords: dict[str, tuple[str, float]] = {}
+        for param, description in weight_descriptions.items():
+            positive, negative = description_keywords(description)
+            self._keywords.update({keyword: (param, KEYWORD_WEIGHT) for keyword in positive})
+            self._keywords.update({keyword: (param, -KEYWORD_WEIGHT) for keyword in negative})
+        self._weight_params = list(weight_descriptions)
+
+        self._numeric_patterns = []
+        for name, (field_pattern, params) in NUMERIC_FIELDS.items():
+            for comparator, comparator_pattern in (("max", _LESS), ("min", _MORE)):
+                self._numeric_patterns += [
+                    (name, comparator, re.compile(rf"\b(?:{field_pattern})\s+(?:is\s+|of\s+)?(?:{comparator_pattern})\s*{_NUMBER}")),
+                    (name, comparator, re.compile(rf"(?<!\w)(?:{comparator_pattern})\s*{_NUMBER}\s+(?:in\s+|of\s+)?(?:{field_pattern})\b")),
+                ]
+            self._numeric_patterns.append(
+                (name, "between", re.compile(rf"\b(?:{field_pattern})\s+between\s+{_NUMBER}\s+and\s+{_NUMBER}"))
+            )
+        # A bare amount of money ("under $20") is a cost
+        self._money_patterns = [
+            ("cost", "max", re.compile(rf"(?<!\w)(?:{_LESS})\s*(\$\s*\d[\d,.]*|\d[\d,.]*\s*(?:dollars?|usd|bucks))")),
+            ("cost", "min", re.compile(rf"(?<!\w)(?:{_MORE})\s*(\$\s*\d[\d,.]*|\d[\d,.]*\s*(?:dollars?|usd|bucks))")),
+        ]
+        self._keyword_pattern = re.compile(_word_pattern(list(self._keywords)))
+        self._category_pattern = re.compile(_word_pattern(list(self._categories)))
+        self._department_pattern = re.compile(_word_pattern(list(self._departments)))
+        self._brand_pattern = re.compile(_word_pattern(list(self._brands))) if self._brands else None
+        self._exact_brand_pattern = (
+            re.compile(_word_pattern(list(self._exact_case_brands))) if self._exact_case_brands else None
+        )
+        self._negation_pattern = re.compile(rf"\b(?:{NEGATIONS})\s+(?:any\s+)?")
+
+        self._lock = threading.Lock()
+        self.handled = 0
+        self.fallbacks = 0
+
+    def parse(self, natural_query: str) -> RuleParse:
+        original = " ".join(natural_query.split())
+        text = original.lower()
+        params: dict = {}
+        unsupported = False
+
+        def blank(match: re.Match) -> None:
+            nonlocal text, original
+            start, end = match.span()
+            text = text[:start] + " " * (end - start) + text[end:]
+            original = original[:start] + " " * (end - start) + original[end:]
+
+        for name, comparator, pattern in self._numeric_patterns:
+            for match in list(pattern.finditer(text)):
+                mapping = NUMERIC_FIELDS[name][1]
+                if comparator == "between" and {"min", "max"} <= mapping.keys():
+                    params[mapping["min"]] = _number(match.group(1), match.group(2))
+                    params[mapping["max"]] = _number(match.group(3), match.group(4))
+                elif comparator in mapping:
+                    params[mapping[comparator]] = _number(match.group(1), match.group(2))
+                else:
+                    unsupported = True  # e.g. "revenue below 100": no param for it
+                blank(match)
+        for name, comparator, pattern in self._money_patterns:
+            for match in list(pattern.finditer(text)):
+                amount = re.sub(r"[^\d.,]", "", match.group(1)).rstrip(".,")
+                params[NUMERIC_FIELDS[name][1][comparator]] = _number(amount, None)
+                blank(match)
+
+        excluded, included, departments, brands = [], [], [], []
+        for match in list(self._negation_pattern.finditer(text)):
+            following = self._category_pattern.match(text, match.end())
+            if following is None:
+                unsupported = True  # a negation the rules cannot express
+                continue
+            excluded.append(self._categories[following.group(1)])
+            blank(following)
+            blank(match)
+        if self._brand_pattern is not None:
+            for match in list(self._brand_pattern.finditer(text)):
+                brands.append(self._brands[match.group(1)])
+                blank(match)
+        if self._exact_brand_pattern is not None:
+            for match in list(self._exact_brand_pattern.finditer(original)):
+                brands.append(self._exact_case_brands[match.group(1)])
+                blank(match)
+        weights = {}
+        for match in list(self._keyword_pattern.finditer(text)):
+            param, weight = self._keywords[match.group(1)]
+            weights[param] = weight
+            blank(match)
+        for match in list(self._department_pattern.finditer(text)):
+            departments.append(self._departments[match.group(1)])
+            blank(match)
+        description_words = []
+        for match in list(self._category_pattern.finditer(text)):
+            included.append(self._categories[match.group(1)])
+            description_words.append((match.start(), match.group(1)))
+            blank(match)
+
+        words = [(match.start(), match.group()) for match in re.finditer(r"[\w'&-]+", text)]
+        unknown = [word for _, word in words if word not in FILLER_WORDS]
+        description_words += [(start, word) for start, word in words if word not in FILLER_WORDS]
+        recognised = len(params) + len(weights) + len(included) + len(excluded) + len(departments) + len(brands)
+
+        if brands:
+            params["brands_include"] = list(dict.fromkeys(brands))
+        if departments:
+            params["departments_include"] = list(dict.fromkeys(departments))
+        if included:
+            params["categories_include"] = list(dict.fromkeys(included))
+        if excluded:
+            params["categories_exclude"] = list(dict.fromkeys(excluded))
+        for param in self._weight_params:
+            params[param] = weights.get(param, 0.0)
+        description = " ".join(word for _, word in sorted(description_words))
+        params["product_description"] = description or None
+
+        if unsupported or recognised == 0:
+            confidence = 0.0
+        else:
+            confidence = recognised / (recognised + len(unknown))
+        return RuleParse(params, confidence, unknown)
+
+    def record(self, handled: bool) -> None:
+        with self._lock:
+            if handled:
+                self.handled += 1
+            else:
+                self.fallbacks += 1
+
+    def stats(self) -> dict:
+        total = self.handled + self.fallbacks
+        return {
+            "min_confidence": self.min_confidence,
+            "handled": self.handled,
+            "fallbacks": self.fallbacks,
+            "handled_rate": self.handled / total if total else 0.0,
+        }
+
+
+def main() -> None:
+    from .configs import settings
+    from .snapshot import catalog_options
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("queries", help="text file with one natural query per line")
+    parser.add_argument("--min-confidence", type=float, default=settings.nlq_rules_min_confidence)
+    parser.add_argument("--show", action="store_true", help="print the params of every handled query")
+    args = parser.parse_args()
+
+    def options(column: str) -> list[str]:
+        return catalog_options(settings.catalog_path, settings.snapshot_path, settings.data_path, column)
+
+    rules = RuleBasedParser(
+        list(DEPARTMENT_ALIASES), options("category"), options("brand"), min_confidence=args.min_confidence
+    )
+    with open(args.queries, encoding="utf-8") as f:
+        queries = [line.strip() for line in f if line.strip()]
+    for query in queries:
+        result = rules.parse(query)
+        handled = result.confidence >= rules.min_confidence
+        rules.record(handled)
+        if args.show:
+            status = "local" if handled else f"llm (unknown: {', '.join(result.unknown_words)})"
+            print(f"{result.confidence:.2f}  {status:<40}  {query}")
+            if handled:
+                print(f"      {result.params}")
+    stats = rules.stats()
+    print(f"{stats['handled']} of {len(queries)} queries ({stats['handled_rate']:.1%}) handled without the LLM")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+# procurement/planner.py
+import contextvars
+import math
+import numbers
+import threading
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, Collection, Iterator, Mapping, Sequence
+
+import numpy as np
+from superlinked.framework.common.interface.comparison_operand import ComparisonOperation
+from superlinked.framework.common.interface.comparison_operation_type import ComparisonOperationType
+
+# Strategies: score only the rows passing the filters, or fetch the best candidates unfiltered and filter those
+EXACT_SCAN, POST_FILTER, RAISED_CANDIDATES = "exact_scan", "post_filter", "raised_candidates"
+# With an approximate index: score the rows passing the filters in the lists nearest to the query
+ANN_SCAN = "ann_scan"
+# Rough cost per row in microseconds: scoring in the matrix, selecting from an index, checking filters in Python
+SCORE_US, INDEX_US, ROW_FILTER_US = 0.2, 0.01, 2.0
+# Values per row are allocated in steps of at least this many rows
+MIN_GROWTH = 1024
+# Share of the rows written since the histograms were built after which they are rebuilt
+REBUILD_FRACTION = 1 / 16
+_RANGE_OPS = (
+    ComparisonOperationType.GREATER_THAN,
+    ComparisonOperationType.GREATER_EQUAL,
+    ComparisonOperationType.LESS_THAN,
+    ComparisonOperationType.LESS_EQUAL,
+)
+
+
+@dataclass
+class QueryPlan:
+    """How a knn search was run, for the response metadata."""
+
+    strategy: str
+    # Estimated share of the rows passing the filters
+    selectivity: float
+    # Rows scored by an exact scan, or candidates fetched before filtering
+    candidates: int
+    estimated_cost_us: float
+    # Post-filtering kept fewer rows than the limit, so the exact scan was run as well
+    fallback: bool = False
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+_current: contextvars.ContextVar[list[QueryPlan] | None] = contextvars.ContextVar("query_plans", default=None)
+
+
+@contextmanager
+def plan_scope() -> Iterator[list[QueryPlan]]:
+    """Collect the plans of the knn searches run in the block."""
+    plans: list[QueryPlan] = []
+    token = _current.set(plans)
+    try:
+        yield plans
+    finally:
+        _current.reset(token)
+
+
+def record_plan(plan: QueryPlan) -> None:
+    if (plans := _current.get()) is not None:
+        plans.append(plan)
+
+
+class FieldStatistics:
+    """
+    Per-field statistics of the rows of an index, collected as they are written:
+    value counts (and so distinct counts) of categorical fields, and equi-depth
+    histograms of numeric ones, rebuilt once REBUILD_FRACTION of the rows changed.
+    They estimate the share of rows passing a set of filters, assuming fields are
+    independent; filters they know nothing about are assumed to pass every row.
+    """
+
+    def __init__(self, categorical: Collection[str], numeric: Collection[str], bins: int = 32) -> None:
+        self.categorical, self.numeric, self.bins = set(categorical), set(numeric), bins
+        self._lock = threading.Lock()
+        self._rows = 0
+        self._codes = {field: np.full(0, -1, dtype=np.int32) for field in self.categorical}
+        self._value_codes: dict[str, dict[Any, int]] = {field: {} for field in self.categorical}
+        self._counts = {field: np.zeros(0, dtype=np.int64) for field in self.categorical}
+        self._values = {field: np.full(0, np.nan) for field in self.numeric}
+        # Quantiles of each numeric field and the share of rows that have a value, as of the last build
+        self._histograms: dict[str, tuple[np.ndarray, float]] = {}
+        self._changed = 0
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def update(self, position: int, row: Mapping[str, Any]) -> None:
+        with self._lock:
+            self._reserve(position + 1)
+            self._rows = max(self._rows, position + 1)
+            self._changed += 1
+            for field in self.categorical:
+                value = row.get(field)
+                code = self._code(field, value) if _is_categorical(value) else -1
+                old = int(self._codes[field][position])
+                if old != -1:
+                    self._counts[field][old] -= 1
+                if code != -1:
+                    self._counts[field][code] += 1
+                self._codes[field][position] = code
+            for field in self.numeric:
+                value = row.get(field)
+                self._values[field][position] = float(value) if _is_number(value) else np.nan
+
+    def selectivity(self, filters: Sequence[ComparisonOperation]) -> float:
+        """Estimated share of the rows passing every filter (OR groups: any of theirs)."""
+        groups: dict[int | None, list[ComparisonOperation]] = {}
+        for filter_ in filters:
+            groups.setdefault(filter_._group_key, []).append(filter_)
+        with self._lock:
+            if not self._rows:
+                return 1.0
+            if self._changed > self._rows * REBUILD_FRACTION:
+                self._build_histograms()
+            share = 1.0
+            for group_key, group in groups.items():
+                shares = [self._share(filter_) for filter_ in group]
+                share *= math.prod(shares) if group_key is None else 1 - math.prod(1 - s for s in shares)
+            return share
+
+    def stats(self) -> dict:
+        with self._lock:
+            fields = {
+                field: {
+                    "distinct": int(np.count_nonzero(self._counts[field])),
+                    "missing": self._rows - int(self._counts[field].sum()),
+                }
+                for field in sorted(self.categorical)
+            }
+            for field in sorted(self.numeric):
+                values = self._values[field][: self._rows]
+                fields[field] = {"missing": int(np.isnan(values).sum())}
+            return {"rows": self._rows, "fields": fields}
+
+    def _share(self, filter_: ComparisonOperation) -> float:
+        """Holds the lock."""
+        field, op = getattr(filter_._operand, "name", None), filter_._op
+        if field in self.categorical and op in (ComparisonOperationType.EQUAL, ComparisonOperationType.IN):
+            return self._value_share(field, filter_._get_other_as_sequence())
+        if field in self.categorical and op in (ComparisonOperationType.NOT_EQUAL, ComparisonOperationType.NOT_IN):
+            return 1 - self._value_share(field, filter_._get_other_as_sequence())
+        if field in self.numeric and op in _RANGE_OPS and _is_number(filter_._other) and field in self._histograms:
+            quantiles, valued = self._histograms[field]
+            below = float(np.interp(float(filter_._other), quantiles, np.linspace(0, 1, len(quantiles)), 0.0, 1.0))
+            below_ops = (ComparisonOperationType.LESS_THAN, ComparisonOperationType.LESS_EQUAL)
+            return valued * (below if op in below_ops else 1 - below)
+        return 1.0
+
+    def _value_share(self, field: str, values: Sequence[Any]) -> float:
+        value_codes = self._value_codes[field]
+        codes = {value_codes[value] for value in values if _is_categorical(value) and value in value_codes}
+        return sum(int(self._counts[field][code]) for code in codes) / self._rows
+
+    def _build_histograms(self) -> None:
+        for field in self.numeric:
+            values = self._values[field][: self._rows]
+            values = values[~np.isnan(values)]
+            quantiles = np.quantile(values, np.linspace(0, 1, self.bins + 1)) if len(values) else np.zeros(2)
+            self._histograms[field] = (quantiles, len(values) / self._rows)
+        self._changed = 0
+
+    def _code(self, field: str, value: Any) -> int:
+        value_codes = self._value_codes[field]
+        if value not in value_codes:
+            value_codes[value] = len(value_codes)
+            if len(value_codes) > len(self._counts[field]):
+                grown = np.zeros(max(16, 2 * len(value_codes)), dtype=np.int64)
+                grown[: len(self._counts[field])] = self._counts[field]
+                self._counts[field] = grown
+        return value_codes[value]
+
+    def _reserve(self, rows: int) -> None:
+        for arrays, fill in ((self._codes, -1), (self._values, np.nan)):
+            for field, array in arrays.items():
+                if rows > len(array):
+                    grown = np.full(max(rows, len(array) + max(MIN_GROWTH, len(array) // 2)), fill, dtype=array.dtype)
+                    grown[: len(array)] = array
+                    arrays[field] = grown
+
+
+class QueryPlanner:
+    """
+    Chooses how to run a filtered knn search from the estimated selectivity of its
+    filters, by comparing rough costs:
+
+    - exact scan: select the rows passing the filters (from the indexes, or by
+      checking them one by one), then score only those;
+    - post-filter: fetch the `oversample` x limit best candidates unfiltered and
+      check the filters on them, which pays when the filters pass most rows but
+      are expensive to evaluate;
+    - raised candidates: the same with limit / selectivity x `oversample`
+      candidates, for filters that pass fewer rows;
+    - ann scan, with an approximate index: select the rows passing the filters
+      among those in the lists nearest to the query, and score those.
+
+    Without an approximate index, candidates are fetched by scoring every row;
+    with one, by scoring its centroids and the rows of the probed lists. A plan
+    expected to keep fewer rows than the limit is charged the exact scan it
+    falls back to.
+    """
+
+    def __init__(self, oversample: float = 2.0) -> None:
+        self.oversample = oversample
+        self._lock = threading.Lock()
+        self.plans = {EXACT_SCAN: 0, ANN_SCAN: 0, POST_FILTER: 0, RAISED_CANDIDATES: 0}
+        self.fallbacks = 0
+
+    def plan(
+        self,
+        rows: int,
+        limit: int,
+        selectivity: float,
+        filter_cost: float,
+        ann_probe: tuple[int, int] | None = None,
+    ) -> QueryPlan:
+        """
+        Cheapest plan for a search over `rows` rows; `filter_cost` is the cost of
+        selecting the rows passing the filters for an exact scan, and `ann_probe`
+        the centroids and rows an approximate index scores per search, if any.
+        """
+        matched = math.ceil(selectivity * rows)
+        exact = QueryPlan(EXACT_SCAN, selectivity, matched, filter_cost + matched * SCORE_US)
+        plans = [exact]
+        candidate_cost = rows * SCORE_US
+        if ann_probe is not None and limit >= 0:
+            centroids, probed = ann_probe
+            candidate_cost = (centroids + probed) * SCORE_US
+            probed_matches = math.ceil(selectivity * probed)
+            cost = filter_cost + (centroids + probed_matches) * SCORE_US
+            if probed_matches < limit:
+                cost += exact.estimated_cost_us
+            plans.append(QueryPlan(ANN_SCAN, selectivity, probed_matches, cost))
+        if 0 < limit < rows and selectivity > 0:
+            for strategy, candidates in (
+                (POST_FILTER, math.ceil(limit * self.oversample)),
+                (RAISED_CANDIDATES, math.ceil(limit * self.oversample / selectivity)),
+            ):
+                if candidates >= rows:
+                    continue
+                cost = candidate_cost + candidates * ROW_FILTER_US
+                if candidates * selectivity < limit:
+                    cost += exact.estimated_cost_us
+                plans.append(QueryPlan(strategy, selectivity, candidates, cost))
+        chosen = min(plans, key=lambda plan: plan.estimated_cost_us)
+        chosen.estimated_cost_us = round(chosen.estimated_cost_us, 1)
+        with self._lock:
+            self.plans[chosen.strategy] += 1
+        return chosen
+
+    def record_fallback(self, plan: QueryPlan) -> None:
+        plan.fallback = True
+        with self._lock:
+            self.fallbacks += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"oversample": self.oversample, "plans": dict(self.plans), "fallbacks": self.fallbacks}
+
+
+def _is_categorical(value: Any) -> bool:
+    return isinstance(value, (str, int, float, bool))
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, numbers.Real) and not isinstance(value, bool)
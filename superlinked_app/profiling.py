@@ -0,0 +1,93 @@
+# procurement/profiling.py
+"""
+Import-time profile of the app, measured with `python -X importtime` in a fresh
+interpreter so nothing is already cached in sys.modules.
+
+Reports the total import time, the cumulative time of each superlinked_app
+module and the slowest third-party packages. `--json` writes the same numbers
+for tracking cold-start time across releases.
+
+    python -m superlinked_app.profiling --module superlinked_app.app --top 15
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from dataclasses import dataclass
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+@dataclass
+class ImportTiming:
+    module: str
+    self_seconds: float
+    cumulative_seconds: float
+    depth: int
+
+
+def parse_importtime(stderr: str) -> list[ImportTiming]:
+    timings = []
+    for line in stderr.splitlines():
+        if match := _IMPORTTIME_LINE.match(line):
+            self_us, cumulative_us, indent, module = match.groups()
+            timings.append(ImportTiming(module, int(self_us) / 1e6, int(cumulative_us) / 1e6, (len(indent) - 1) // 2))
+    return timings
+
+
+def profile_imports(module: str) -> list[ImportTiming]:
+    """Import `module` in a child interpreter and return its -X importtime records."""
+    env = {**os.environ, "PYTHONPROFILEIMPORTTIME": "1"}
+    result = subprocess.run(
+        [sys.executable, "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=False,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def summarize(timings: list[ImportTiming], package: str = "superlinked_app", top: int = 15) -> dict:
+    own, packages = {}, {}
+    for timing in timings:
+        top_level = timing.module.split(".")[0]
+        if top_level == package:
+            own[timing.module] = timing.cumulative_seconds
+        else:
+            # The outermost import of a package carries the cost of everything under it
+            packages[top_level] = max(packages.get(top_level, 0.0), timing.cumulative_seconds)
+    slowest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "total_seconds": sum(timing.cumulative_seconds for timing in timings if timing.depth == 0),
+        "modules": dict(sorted(own.items(), key=lambda item: item[1], reverse=True)),
+        "slowest_packages": dict(slowest),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="superlinked_app.app")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    report = summarize(profile_imports(args.module), top=args.top)
+    print(f"import {args.module}: {report['total_seconds']:.2f}s")
+    print(f"\n{'superlinked_app module':<40}{'cumulative s':>14}")
+    for module, seconds in report["modules"].items():
+        print(f"{module:<40}{seconds:>14.3f}")
+    print(f"\n{'slowest packages':<40}{'cumulative s':>14}")
+    for module, seconds in report["slowest_packages"].items():
+        print(f"{module:<40}{seconds:>14.3f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"module": args.module, **report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,6 @@
 # procurement/query.py
 from superlinked import framework as sl
 import os
-import pandas as pd
 from collections import namedtuple
 from .schema import product_schema
 from .index import (
@@ -29,9 +28,9 @@ from .nlq import (
     brand_description,
 )
 from .configs import settings
+from .snapshot import catalog_options
 
-from dotenv import load_dotenv
-load_dotenv(override=True)
+DEPARTMENTS = ["Women", "Men", "Kids"]
 
 # Main procurement query
 procurement_query = (
@@ -90,7 +89,7 @@ procurement_query = procurement_query.filter(
         sl.Param(
             "departments_include",
             description=department_description,
-            options=["Women", "Men", "Kids"]
+            options=DEPARTMENTS
         )
     )
 )
@@ -123,7 +122,7 @@ filters = [
         param_name="brands_include",
         category_name="brand",
         description="Brands that should be included in search",
-        options=pd.read_csv('./data/csv/products_enriched.csv')['brand'].unique().tolist()
+        options=catalog_options(settings.catalog_path, settings.snapshot_path, settings.data_path, "brand")
     )
 ]
 
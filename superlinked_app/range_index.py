@@ -0,0 +1,196 @@
+# procurement/range_index.py
+import numbers
+import threading
+from typing import Any, Collection, Mapping, Sequence
+
+import numpy as np
+from superlinked.framework.common.interface.comparison_operand import ComparisonOperation
+from superlinked.framework.common.interface.comparison_operation_type import ComparisonOperationType
+
+# Values per row are allocated in steps of at least this many rows
+MIN_GROWTH = 1024
+# Rows written since a column was sorted are checked one by one; past this share of the rows it is sorted again
+RESORT_FRACTION = 1 / 16
+_COMPARE = {
+    ComparisonOperationType.GREATER_THAN: np.greater,
+    ComparisonOperationType.GREATER_EQUAL: np.greater_equal,
+    ComparisonOperationType.LESS_THAN: np.less,
+    ComparisonOperationType.LESS_EQUAL: np.less_equal,
+}
+
+
+class _SortedColumn:
+    """Values of one numeric field by row position (NaN when missing) and, as of the last sort, their order."""
+
+    def __init__(self) -> None:
+        self.values = np.full(0, np.nan)
+        self.order = np.empty(0, dtype=np.intp)
+        self.sorted_values = np.empty(0)
+        self.sorted_rows = 0
+        # Rows written since the last sort: their entries in `order` may be out of date
+        self.stale = np.zeros(0, dtype=bool)
+        self.stale_positions: list[int] = []
+
+    def write(self, position: int, value: Any) -> None:
+        value = float(value) if _is_number(value) else np.nan
+        old = self.values[position]
+        # Rows appended since the last sort are not in `order` yet, so they count as written even if unchanged
+        if position < self.sorted_rows and (value == old or (np.isnan(value) and np.isnan(old))):
+            return
+        self.values[position] = value
+        if not self.stale[position]:
+            self.stale[position] = True
+            self.stale_positions.append(position)
+
+    def sort(self, rows: int) -> None:
+        values = self.values[:rows]
+        valued = np.flatnonzero(~np.isnan(values))
+        self.order = valued[np.argsort(values[valued], kind="stable")]
+        self.sorted_values = values[self.order]
+        self.sorted_rows = rows
+        self.stale[:] = False
+        self.stale_positions = []
+
+    def span(self, op: ComparisonOperationType, other: float) -> tuple[int, int]:
+        """Slice of the sorted values passing `op other`."""
+        if op is ComparisonOperationType.GREATER_THAN:
+            return int(np.searchsorted(self.sorted_values, other, "right")), len(self.order)
+        if op is ComparisonOperationType.GREATER_EQUAL:
+            return int(np.searchsorted(self.sorted_values, other, "left")), len(self.order)
+        if op is ComparisonOperationType.LESS_THAN:
+            return 0, int(np.searchsorted(self.sorted_values, other, "left"))
+        return 0, int(np.searchsorted(self.sorted_values, other, "right"))
+
+    def passes_all(self, op: ComparisonOperationType, other: float) -> bool:
+        """Whether every row passes, e.g. the default `min_cost=0`; False when unsure."""
+        low, high = self.span(op, other)
+        if (low, high) != (0, len(self.order)) or len(self.order) != self.sorted_rows:
+            return False
+        return bool(self.test(np.asarray(self.stale_positions, dtype=np.intp), op, other).all())
+
+    def matches(self, op: ComparisonOperationType, other: float) -> np.ndarray:
+        """Sorted positions of the rows passing `op other`."""
+        low, high = self.span(op, other)
+        positions = self.order[low:high]
+        if self.stale_positions:
+            stale = np.asarray(self.stale_positions, dtype=np.intp)
+            positions = np.concatenate([positions[~self.stale[positions]], stale[self.test(stale, op, other)]])
+        return np.sort(positions)
+
+    def test(self, positions: np.ndarray, op: ComparisonOperationType, other: float) -> np.ndarray:
+        # NaN compares False, like a range filter on a missing value
+        return _COMPARE[op](self.values[positions], other)
+
+
+class RangeFilterIndex:
+    """
+    Sorted column indexes over numeric fields (cost, profit margin, return rate,
+    orders, revenue, ...), keyed by row position in the VectorMatrix. A range
+    filter is resolved by binary search on the sorted values of its field:
+
+    - filters every row passes (the `min_cost=0` / `max_cost=1000` defaults) are
+      dropped without touching the rows;
+    - the most selective of the rest gives the starting positions, intersected
+      with the categorical candidates, if it matches fewer rows than both those
+      candidates and `scan_fraction` of the catalog;
+    - the other range filters, or all of them when none is selective enough, are
+      checked as vectorized column comparisons on those positions.
+
+    Writes do not re-sort: rows written since the last sort are checked directly
+    until they are more than RESORT_FRACTION of the rows. Filters on other fields,
+    OR groups and non-numeric bounds are left to the caller.
+    """
+
+    def __init__(self, fields: Collection[str], scan_fraction: float = 0.25) -> None:
+        self.fields = set(fields)
+        self.scan_fraction = scan_fraction
+        self._lock = threading.Lock()
+        self._rows = 0
+        self._columns = {field: _SortedColumn() for field in self.fields}
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def update(self, position: int, row: Mapping[str, Any]) -> None:
+        """Index the current values of the row at `position`."""
+        with self._lock:
+            self._reserve(position + 1)
+            self._rows = max(self._rows, position + 1)
+            for field, column in self._columns.items():
+                column.write(position, row.get(field))
+
+    def select(
+        self, filters: Sequence[ComparisonOperation], candidates: np.ndarray | None = None
+    ) -> tuple[np.ndarray | None, list[ComparisonOperation]]:
+        """
+        Positions among `candidates` (None for every row) passing the indexed range
+        filters, and the filters the index could not answer.
+        """
+        conditions, residual = [], []
+        for filter_ in filters:
+            condition = self._condition(filter_)
+            if condition is None:
+                residual.append(filter_)
+            else:
+                conditions.append(condition)
+        if not conditions:
+            return candidates, residual
+        with self._lock:
+            return self._positions(conditions, candidates), residual
+
+    def answers(self, filter_: ComparisonOperation) -> bool:
+        return self._condition(filter_) is not None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rows": self._rows,
+                "unsorted_rows": {field: len(column.stale_positions) for field, column in self._columns.items()},
+            }
+
+    def _condition(self, filter_: ComparisonOperation) -> tuple[_SortedColumn, ComparisonOperationType, float] | None:
+        field = getattr(filter_._operand, "name", None)
+        if filter_._group_key is not None or field not in self.fields or filter_._op not in _COMPARE:
+            return None
+        if not _is_number(filter_._other):
+            return None
+        return self._columns[field], filter_._op, float(filter_._other)
+
+    def _positions(
+        self, conditions: list[tuple[_SortedColumn, ComparisonOperationType, float]], candidates: np.ndarray | None
+    ) -> np.ndarray | None:
+        """Holds the lock."""
+        for column, _, _ in conditions:
+            if not column.sorted_rows or len(column.stale_positions) > self._rows * RESORT_FRACTION:
+                column.sort(self._rows)
+        conditions = [condition for condition in conditions if not condition[0].passes_all(condition[1], condition[2])]
+        if not conditions:
+            return candidates
+        spans = [column.span(op, other) for column, op, other in conditions]
+        estimates = [high - low for low, high in spans]
+        first = estimates.index(min(estimates))
+        limit = min(self._rows if candidates is None else len(candidates), self.scan_fraction * self._rows)
+        if estimates[first] < limit:
+            column, op, other = conditions.pop(first)
+            positions = column.matches(op, other)
+            if candidates is not None:
+                positions = np.intersect1d(positions, candidates, assume_unique=True)
+        else:
+            positions = np.arange(self._rows) if candidates is None else candidates
+        for column, op, other in conditions:
+            positions = positions[column.test(positions, op, other)]
+        return positions
+
+    def _reserve(self, rows: int) -> None:
+        for column in self._columns.values():
+            if rows > len(column.values):
+                capacity = max(rows, len(column.values) + max(MIN_GROWTH, len(column.values) // 2))
+                values = np.full(capacity, np.nan)
+                values[: len(column.values)] = column.values
+                stale = np.zeros(capacity, dtype=bool)
+                stale[: len(column.stale)] = column.stale
+                column.values, column.stale = values, stale
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, numbers.Real) and not isinstance(value, bool)
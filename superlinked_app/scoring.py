@@ -0,0 +1,101 @@
+# procurement/scoring.py
+import threading
+
+import numpy as np
+
+# Rows added at once when the matrix is full, at least; it grows by half its size otherwise
+MIN_GROWTH = 1024
+
+
+class VectorMatrix:
+    """
+    The index vectors of every row, as one contiguous float32 matrix. Superlinked
+    concatenates the spaces of an index into one vector per product and weights
+    them per space in the query vector, so a search over all products is a single
+    matrix-vector product, and top-k a partial sort of its result.
+
+    Rows keep the position of their first write; rewriting a row updates it in
+    place. Searches work on the rows present when they start.
+    """
+
+    def __init__(self, dimension: int) -> None:
+        self.dimension = dimension
+        self._matrix = np.zeros((0, dimension), dtype=np.float32)
+        self._row_ids: list[str] = []
+        self._positions: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._row_ids)
+
+    @property
+    def row_ids(self) -> list[str]:
+        return self._row_ids
+
+    def position(self, row_id: str) -> int | None:
+        return self._positions.get(row_id)
+
+    def upsert(self, row_ids: list[str], vectors: np.ndarray) -> None:
+        """Write one vector per row id, appending rows that are new."""
+        with self._lock:
+            new = [row_id for row_id in dict.fromkeys(row_ids) if row_id not in self._positions]
+            self._reserve(len(self._row_ids) + len(new))
+            for row_id in new:
+                self._positions[row_id] = len(self._row_ids)
+                self._row_ids.append(row_id)
+            self._matrix[[self._positions[row_id] for row_id in row_ids]] = vectors
+
+    def view(self) -> tuple[np.ndarray, list[str]]:
+        """
+        The filled part of the matrix and the row ids list. Rows appended later only
+        extend the list, so positions below the matrix length stay valid.
+        """
+        with self._lock:
+            return self._matrix[: len(self._row_ids)], self._row_ids
+
+    def top_k(
+        self,
+        query: np.ndarray,
+        limit: int,
+        candidates: np.ndarray | None = None,
+        min_score: float | None = None,
+    ) -> list[tuple[str, float]]:
+        """
+        The `limit` best (row id, inner product) pairs, best first and ties in row
+        order, among `candidates` (row positions) or all rows. A negative limit
+        returns every row; `min_score` drops rows that score lower.
+        """
+        matrix, row_ids = self.view()
+        if candidates is not None:
+            candidates = candidates[candidates < len(matrix)]
+            # Gathering most of the rows costs more than scoring them all
+            if len(candidates) > len(matrix) // 2:
+                scores = (matrix @ query.astype(np.float32))[candidates]
+            else:
+                scores = matrix[candidates] @ query.astype(np.float32)
+        else:
+            candidates = np.arange(len(matrix))
+            scores = matrix @ query.astype(np.float32)
+        if min_score is not None:
+            keep = scores >= min_score
+            candidates, scores = candidates[keep], scores[keep]
+        if 0 <= limit < len(scores):
+            best = np.argpartition(-scores, limit - 1)[:limit] if limit else np.empty(0, dtype=np.intp)
+            candidates, scores = candidates[best], scores[best]
+        order = np.lexsort((candidates, -scores))
+        return [(row_ids[candidates[i]], float(scores[i])) for i in order]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._matrix = np.zeros((0, self.dimension), dtype=np.float32)
+            self._row_ids = []
+            self._positions = {}
+
+    def _reserve(self, rows: int) -> None:
+        """Grow the matrix to hold at least `rows`. Holds the lock; searches keep the old array."""
+        if rows <= len(self._matrix):
+            return
+        capacity = max(rows, len(self._matrix) + max(MIN_GROWTH, len(self._matrix) // 2))
+        matrix = np.zeros((capacity, self.dimension), dtype=np.float32)
+        matrix[: len(self._row_ids)] = self._matrix[: len(self._row_ids)]
+        self._matrix = matrix
@@ -0,0 +1,79 @@
+# procurement/search_batch.py
+import asyncio
+import time
+from typing import Any, Callable, Sequence
+
+from loguru import logger
+
+NATURAL_QUERY_PARAM = "natural_query"
+
+
+async def run_search_batch(
+    payloads: Sequence[Any],
+    extract: Callable[[dict], dict],
+    search: Callable[[dict], Any],
+    prefetch: Callable[[list[str]], None] | None = None,
+    text_params: Sequence[str] = (),
+    max_concurrency: int = 8,
+) -> list[dict]:
+    """
+    Run many search payloads in three stages instead of one full search each:
+
+    1. `extract` turns each payload's natural query into params, at most
+       `max_concurrency` at a time (these are the LLM calls);
+    2. the distinct values of `text_params` across the batch go to `prefetch`,
+       so they are embedded in one model call;
+    3. `search` runs each payload with its extracted params set explicitly,
+       so no LLM call is repeated, again `max_concurrency` at a time.
+
+    Results come back in input order as {"result": ...} or {"error": message}; a
+    failing item does not fail the batch.
+    """
+    start = time.perf_counter()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    outcomes: list[dict] = [{} for _ in payloads]
+
+    async def limited(func, *args):
+        async with semaphore:
+            return await asyncio.to_thread(func, *args)
+
+    async def extract_one(row: int, payload: Any) -> dict | None:
+        if not isinstance(payload, dict):
+            outcomes[row] = {"error": "Each query must be a JSON object"}
+            return None
+        try:
+            extracted = await limited(extract, payload) if payload.get(NATURAL_QUERY_PARAM) else {}
+        except Exception as e:
+            outcomes[row] = {"error": str(e)}
+            return None
+        # Values sent with the request win over extracted ones, as they do in a single search
+        params = {name: value for name, value in extracted.items() if value is not None}
+        params.update((name, value) for name, value in payload.items() if name != NATURAL_QUERY_PARAM)
+        return params
+
+    params_by_row = await asyncio.gather(*(extract_one(row, payload) for row, payload in enumerate(payloads)))
+    extracted_at = time.perf_counter()
+
+    texts = [
+        params[name]
+        for params in params_by_row
+        if params is not None
+        for name in text_params
+        if isinstance(params.get(name), str) and params[name]
+    ]
+    if prefetch is not None and texts:
+        prefetch(list(dict.fromkeys(texts)))
+
+    async def search_one(row: int, params: dict) -> None:
+        try:
+            outcomes[row] = {"result": await limited(search, params)}
+        except Exception as e:
+            outcomes[row] = {"error": str(e)}
+
+    await asyncio.gather(*(search_one(row, params) for row, params in enumerate(params_by_row) if params is not None))
+    logger.info(
+        "Batch of {} searches: extraction {:.2f}s, search {:.2f}s, {} distinct texts, {} errors",
+        len(payloads), extracted_at - start, time.perf_counter() - extracted_at,
+        len(set(texts)), sum("error" in outcome for outcome in outcomes),
+    )
+    return outcomes
@@ -1,28 +1,340 @@
-# from fastapi import FastAPI
-# from fastapi.middleware.cors import CORSMiddleware
-# import os
-# from superlinked.server import create_app
-
-# def create_app_with_cors() -> FastAPI:
-#     app = create_app()
-    
-#     # Get CORS settings from environment variables
-#     origins = os.getenv("CORS_ALLOW_ORIGINS", "*").split(",")
-#     methods = os.getenv("CORS_ALLOW_METHODS", "GET,POST,OPTIONS").split(",")
-#     headers = os.getenv("CORS_ALLOW_HEADERS", "*").split(",")
-    
-#     # Add CORS middleware
-#     app.add_middleware(
-#         CORSMiddleware,
-#         allow_origins=origins,
-#         allow_credentials=True,
-#         allow_methods=methods,
-#         allow_headers=headers,
-#     )
-    
-#     return app
-
-# if __name__ == "__main__":
-#     import uvicorn
-#     app = create_app_with_cors()
-#     uvicorn.run(app, host="0.0.0.0", port=8080) 
\ No newline at end of file
+# superlinked_app/server.py
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import APIRouter, FastAPI, HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse
+from loguru import logger
+from superlinked.server.app import ServerApp
+from superlinked.server.configuration.app_config import AppConfig
+
+from .admission import LOW_PRIORITY, PRIORITIES, AdmissionRejected, request_priority
+from .app import (
+    executor,
+    product_fingerprints,
+    product_loader_source,
+    product_quarantine,
+    product_source,
+    speculative_embeddings,
+    vector_database,
+)
+from .degraded import degradation_scope
+from .bulk import BulkParseError, bulk_ingest
+from .configs import settings
+from .embedding import warm_up_text_models
+from .index import procurement_index
+from .ingestion import ingest_catalog
+from .nlq_handler import (
+    extract_params,
+    get_admission_controller,
+    get_degraded_mode,
+    get_option_pruner,
+    get_param_cache,
+    get_rule_parser,
+    get_semantic_cache,
+)
+from .planner import plan_scope
+from .search_batch import run_search_batch
+from .single_flight import SingleFlight, request_key
+from .vector_store import ProcurementInMemoryVectorDatabase
+from .write_buffer import WriteBuffer
+
+router = APIRouter()
+
+# Route the executor registers for procurement_query with its default endpoint configuration
+SEARCH_PATH = "/api/v1/search/procurement_query"
+search_flight = SingleFlight()
+# Text params of procurement_query whose values are embedded together for a batch
+BATCH_TEXT_PARAMS = ["product_description"]
+
+product_write_buffer = WriteBuffer(
+    product_source.put,
+    settings.ingest_buffer_max_rows,
+    settings.ingest_buffer_max_wait_ms / 1000,
+)
+
+# Keep references to background tasks so they are not garbage collected mid-run
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _set_priority(request: Request, default: int | None = None) -> None:
+    """Priority of this request's LLM extractions, from the X-Priority header (high, normal or low)."""
+    name = request.headers.get("x-priority")
+    if name is not None and name.lower() not in PRIORITIES:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, f"X-Priority must be one of {', '.join(PRIORITIES)}")
+    if name is not None:
+        request_priority.set(PRIORITIES[name.lower()])
+    elif default is not None:
+        request_priority.set(default)
+
+
+def _on_task_done(task: asyncio.Task) -> None:
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.opt(exception=task.exception()).error("Background task failed")
+
+
+def _run_in_background(func, *args) -> asyncio.Task:
+    task = asyncio.create_task(asyncio.to_thread(func, *args))
+    _background_tasks.add(task)
+    task.add_done_callback(_on_task_done)
+    return task
+
+
+@router.post("/data-loader/product_schema/run-batched", status_code=status.HTTP_202_ACCEPTED)
+async def run_batched_data_loader(full: bool = False) -> dict:
+    """
+    Load the catalog in row/byte sized batches instead of `chunk_size` rows at a time,
+    from the Arrow snapshot when it is current and from the CSV otherwise.
+    Only products whose content changed since the last run are written, unless `full` is set;
+    the load logs which of the two files it read.
+    """
+    if full:
+        product_fingerprints.clear()
+    _run_in_background(
+        ingest_catalog,
+        product_loader_source,
+        settings.data_path,
+        settings.snapshot_path,
+        settings.ingest_batch_rows,
+        settings.ingest_batch_bytes,
+        product_fingerprints,
+        product_quarantine,
+    )
+    logger.info("Started batched data load")
+    return {"full": full}
+
+
+@router.post("/api/v1/ingest/product_schema", status_code=status.HTTP_202_ACCEPTED)
+async def ingest_product(request: Request) -> Response:
+    """
+    Same contract as the executor's ingest route, but concurrent requests are written
+    together through `product_write_buffer` instead of one embedding call and one
+    vector store write each. Returns once the product is written.
+    """
+    await product_write_buffer.submit(await request.json())
+    return Response(status_code=status.HTTP_202_ACCEPTED)
+
+
+@router.post("/api/v1/ingest/product_schema/bulk")
+async def bulk_ingest_products(request: Request) -> dict:
+    """
+    Stream many products in one request, as NDJSON or a JSON array. Rows are written
+    in batches of `bulk_batch_rows` while the body is still arriving, and the body is
+    read no faster than the vector store can take it.
+    """
+    try:
+        report = await bulk_ingest(
+            request.stream(),
+            product_source.put,
+            settings.bulk_batch_rows,
+            settings.bulk_max_pending_batches,
+        )
+    except BulkParseError as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, f"{e} ({e.rows_written} rows written)") from e
+    return {
+        "rows": report.rows,
+        "seconds": round(report.seconds, 4),
+        "batches": [
+            {
+                "batch": ack.batch,
+                "rows": ack.rows,
+                "queued_seconds": round(ack.queued_seconds, 4),
+                "write_seconds": round(ack.write_seconds, 4),
+            }
+            for ack in report.batches
+        ],
+    }
+
+
+@router.post("/vector-store/snapshot")
+async def export_vector_snapshot() -> dict:
+    """
+    Write the in-memory vector store to `vector_snapshot_dir` now, e.g. after a load,
+    so new instances can start from it. The server also does this on shutdown.
+    """
+    if not isinstance(vector_database, ProcurementInMemoryVectorDatabase):
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Snapshots are only supported for the in-memory vector store")
+    rows = await asyncio.to_thread(vector_database.connector.export_snapshot, settings.vector_snapshot_dir)
+    return {"path": settings.vector_snapshot_dir, "rows": rows}
+
+
+@router.post(SEARCH_PATH)
+async def search_products(request: Request) -> JSONResponse:
+    """
+    Same contract as the executor's query route, but the query runs in a worker thread
+    instead of blocking the event loop, and identical requests that arrive while one
+    is running wait for it and share its result. A search whose LLM extraction is shed
+    by admission control gets 503 with Retry-After, unless degraded mode answers it.
+
+    When the natural query was interpreted without the LLM (degraded mode), the
+    response has a "degraded" object naming the fallback and an X-Degraded header.
+    With metadata included, "metadata.plan" says how the in-memory store ran the search.
+    """
+    payload = await request.json()
+    include_metadata = request.headers.get("x-include-metadata", "false").lower() == "true"
+    _set_priority(request)
+
+    def search():
+        with degradation_scope() as degradation, plan_scope() as plans:
+            result = executor.query(SEARCH_PATH, payload, include_metadata)
+        content = result.model_dump() if include_metadata else result.model_dump(exclude={"metadata"})
+        return _with_plan(content, plans), degradation
+
+    def run():
+        return asyncio.to_thread(search)
+
+    try:
+        if settings.coalesce_searches:
+            content, degradation = await search_flight.do(request_key(SEARCH_PATH, payload, include_metadata), run)
+        else:
+            content, degradation = await run()
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status.HTTP_503_SERVICE_UNAVAILABLE, str(e), headers={"Retry-After": str(max(1, round(e.waited_seconds)))}
+        ) from e
+    if degradation.fallback is None:
+        return JSONResponse(content)
+    # Coalesced requests share the content, so it is copied rather than changed
+    content = {**content, "degraded": {"fallback": degradation.fallback, "reason": degradation.reason}}
+    return JSONResponse(content, headers={"X-Degraded": degradation.fallback})
+
+
+@router.get("/nlq/stats")
+async def nlq_stats() -> dict:
+    """Counters of the natural-query extraction stage."""
+    param_cache, semantic_cache, rule_parser = get_param_cache(), get_semantic_cache(), get_rule_parser()
+    option_pruner, admission, degraded_mode = get_option_pruner(), get_admission_controller(), get_degraded_mode()
+    return {
+        "admission": admission.stats() if admission is not None else None,
+        "degraded_mode": degraded_mode.stats() if degraded_mode is not None else None,
+        "param_cache": param_cache.stats() if param_cache is not None else None,
+        "prompt": option_pruner.stats() if option_pruner is not None else None,
+        "rule_parser": rule_parser.stats() if rule_parser is not None else None,
+        "semantic_cache": semantic_cache.stats() if semantic_cache is not None else None,
+        "speculative_embedding": speculative_embeddings.stats(),
+    }
+
+
+@router.post(f"{SEARCH_PATH}/batch")
+async def search_products_batch(request: Request) -> dict:
+    """
+    Run many procurement_query payloads in one request: {"queries": [{"natural_query": ..., "limit": 5}, ...]}.
+    Natural queries are extracted with bounded concurrency, the product descriptions of the
+    whole batch are embedded in one model call, and results come back in input order with
+    an error per item that failed. Its extractions queue behind single searches unless
+    X-Priority says otherwise. Results interpreted without the LLM are flagged "degraded".
+    """
+    _set_priority(request, LOW_PRIORITY)
+    body = await request.json()
+    payloads = body.get("queries") if isinstance(body, dict) else None
+    if not isinstance(payloads, list):
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, 'Expected a JSON object with a "queries" list')
+    if len(payloads) > settings.search_batch_max_queries:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, f"At most {settings.search_batch_max_queries} queries per batch"
+        )
+    include_metadata = request.headers.get("x-include-metadata", "false").lower() == "true"
+    query_descriptor = executor.query_descriptor(SEARCH_PATH)
+
+    # Fallbacks taken by degraded mode, by payload, to flag their results
+    degradations = {}
+
+    def extract(payload: dict) -> dict:
+        with degradation_scope() as degradation:
+            params = extract_params(query_descriptor, payload)
+        if degradation.fallback is not None:
+            degradations[id(payload)] = {"fallback": degradation.fallback, "reason": degradation.reason}
+        return params
+
+    def search(params: dict) -> dict:
+        with plan_scope() as plans:
+            result = executor.query(SEARCH_PATH, params, include_metadata)
+        content = result.model_dump() if include_metadata else result.model_dump(exclude={"metadata"})
+        return _with_plan(content, plans)
+
+    results = await run_search_batch(
+        payloads,
+        extract,
+        search,
+        speculative_embeddings.start,
+        BATCH_TEXT_PARAMS,
+        settings.search_batch_concurrency,
+    )
+    for payload, outcome in zip(payloads, results):
+        if id(payload) in degradations and "result" in outcome:
+            outcome["result"]["degraded"] = degradations[id(payload)]
+    return {"results": results}
+
+
+@router.get("/search/stats")
+async def search_stats() -> dict:
+    """
+    How many searches were answered by an identical request already in flight, how
+    they were planned, and the state of the approximate index.
+    """
+    in_memory = isinstance(vector_database, ProcurementInMemoryVectorDatabase)
+    planner = vector_database.connector.planner if in_memory else None
+    return {
+        "ann_index": vector_database.connector.ann_stats() if in_memory else None,
+        "planner": planner.stats() if planner is not None else None,
+        "single_flight": search_flight.stats() if settings.coalesce_searches else None,
+    }
+
+
+def _with_plan(content: dict, plans: list) -> dict:
+    """Add the plan of the search to its metadata, when the metadata is returned."""
+    if plans and isinstance(content.get("metadata"), dict):
+        content["metadata"]["plan"] = plans[-1].as_dict()
+    return content
+
+
+def _warm_up_models() -> None:
+    try:
+        warm_up_text_models(procurement_index)
+    except Exception:
+        logger.exception("Model warm-up failed, models will load on first use")
+
+
+def _extend_lifespan(app: FastAPI) -> None:
+    """
+    Load models in a thread while the executor starts, log how long startup took,
+    and write buffered products before the executor shuts down and persists.
+    """
+    server_lifespan = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def lifespan(app_: FastAPI):
+        start = time.perf_counter()
+        if settings.warm_up_models:
+            threading.Thread(target=_warm_up_models, name="model-warm-up", daemon=True).start()
+        async with server_lifespan(app_) as state:
+            logger.info("Server ready in {:.2f}s", time.perf_counter() - start)
+            yield state
+            await product_write_buffer.close()
+
+    app.router.lifespan_context = lifespan
+
+
+def create_app() -> FastAPI:
+    """Superlinked server app extended with the procurement-specific routes."""
+    app = ServerApp().app
+    app.include_router(router)
+    _extend_lifespan(app)
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    app_config = AppConfig()
+    uvicorn.run(
+        "superlinked_app.server:create_app",
+        host=app_config.SERVER_HOST,
+        port=app_config.SERVER_PORT,
+        workers=app_config.WORKER_COUNT,
+        log_config=None,
+        factory=True,
+    )
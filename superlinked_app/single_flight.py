@@ -0,0 +1,46 @@
+# procurement/single_flight.py
+import asyncio
+import hashlib
+import json
+from typing import Awaitable, Callable
+
+
+class SingleFlight:
+    """
+    Runs one computation per key at a time: callers arriving while a computation
+    for their key is in flight wait for it and get its result (or its exception)
+    instead of starting their own. Nothing is kept once it finishes, so this only
+    merges requests that overlap in time.
+    """
+
+    def __init__(self) -> None:
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, compute: Callable[[], Awaitable]):
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(compute())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+        # A caller that goes away must not cancel the computation the others wait for
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        requests = self.executed + self.coalesced
+        return {
+            "in_flight": len(self._in_flight),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "coalesced_rate": self.coalesced / requests if requests else 0.0,
+        }
+
+
+def request_key(path: str, payload, *options) -> str:
+    """Hash of a request by content: key order and formatting of the JSON payload do not matter."""
+    text = json.dumps([path, payload, *options], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
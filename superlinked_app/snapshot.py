@@ -0,0 +1,193 @@
+# procurement/snapshot.py
+"""
+Typed Arrow IPC snapshot of the product catalog.
+
+The snapshot holds exactly the ProductSchema columns with their schema types, so
+loading it needs no text parsing or type inference. It is read through a memory
+map: numeric columns go to pandas without a copy and the option lists read one
+column without touching the rest.
+
+Alongside it, a small JSON catalog holds the distinct brands, categories and
+departments, so building the query's option lists at import reads a few KB.
+Both record the CSV's size, modification time and sha256 (see matches_source),
+so checking them only reads the CSV when it was copied without being changed.
+
+    python -m superlinked_app.snapshot     # settings.data_path -> settings.snapshot_path + catalog_path
+"""
+import argparse
+import hashlib
+import json
+import os
+from functools import lru_cache
+from typing import Iterator, Mapping
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import csv as pa_csv
+from loguru import logger
+from superlinked import framework as sl
+
+from .schema import product_schema
+
+CATALOG_COLUMNS = ["brand", "category", "department"]
+
+_ARROW_TYPES = {
+    sl.String: pa.string(),
+    sl.Float: pa.float64(),
+    sl.Integer: pa.int64(),
+}
+
+
+def arrow_schema() -> pa.Schema:
+    """Arrow schema matching ProductSchema field for field, id first."""
+    fields = [pa.field(product_schema.id.name, pa.string(), nullable=False)]
+    for field in product_schema.schema_fields:
+        fields.append(pa.field(field.name, _ARROW_TYPES[type(field)]))
+    return pa.schema(fields)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_key(path: str, sha256: str | None = None) -> dict[str, str]:
+    """What the snapshot records of the CSV it was built from: size, modification time and contents."""
+    stat = os.stat(path)
+    return {
+        "source_size": str(stat.st_size),
+        "source_mtime_ns": str(stat.st_mtime_ns),
+        "source_sha256": sha256 or file_sha256(path),
+    }
+
+
+def matches_source(recorded: Mapping[str, str], path: str) -> bool:
+    """
+    Whether `path` still has the contents `recorded` by source_key. A file of
+    another size has changed and an untouched one is current, without reading
+    either; one with the same size but a new modification time (a git clone, a
+    Docker COPY) is hashed, once per process.
+    """
+    stat = os.stat(path)
+    if recorded.get("source_size") != str(stat.st_size):
+        return False
+    if recorded.get("source_mtime_ns") == str(stat.st_mtime_ns):
+        return True
+    return recorded.get("source_sha256") == _content_sha256(path, stat.st_size, stat.st_mtime_ns)
+
+
+@lru_cache(maxsize=8)
+def _content_sha256(path: str, size: int, mtime_ns: int) -> str:
+    return file_sha256(path)
+
+
+def convert_csv(csv_path: str, snapshot_path: str, batch_rows: int = 2048, catalog_path: str | None = None) -> int:
+    """
+    Write the schema columns of `csv_path` to an Arrow IPC file, and the option
+    catalog to `catalog_path` if given. Returns the row count.
+    """
+    schema = arrow_schema()
+    table = pa_csv.read_csv(
+        csv_path,
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=schema.names,
+            column_types={field.name: field.type for field in schema},
+            # Match pandas: an empty cell is a missing value, not an empty string
+            strings_can_be_null=True,
+        ),
+    )
+    table = table.select(schema.names).cast(schema)
+    source = source_key(csv_path)
+    schema = schema.with_metadata({key.encode(): value.encode() for key, value in source.items()})
+    table = table.replace_schema_metadata(schema.metadata)
+
+    os.makedirs(os.path.dirname(os.path.abspath(snapshot_path)), exist_ok=True)
+    tmp_path = f"{snapshot_path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        writer.write_table(table, max_chunksize=batch_rows)
+    os.replace(tmp_path, snapshot_path)
+    logger.info("Wrote {} products from {} to {}", table.num_rows, csv_path, snapshot_path)
+    if catalog_path:
+        write_catalog(table, catalog_path, source)
+    return table.num_rows
+
+
+def write_catalog(table: pa.Table, path: str, source: Mapping[str, str]) -> None:
+    catalog = {
+        **source,
+        "options": {column: pc.unique(table.column(column).drop_null()).to_pylist() for column in CATALOG_COLUMNS},
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(catalog, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    logger.info("Wrote option catalog to {}", path)
+
+
+def open_snapshot(path: str) -> pa.Table:
+    """Memory-map the snapshot; raises ValueError if it was written for a different schema."""
+    # Arrow buffers keep the map alive, so the file is unmapped when the table is released
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    if not table.schema.equals(arrow_schema(), check_metadata=False):
+        raise ValueError(f"Snapshot {path} does not match ProductSchema, re-run the converter")
+    return table
+
+
+def is_current(snapshot_path: str, csv_path: str) -> bool:
+    """True if the snapshot exists and was built from the current contents of `csv_path` (see matches_source)."""
+    if not os.path.isfile(snapshot_path):
+        return False
+    metadata = pa.ipc.open_file(pa.memory_map(snapshot_path, "r")).schema.metadata or {}
+    if not os.path.isfile(csv_path):
+        return True
+    return matches_source({key.decode(): value.decode() for key, value in metadata.items()}, csv_path)
+
+
+def iter_snapshot_batches(path: str, max_rows: int, max_bytes: int) -> Iterator[pd.DataFrame]:
+    """Snapshot rows as DataFrames, capped by row count and by in-memory Arrow bytes."""
+    table = open_snapshot(path)
+    row_bytes = table.nbytes / table.num_rows if table.num_rows else 1.0
+    batch_rows = max(1, min(max_rows, int(max_bytes // row_bytes)))
+    logger.info("Reading {} in batches of {} rows", path, batch_rows)
+    for batch in table.to_batches(max_chunksize=batch_rows):
+        yield batch.to_pandas()
+
+
+def column_options(snapshot_path: str, csv_path: str, column: str) -> list:
+    """Distinct non-null values of `column` in catalog order, from the snapshot when it is current."""
+    if is_current(snapshot_path, csv_path):
+        return pc.unique(open_snapshot(snapshot_path).column(column).drop_null()).to_pylist()
+    return pd.read_csv(csv_path, usecols=[column])[column].dropna().unique().tolist()
+
+
+def catalog_options(catalog_path: str, snapshot_path: str, csv_path: str, column: str) -> list:
+    """Distinct values of `column` from the precomputed catalog, rebuilt from the data if it is missing or stale."""
+    if os.path.isfile(catalog_path):
+        with open(catalog_path, encoding="utf-8") as f:
+            catalog = json.load(f)
+        current = not os.path.isfile(csv_path) or matches_source(catalog, csv_path)
+        if current and column in catalog.get("options", {}):
+            return catalog["options"][column]
+        logger.warning("Option catalog {} is out of date with {}, reading the data", catalog_path, csv_path)
+    return column_options(snapshot_path, csv_path, column)
+
+
+def main() -> None:
+    from .configs import settings
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=settings.data_path)
+    parser.add_argument("--out", default=settings.snapshot_path)
+    parser.add_argument("--catalog", default=settings.catalog_path)
+    parser.add_argument("--batch-rows", type=int, default=settings.ingest_batch_rows)
+    args = parser.parse_args()
+    convert_csv(args.csv, args.out, args.batch_rows, args.catalog)
+
+
+if __name__ == "__main__":
+    main()
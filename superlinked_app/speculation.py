@@ -0,0 +1,96 @@
+# procurement/speculation.py
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Sequence
+
+import numpy as np
+from loguru import logger
+
+
+class SpeculativeEmbeddings:
+    """
+    Query-text embeddings started before the query needs them. While the LLM is
+    extracting parameters, the texts the query is likely to embed (the raw query,
+    the rule parser's guess of the product description) are embedded on a worker
+    thread; when the query then embeds one of them, it takes the finished (or
+    still running) result instead of running the model again. Batch searches use
+    it the same way to embed all their descriptions in one model call.
+
+    Results are kept for the last `max_entries` texts so concurrent and repeated
+    queries share them.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        embed: Callable[[Sequence[str]], np.ndarray],
+        max_entries: int = 256,
+        max_workers: int = 2,
+    ) -> None:
+        self.model_name = model_name
+        self.embed = embed
+        self.max_entries = max_entries
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="speculative-embedding")
+        self._futures: OrderedDict[str, Future] = OrderedDict()
+        self._lock = threading.Lock()
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+
+    def start(self, texts: Sequence[str]) -> None:
+        """Begin embedding the texts that are not already done or underway, in one model call."""
+        with self._lock:
+            new = [text for text in dict.fromkeys(texts) if text and text not in self._futures]
+            if not new:
+                return
+            futures = [Future() for _ in new]
+            self._futures.update(zip(new, futures))
+            self.started += len(new)
+            while len(self._futures) > self.max_entries:
+                self._futures.popitem(last=False)
+        batch = self._executor.submit(self._embed_many, new)
+        batch.add_done_callback(lambda done: _settle(done, futures))
+
+    def take(self, texts: Sequence[str]) -> dict[str, np.ndarray]:
+        """Vectors of the texts that were speculated, waiting for any still running. Failed ones are left out."""
+        with self._lock:
+            futures = {text: self._futures.get(text) for text in dict.fromkeys(texts)}
+            found = {text: future for text, future in futures.items() if future is not None}
+            self.hits += len(found)
+            self.misses += len(futures) - len(found)
+        vectors = {}
+        for text, future in found.items():
+            try:
+                vectors[text] = future.result()
+            except Exception:
+                # Already logged by the worker; the caller embeds the text itself
+                with self._lock:
+                    self._futures.pop(text, None)
+        return vectors
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "started": self.started,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _embed_many(self, texts: list[str]) -> np.ndarray:
+        try:
+            return np.asarray(self.embed(texts))
+        except Exception:
+            logger.exception("Speculative embedding of {} texts failed", len(texts))
+            raise
+
+
+def _settle(batch: Future, futures: list[Future]) -> None:
+    """Hand each text its row of the batch result, or the batch's exception."""
+    if batch.exception() is not None:
+        for future in futures:
+            future.set_exception(batch.exception())
+        return
+    for row, future in zip(batch.result(), futures):
+        future.set_result(row)
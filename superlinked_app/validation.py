@@ -0,0 +1,120 @@
+# procurement/validation.py
+import os
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+from superlinked import framework as sl
+
+from .schema import product_schema
+
+ID_COLUMN = product_schema.id.name
+# Superlinked skips empty fields, but a product without a name has nothing to embed
+REQUIRED_TEXT_COLUMNS = ["name"]
+TEXT_COLUMNS = [field.name for field in product_schema.schema_fields if isinstance(field, sl.String)]
+FLOAT_COLUMNS = [field.name for field in product_schema.schema_fields if isinstance(field, sl.Float)]
+INTEGER_COLUMNS = [field.name for field in product_schema.schema_fields if isinstance(field, sl.Integer)]
+
+
+@dataclass
+class ValidationResult:
+    """Split of one batch into rows typed for ProductSchema and rows that cannot be ingested."""
+
+    frame: pd.DataFrame
+    # Original values of the rejected rows plus a `reason` column
+    rejected: pd.DataFrame
+
+
+def _is_blank(series: pd.Series) -> pd.Series:
+    if not pd.api.types.is_object_dtype(series) and not pd.api.types.is_string_dtype(series):
+        return series.isna()
+    return series.isna() | (series.astype(str).str.strip() == "")
+
+
+def validate_frame(frame: pd.DataFrame) -> ValidationResult:
+    """
+    Check a batch against the ProductSchema field types, a column at a time.
+
+    Superlinked converts rows one by one and a single bad value (a missing id,
+    a duplicate id, `cost` = "n/a") fails the whole batch. Here numbers are
+    coerced with `pd.to_numeric`, every failing check adds a reason to its row,
+    and only rows without reasons are returned, already cast to the schema types.
+    """
+    reasons = pd.DataFrame(index=frame.index)
+    typed = frame.copy()
+
+    missing_id = _is_blank(frame[ID_COLUMN])
+    reasons[ID_COLUMN] = np.where(missing_id, f"{ID_COLUMN}: missing", "")
+    typed[ID_COLUMN] = frame[ID_COLUMN].astype(str).str.strip()
+    # Later rows win, as they would if the batch were upserted row by row
+    duplicate = typed[ID_COLUMN].duplicated(keep="last") & ~missing_id
+    reasons["duplicate"] = np.where(duplicate, f"{ID_COLUMN}: duplicated later in the batch", "")
+
+    for column in TEXT_COLUMNS:
+        if column not in frame.columns:
+            continue
+        blank = _is_blank(frame[column])
+        typed[column] = frame[column].astype(str).where(~blank, None)
+        if column in REQUIRED_TEXT_COLUMNS:
+            reasons[column] = np.where(blank, f"{column}: missing", "")
+
+    for column in FLOAT_COLUMNS + INTEGER_COLUMNS:
+        if column not in frame.columns:
+            continue
+        values = pd.to_numeric(frame[column], errors="coerce").astype("float64")
+        blank = _is_blank(frame[column])
+        invalid = ~blank & (values.isna() | np.isinf(values))
+        reason = np.where(blank, f"{column}: missing", np.where(invalid, f"{column}: not a number", ""))
+        if column in INTEGER_COLUMNS:
+            fractional = ~blank & ~invalid & (values % 1 != 0)
+            reason = np.where(fractional, f"{column}: not an integer", reason)
+        reasons[column] = reason
+        typed[column] = values
+
+    bad = (reasons != "").any(axis=1)
+    clean = typed[~bad].copy()
+    for column in INTEGER_COLUMNS:
+        if column in clean.columns:
+            clean[column] = clean[column].astype("int64")
+    rejected = frame[bad].copy()
+    # Bad rows are rare, so joining their reasons row by row is cheap
+    rejected.insert(0, "reason", [("; ".join(filter(None, row))) for row in reasons[bad].itertuples(index=False)])
+    return ValidationResult(clean, rejected)
+
+
+class Quarantine:
+    """Appends rejected rows with their reasons to a CSV file for later correction."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.rows = 0
+        # The data loader and the batched loader can run at the same time
+        self._lock = threading.Lock()
+
+    def write(self, rejected: pd.DataFrame) -> None:
+        if rejected.empty:
+            return
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            header = not os.path.isfile(self.path) or os.path.getsize(self.path) == 0
+            rejected.to_csv(self.path, mode="a", header=header, index=False)
+            self.rows += len(rejected)
+        logger.warning("Quarantined {} rows in {}: {}", len(rejected), self.path, rejected["reason"].iloc[0])
+
+
+class ValidatingDataFrameParser(sl.DataFrameParser):
+    """DataFrameParser that validates each chunk and quarantines bad rows before converting it."""
+
+    def __init__(self, schema, mapping=None, quarantine: Quarantine | None = None) -> None:
+        super().__init__(schema=schema, mapping=mapping)
+        self.quarantine = quarantine
+
+    def unmarshal(self, data: pd.DataFrame):
+        result = validate_frame(data)
+        if self.quarantine is not None:
+            self.quarantine.write(result.rejected)
+        elif len(result.rejected):
+            logger.warning("Dropped {} invalid rows: {}", len(result.rejected), result.rejected["reason"].iloc[0])
+        return super().unmarshal(result.frame)
@@ -0,0 +1,498 @@
+# procurement/vector_store.py
+import hashlib
+import json
+import os
+import shutil
+import time
+from collections import defaultdict
+from typing import Any, Sequence
+
+import numpy as np
+from loguru import logger
+from superlinked import framework as sl
+from superlinked.framework.common.data_types import Vector
+from superlinked.framework.common.interface.comparison_operand import ComparisonOperation
+from superlinked.framework.common.storage.entity.entity_data import EntityData
+from superlinked.framework.common.storage.field.field import Field
+from superlinked.framework.common.storage.field.field_data_type import FieldDataType
+from superlinked.framework.common.storage.query.vdb_knn_search_params import VDBKNNSearchParams
+from superlinked.framework.common.storage.result_entity_data import ResultEntityData
+from superlinked.framework.common.storage.search import Search
+from superlinked.framework.storage.common.vdb_settings import VDBSettings
+from superlinked.framework.storage.in_memory.exception import VectorFieldDimensionException
+from superlinked.framework.storage.in_memory.in_memory_search import InMemorySearch
+from superlinked.framework.storage.in_memory.in_memory_vdb import InMemoryVDB
+from superlinked.framework.storage.in_memory.json_codec import JsonDecoder, JsonEncoder
+from superlinked.framework.storage.in_memory.object_serializer import ObjectSerializer
+
+from .ann import IVFIndex, IVFParams
+from .filter_index import CategoricalFilterIndex
+from .planner import (
+    ANN_SCAN,
+    EXACT_SCAN,
+    INDEX_US,
+    ROW_FILTER_US,
+    FieldStatistics,
+    QueryPlan,
+    QueryPlanner,
+    record_plan,
+)
+from .range_index import RangeFilterIndex
+from .scoring import VectorMatrix
+
+SNAPSHOT_FORMAT = 1
+MANIFEST_FILE = "manifest.json"
+PAYLOAD_FILE = "payload.json"
+# Per-row state of a vector field in the snapshot
+ABSENT, PRESENT, EMPTY = 0, 1, 2
+
+
+# Field types answered by the filter index; METADATA_STRING is the schema name every search filters on
+_CATEGORICAL_TYPES = (FieldDataType.STRING, FieldDataType.METADATA_STRING)
+# Field types answered by the range index (cost, margin, return rate, orders, revenue)
+_NUMERIC_TYPES = (FieldDataType.DOUBLE, FieldDataType.INT)
+
+
+class ProcurementInMemoryVDB(InMemoryVDB):
+    """
+    In-memory VDB that persists to a directory of per-field vector matrices
+    (`<field>.npy`) plus a JSON payload, instead of one JSON document. Restoring
+    memory-maps the matrices, so a warm start costs one dict per product rather
+    than re-embedding the catalog.
+
+    The server calls `persist` on shutdown and `restore` once the executor is up.
+
+    With `vectorized_scoring`, index vectors are also kept in one float32 matrix
+    per vector field (see VectorMatrix), and knn searches score all candidates
+    with one matrix-vector product instead of one similarity call per product.
+    With `filter_index` as well, the string fields of the index (department,
+    category, brand) get a CategoricalFilterIndex over the matrix rows, so their
+    filters select the candidates without looking at the other products. With
+    `range_index`, the numeric fields get a RangeFilterIndex, so range filters
+    narrow those candidates by binary search before any vector is scored.
+
+    With a `planner`, per-field statistics are kept for the same rows, and each
+    search is run as the QueryPlanner chooses: an exact scan of the rows passing
+    its filters, or filtering the best candidates fetched without them. The plan is
+    recorded for the response metadata (see plan_scope).
+
+    With `ann` parameters, each matrix also gets an IVFIndex once it holds
+    `min_rows` rows, and searches score only the rows of the lists nearest to the
+    query (those passing the filters, or the best candidates to filter, as the
+    planner chooses). Searches that find fewer results than their limit that way,
+    and searches for every match, stay exact.
+    """
+
+    def __init__(
+        self,
+        vdb_settings: VDBSettings,
+        snapshot_dir: str | None,
+        vectorized_scoring: bool = True,
+        filter_index: bool = True,
+        range_index: bool = True,
+        planner: QueryPlanner | None = None,
+        ann: IVFParams | None = None,
+    ) -> None:
+        super().__init__(vdb_settings)
+        self._snapshot_dir = snapshot_dir
+        self._vectorized_scoring = vectorized_scoring
+        self._use_filter_index = filter_index
+        self._use_range_index = range_index
+        self._matrices: dict[str, VectorMatrix] = {}
+        self._filter_indexes: dict[str, CategoricalFilterIndex] = {}
+        self._range_indexes: dict[str, RangeFilterIndex] = {}
+        self.planner = planner
+        self._statistics: dict[str, FieldStatistics] = {}
+        self._ann_params = ann
+        self._ann_indexes: dict[str, IVFIndex] = {}
+
+    def write_entities(self, entity_data: Sequence[EntityData]) -> None:
+        super().write_entities(entity_data)
+        if self._vectorized_scoring:
+            self._write_matrices(entity_data)
+            row_ids = [InMemoryVDB._get_row_id_from_entity_id(entity.id_) for entity in entity_data]
+            self._update_filter_indexes(row_ids)
+            self._update_ann_indexes(row_ids)
+
+    def close_connection(self) -> None:
+        super().close_connection()
+        self._matrices = {}
+        self._filter_indexes, self._range_indexes, self._statistics = {}, {}, {}
+        self._ann_indexes = {}
+
+    def ann_stats(self) -> dict | None:
+        """State of the approximate index per vector field, or None without one."""
+        if self._ann_params is None:
+            return None
+        return {field_name: ann.stats() for field_name, ann in self._ann_indexes.items()}
+
+    def _knn_search(
+        self,
+        index_name: str,
+        schema_name: str,
+        vdb_knn_search_params: VDBKNNSearchParams,
+        **params: Any,
+    ) -> Sequence[ResultEntityData]:
+        search_params = vdb_knn_search_params
+        matrix = self._matrices.get(search_params.vector_field.name)
+        if matrix is None:
+            return super()._knn_search(index_name, schema_name, search_params, **params)
+        index_config = self._get_index_config(index_name)
+        Search.check_vector_field(index_config, search_params.vector_field)
+        Search.check_filters(index_config, search_params.filters)
+        query = search_params.vector_field.value
+        if query.dimension != matrix.dimension:
+            raise VectorFieldDimensionException(
+                f"Searched vector has dimension {query.dimension}, indexed vectors have {matrix.dimension}"
+            )
+        field_name, filters, limit = search_params.vector_field.name, search_params.filters, search_params.limit
+        min_score = 1 - search_params.radius if search_params.radius else None
+        ann = self._ann_indexes.get(field_name)
+        ann = ann if ann is not None and ann.ready and limit >= 0 else None
+        plan = self._plan(field_name, len(matrix), limit, filters, ann)
+        strategy = plan.strategy if plan is not None else ANN_SCAN if ann is not None else EXACT_SCAN
+        scores = None
+        if strategy == ANN_SCAN:
+            scores = self._ann_scan(field_name, matrix, ann, query.value, limit, filters, min_score)
+        elif strategy != EXACT_SCAN:
+            probed = ann.probe(query.value) if ann is not None else None
+            scores = self._post_filtered(matrix, probed, query.value, limit, plan.candidates, filters, min_score)
+        if scores is None and plan is not None and strategy != EXACT_SCAN:
+            self.planner.record_fallback(plan)
+        if scores is None:
+            positions = self._filtered_positions(field_name, matrix, filters)
+            scores = matrix.top_k(query.value, limit, positions, min_score)
+        if plan is not None:
+            record_plan(plan)
+        return [
+            self._get_result_entity_data(row_id, score, search_params.fields_to_return) for row_id, score in scores
+        ]
+
+    def _plan(
+        self,
+        field_name: str,
+        rows: int,
+        limit: int,
+        filters: Sequence[ComparisonOperation[Field]] | None,
+        ann: IVFIndex | None,
+    ) -> QueryPlan | None:
+        if self.planner is None or field_name not in self._statistics:
+            return None
+        filters = list(filters or [])
+        indexes = [
+            index
+            for index in (self._filter_indexes.get(field_name), self._range_indexes.get(field_name))
+            if index is not None
+        ]
+        indexed = [filter_ for filter_ in filters if any(index.answers(filter_) for index in indexes)]
+        statistics = self._statistics[field_name]
+        # Indexed filters cost a pass over positions; the rest are checked row by row on what those leave
+        filter_cost = rows * INDEX_US if indexed else 0.0
+        if len(indexed) < len(filters):
+            filter_cost += statistics.selectivity(indexed) * rows * ROW_FILTER_US
+        ann_probe = (ann.lists, ann.probed_rows()) if ann is not None else None
+        return self.planner.plan(rows, limit, statistics.selectivity(filters), filter_cost, ann_probe)
+
+    def _ann_scan(
+        self,
+        field_name: str,
+        matrix: VectorMatrix,
+        ann: IVFIndex,
+        query: np.ndarray,
+        limit: int,
+        filters: Sequence[ComparisonOperation[Field]] | None,
+        min_score: float | None,
+    ) -> list[tuple[str, float]] | None:
+        """The best `limit` rows passing `filters` in the probed lists, or None if there are fewer."""
+        probed = ann.probe(query)
+        scores = matrix.top_k(query, limit, self._filtered_positions(field_name, matrix, filters, probed), min_score)
+        if len(scores) < limit and len(probed) < len(matrix):
+            return None
+        return scores
+
+    def _post_filtered(
+        self,
+        matrix: VectorMatrix,
+        probed: np.ndarray | None,
+        query: np.ndarray,
+        limit: int,
+        candidates: int,
+        filters: Sequence[ComparisonOperation[Field]] | None,
+        min_score: float | None,
+    ) -> list[tuple[str, float]] | None:
+        """
+        The best `limit` of the top `candidates` (among the `probed` rows, if given)
+        passing `filters`, or None if fewer pass and rows were left out.
+        """
+        scored = matrix.top_k(query, candidates, probed, min_score)
+        passing = [
+            (row_id, score) for row_id, score in scored if InMemorySearch._is_subset(self._vdb[row_id], filters or [])
+        ]
+        every_row = len(scored) < candidates and (probed is None or len(probed) >= len(matrix))
+        if len(passing) < limit and not every_row:
+            return None
+        return passing[:limit]
+
+    def _filtered_positions(
+        self,
+        field_name: str,
+        matrix: VectorMatrix,
+        filters: Sequence[ComparisonOperation[Field]] | None,
+        within: np.ndarray | None = None,
+    ) -> np.ndarray | None:
+        """Matrix positions of the rows (among `within`, if given) passing `filters`, or None for all rows."""
+        positions, residual = within, list(filters or [])
+        if not residual:
+            return positions
+        if (filter_index := self._filter_indexes.get(field_name)) is not None:
+            selected, residual = filter_index.select(residual)
+            if selected is not None:
+                positions = selected if positions is None else positions[np.isin(positions, selected)]
+        if (range_index := self._range_indexes.get(field_name)) is not None:
+            positions, residual = range_index.select(residual, positions)
+        if not residual:
+            return positions
+        # Filters the index does not answer are evaluated on its candidates only
+        row_ids = matrix.row_ids
+        candidates = range(len(row_ids)) if positions is None else positions
+        return np.fromiter(
+            (
+                position
+                for position in candidates
+                if InMemorySearch._is_subset(self._vdb[row_ids[position]], residual)
+            ),
+            dtype=np.intp,
+        )
+
+    def _vector_field_sizes(self) -> dict[str, int]:
+        return {
+            config.vector_field_descriptor.field_name: config.vector_field_descriptor.field_size
+            for config in self.search_index_manager._index_configs.values()
+        }
+
+    def _write_matrices(self, entity_data: Sequence[EntityData]) -> None:
+        sizes = self._vector_field_sizes()
+        written: defaultdict[str, tuple[list[str], list[np.ndarray]]] = defaultdict(lambda: ([], []))
+        for entity in entity_data:
+            row_id = InMemoryVDB._get_row_id_from_entity_id(entity.id_)
+            for name, field_data in entity.field_data.items():
+                # Empty vectors (rows without input for the space) are left to the payload, as before
+                if name in sizes and isinstance(field_data.value, Vector) and field_data.value.dimension == sizes[name]:
+                    written[name][0].append(row_id)
+                    written[name][1].append(field_data.value.value)
+        for name, (row_ids, vectors) in written.items():
+            self._matrix(name, sizes[name]).upsert(row_ids, np.vstack(vectors))
+
+    def _matrix(self, field_name: str, dimension: int) -> VectorMatrix:
+        if field_name not in self._matrices:
+            self._matrices[field_name] = VectorMatrix(dimension)
+        return self._matrices[field_name]
+
+    def _update_filter_indexes(self, row_ids: Sequence[str]) -> None:
+        """Index the current field values of `row_ids` for every matrix they are in."""
+        for field_name, matrix in self._matrices.items():
+            indexes: list[CategoricalFilterIndex | RangeFilterIndex | FieldStatistics] = []
+            if self._use_filter_index:
+                if field_name not in self._filter_indexes:
+                    fields = self._indexed_fields(field_name, _CATEGORICAL_TYPES)
+                    self._filter_indexes[field_name] = CategoricalFilterIndex(fields)
+                indexes.append(self._filter_indexes[field_name])
+            if self._use_range_index:
+                if field_name not in self._range_indexes:
+                    self._range_indexes[field_name] = RangeFilterIndex(self._indexed_fields(field_name, _NUMERIC_TYPES))
+                indexes.append(self._range_indexes[field_name])
+            if self.planner is not None:
+                if field_name not in self._statistics:
+                    self._statistics[field_name] = FieldStatistics(
+                        self._indexed_fields(field_name, _CATEGORICAL_TYPES),
+                        self._indexed_fields(field_name, _NUMERIC_TYPES),
+                    )
+                indexes.append(self._statistics[field_name])
+            for row_id in row_ids if indexes else ():
+                if (position := matrix.position(row_id)) is not None:
+                    for index in indexes:
+                        index.update(position, self._vdb[row_id])
+
+    def _update_ann_indexes(self, row_ids: Sequence[str]) -> None:
+        """Assign the rows to the lists of each matrix's approximate index, creating or training it when due."""
+        if self._ann_params is None:
+            return
+        for field_name, matrix in self._matrices.items():
+            if field_name not in self._ann_indexes:
+                self._ann_indexes[field_name] = IVFIndex(matrix, self._ann_params)
+            positions = [position for row_id in row_ids if (position := matrix.position(row_id)) is not None]
+            self._ann_indexes[field_name].add(np.asarray(positions, dtype=np.intp))
+
+    def _indexed_fields(self, vector_field_name: str, data_types: tuple[FieldDataType, ...]) -> list[str]:
+        return [
+            descriptor.field_name
+            for config in self.search_index_manager._index_configs.values()
+            if config.vector_field_descriptor.field_name == vector_field_name
+            for descriptor in config.field_descriptors
+            if descriptor.field_data_type in data_types
+        ]
+
+    def index_version(self) -> str:
+        """Hash of the index layout; vector field names are derived from the space definitions."""
+        layout = [
+            [
+                name,
+                config.vector_field_descriptor.field_name,
+                sorted((field.field_name, field.field_data_type.value) for field in config.field_descriptors),
+            ]
+            for name, config in sorted(self.search_index_manager._index_configs.items())
+        ]
+        encoded = json.dumps([SNAPSHOT_FORMAT, layout], sort_keys=True).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()[:16]
+
+    def persist(self, serializer: ObjectSerializer) -> None:
+        if self._snapshot_dir is None:
+            super().persist(serializer)
+            return
+        if not self._vdb:
+            # Never replace a good snapshot with an empty store (e.g. after rejecting a stale one)
+            logger.info("Vector store is empty, keeping the existing snapshot")
+            return
+        self.export_snapshot(self._snapshot_dir)
+
+    def restore(self, serializer: ObjectSerializer) -> None:
+        if self._snapshot_dir is None:
+            super().restore(serializer)
+            return
+        self.load_snapshot(self._snapshot_dir)
+
+    def export_snapshot(self, directory: str) -> int:
+        """Write the current rows to `directory`, replacing any previous snapshot. Returns the row count."""
+        start = time.perf_counter()
+        row_ids = list(self._vdb)
+        vector_fields = sorted({
+            name for row in self._vdb.values() for name, value in row.items() if isinstance(value, Vector)
+        })
+        tmp_dir = f"{directory.rstrip(os.sep)}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        fields_manifest = {}
+        for field in vector_fields:
+            vectors = [self._vdb[row_id].get(field) for row_id in row_ids]
+            dimension = max((vector.dimension for vector in vectors if vector is not None), default=0)
+            matrix = np.zeros((len(row_ids), dimension), dtype=np.float64)
+            state = np.full(len(row_ids), ABSENT, dtype=np.int8)
+            for i, vector in enumerate(vectors):
+                if vector is None:
+                    continue
+                if vector.is_empty:
+                    state[i] = EMPTY
+                    continue
+                matrix[i] = vector.value
+                state[i] = PRESENT
+            np.save(os.path.join(tmp_dir, f"{field}.npy"), matrix)
+            np.save(os.path.join(tmp_dir, f"{field}.state.npy"), state)
+            fields_manifest[field] = dimension
+
+        payload = [
+            {name: value for name, value in self._vdb[row_id].items() if not isinstance(value, Vector)}
+            for row_id in row_ids
+        ]
+        with open(os.path.join(tmp_dir, PAYLOAD_FILE), "w", encoding="utf-8") as f:
+            json.dump({"row_ids": row_ids, "rows": payload}, f, cls=JsonEncoder)
+        # The manifest goes last: a directory without one is never loaded
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(
+                {"index_version": self.index_version(), "rows": len(row_ids), "vector_fields": fields_manifest},
+                f,
+            )
+
+        old_dir = f"{directory.rstrip(os.sep)}.old"
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if os.path.isdir(directory):
+            os.replace(directory, old_dir)
+        os.replace(tmp_dir, directory)
+        shutil.rmtree(old_dir, ignore_errors=True)
+        logger.info(
+            "Exported {} rows to vector snapshot {} in {:.2f}s",
+            len(row_ids), directory, time.perf_counter() - start,
+        )
+        return len(row_ids)
+
+    def load_snapshot(self, directory: str) -> bool:
+        """
+        Replace the current rows with the snapshot in `directory`. A snapshot taken
+        with a different index layout is rejected and leaves the store untouched.
+        """
+        manifest_path = os.path.join(directory, MANIFEST_FILE)
+        if not os.path.isfile(manifest_path):
+            logger.info("No vector snapshot at {}, starting empty", directory)
+            return False
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("index_version") != self.index_version():
+            logger.warning(
+                "Rejecting vector snapshot {}: built for index {}, current index is {}",
+                directory, manifest.get("index_version"), self.index_version(),
+            )
+            return False
+
+        start = time.perf_counter()
+        with open(os.path.join(directory, PAYLOAD_FILE), encoding="utf-8") as f:
+            payload = json.load(f, cls=JsonDecoder)
+        rows = dict(zip(payload["row_ids"], payload["rows"]))
+        for field in manifest["vector_fields"]:
+            matrix = np.load(os.path.join(directory, f"{field}.npy"), mmap_mode="r")
+            state = np.load(os.path.join(directory, f"{field}.state.npy"))
+            empty = Vector.empty_vector()
+            for i, row_id in enumerate(payload["row_ids"]):
+                if state[i] == PRESENT:
+                    rows[row_id][field] = Vector(matrix[i])
+                elif state[i] == EMPTY:
+                    rows[row_id][field] = empty
+        self._vdb.clear()
+        self._vdb.update(rows)
+        if self._vectorized_scoring:
+            self._load_matrices(directory, manifest, payload["row_ids"])
+        logger.info(
+            "Loaded {} rows from vector snapshot {} in {:.2f}s",
+            len(rows), directory, time.perf_counter() - start,
+        )
+        return True
+
+    def _load_matrices(self, directory: str, manifest: dict, row_ids: list[str]) -> None:
+        """Fill the scoring matrices straight from the snapshot's per-field matrices, then index their rows."""
+        self._matrices, self._filter_indexes, self._range_indexes, self._statistics = {}, {}, {}, {}
+        self._ann_indexes = {}
+        sizes = self._vector_field_sizes()
+        for field, dimension in manifest["vector_fields"].items():
+            if sizes.get(field) != dimension:
+                continue
+            matrix = np.load(os.path.join(directory, f"{field}.npy"), mmap_mode="r")
+            present = np.flatnonzero(np.load(os.path.join(directory, f"{field}.state.npy")) == PRESENT)
+            self._matrix(field, dimension).upsert([row_ids[i] for i in present], matrix[present])
+        self._update_filter_indexes(row_ids)
+        self._update_ann_indexes(row_ids)
+
+
+class ProcurementInMemoryVectorDatabase(sl.InMemoryVectorDatabase):
+    """InMemoryVectorDatabase that hands out one snapshot-aware connector and keeps it reachable."""
+
+    def __init__(
+        self,
+        snapshot_dir: str | None = None,
+        default_query_limit: int = -1,
+        vectorized_scoring: bool = True,
+        filter_index: bool = True,
+        range_index: bool = True,
+        planner: QueryPlanner | None = None,
+        ann: IVFParams | None = None,
+    ) -> None:
+        super().__init__(default_query_limit)
+        self._connector = ProcurementInMemoryVDB(
+            VDBSettings(default_query_limit), snapshot_dir, vectorized_scoring, filter_index, range_index, planner, ann
+        )
+
+    @property
+    def _vdb_connector(self) -> ProcurementInMemoryVDB:
+        return self._connector
+
+    @property
+    def connector(self) -> ProcurementInMemoryVDB:
+        return self._connector
@@ -0,0 +1,92 @@
+# procurement/write_buffer.py
+import asyncio
+import time
+from typing import Callable
+
+from loguru import logger
+
+
+class WriteBuffer:
+    """
+    Coalesces single-row writes from concurrent requests. Rows are held for at most
+    `max_wait_seconds` or until `max_rows` are pending, then written with one `put`
+    call - one embedding call and one vector store upsert - and every caller's
+    `submit` returns once its row is written. Writes run one at a time and in
+    arrival order, so the last update to a product wins as before.
+    """
+
+    def __init__(self, put: Callable[[list[dict]], None], max_rows: int, max_wait_seconds: float) -> None:
+        self._put = put
+        self._max_rows = max_rows
+        self._max_wait_seconds = max_wait_seconds
+        self._pending: list[tuple[dict, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._writes: set[asyncio.Task] = set()
+        self._write_lock = asyncio.Lock()
+        self._closed = False
+
+    async def submit(self, row: dict) -> None:
+        """Write `row` together with whatever other rows arrive around the same time."""
+        if self._closed or self._max_rows <= 1:
+            await self._write_rows([row])
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((row, future))
+        if len(self._pending) >= self._max_rows:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self._max_wait_seconds, self._flush)
+        await future
+
+    async def close(self) -> None:
+        """Write everything still pending and wait for in-flight writes. Later rows are written directly."""
+        self._closed = True
+        self._flush()
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.create_task(self._write_batch(batch))
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    async def _write_batch(self, batch: list[tuple[dict, asyncio.Future]]) -> None:
+        try:
+            await self._write_rows([row for row, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                self._resolve(batch, e)
+                return
+            # One bad row must not fail everyone else's request: retry the rows one by one
+            logger.warning("Buffered write of {} rows failed, retrying row by row", len(batch))
+            for item in batch:
+                try:
+                    await self._write_rows([item[0]])
+                except Exception as row_error:
+                    self._resolve([item], row_error)
+                else:
+                    self._resolve([item], None)
+            return
+        self._resolve(batch, None)
+
+    async def _write_rows(self, rows: list[dict]) -> None:
+        async with self._write_lock:
+            start = time.perf_counter()
+            await asyncio.to_thread(self._put, rows)
+            logger.debug("Wrote {} buffered rows in {:.3f}s", len(rows), time.perf_counter() - start)
+
+    @staticmethod
+    def _resolve(batch: list[tuple[dict, asyncio.Future]], error: BaseException | None) -> None:
+        for _, future in batch:
+            if future.done():  # the caller went away
+                continue
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
@@ -0,0 +1,255 @@
+"""
+Unit tests for admission control of LLM extraction calls.
+"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import instructor
+import pytest
+from instructor.core import InstructorRetryException
+from openai import APITimeoutError, OpenAI
+from pydantic import BaseModel
+from unittest.mock import MagicMock, patch
+from superlinked.framework.common.exception import QueryException
+from superlinked.framework.common.settings import Settings
+from superlinked_app import nlq_handler
+from superlinked_app.admission import (
+    HIGH_PRIORITY,
+    LOW_PRIORITY,
+    AdmissionController,
+    AdmissionRejected,
+    request_priority,
+)
+from superlinked_app.llm_stub import completion
+from superlinked_app.nlq_handler import ProcurementNLQHandler, ProcurementOpenAIClient, install_nlq_handler
+
+
+def _wait_until(condition, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.001)
+
+
+class Waiter(threading.Thread):
+    """Thread that waits for admission and records whether it got in."""
+
+    def __init__(self, controller: AdmissionController, priority: int, order: list) -> None:
+        super().__init__(daemon=True)
+        self.controller, self.priority, self.order = controller, priority, order
+        self.error = None
+
+    def run(self):
+        try:
+            with self.controller.admit(self.priority):
+                self.order.append(self.priority)
+        except AdmissionRejected as e:
+            self.error = e
+
+
+class TestAdmissionController:
+    """Test concurrency limits, queue order and shedding."""
+
+    def test_concurrency_is_capped(self):
+        """Test that no more than max_concurrency calls hold a slot at once."""
+        controller = AdmissionController(max_concurrency=2, max_queue=10, max_queue_wait_seconds=5)
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def call():
+            with controller.admit():
+                with lock:
+                    active[0] += 1
+                    peak[0] = max(peak[0], active[0])
+                time.sleep(0.02)
+                with lock:
+                    active[0] -= 1
+
+        threads = [threading.Thread(target=call) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert peak[0] == 2
+        assert controller.stats()["admitted"] == 6
+        assert controller.stats()["queued"] == 0
+
+    def test_higher_priority_goes_first(self):
+        """Test that a high priority call overtakes a low priority one that queued earlier."""
+        controller = AdmissionController(max_concurrency=1, max_queue=10, max_queue_wait_seconds=5)
+        order = []
+        with controller.admit():
+            low = Waiter(controller, LOW_PRIORITY, order)
+            low.start()
+            _wait_until(lambda: controller.stats()["queued"] == 1)
+            high = Waiter(controller, HIGH_PRIORITY, order)
+            high.start()
+            _wait_until(lambda: controller.stats()["queued"] == 2)
+        low.join()
+        high.join()
+
+        assert order == [HIGH_PRIORITY, LOW_PRIORITY]
+
+    def test_long_wait_is_shed(self):
+        """Test that a call waiting longer than the budget is rejected."""
+        controller = AdmissionController(max_concurrency=1, max_queue=10, max_queue_wait_seconds=0.05)
+
+        with controller.admit():
+            with pytest.raises(AdmissionRejected) as rejected:
+                with controller.admit():
+                    pass
+
+        assert rejected.value.reason == "queue_timeout"
+        assert controller.stats()["shed"] == {"queue_full": 0, "queue_timeout": 1}
+        assert controller.stats()["queued"] == 0
+
+    def test_full_queue(self):
+        """Test that a full queue rejects equal priority arrivals and evicts for higher priority ones."""
+        controller = AdmissionController(max_concurrency=1, max_queue=1, max_queue_wait_seconds=5)
+        order = []
+        with controller.admit():
+            low = Waiter(controller, LOW_PRIORITY, order)
+            low.start()
+            _wait_until(lambda: controller.stats()["queued"] == 1)
+            with pytest.raises(AdmissionRejected):
+                with controller.admit(LOW_PRIORITY):
+                    pass
+            high = Waiter(controller, HIGH_PRIORITY, order)
+            high.start()
+            low.join()
+        high.join()
+
+        assert low.error is not None and low.error.reason == "queue_full"
+        assert order == [HIGH_PRIORITY]
+        assert controller.stats()["shed"]["queue_full"] == 2
+
+    def test_deadline_includes_the_wait(self):
+        """Test that the timeout handed to the call is the deadline minus the time spent queueing."""
+        controller = AdmissionController(max_concurrency=1, deadline_seconds=10)
+
+        with controller.admit() as timeout:
+            assert 9.9 < timeout <= 10
+
+    def test_priority_comes_from_the_request(self):
+        """Test that calls without an explicit priority use the request's."""
+        controller = AdmissionController(max_concurrency=1, max_queue=10, max_queue_wait_seconds=5)
+        order = []
+
+        def call():
+            request_priority.set(HIGH_PRIORITY)
+            with controller.admit():
+                order.append("high")
+
+        with controller.admit():
+            low = Waiter(controller, LOW_PRIORITY, order)
+            low.start()
+            _wait_until(lambda: controller.stats()["queued"] == 1)
+            high = threading.Thread(target=call)
+            high.start()
+            _wait_until(lambda: controller.stats()["queued"] == 2)
+        low.join()
+        high.join()
+
+        assert order == ["high", LOW_PRIORITY]
+
+
+class TestAdmittedExtraction:
+    """Test admission control around the handler's LLM calls."""
+
+    @pytest.fixture
+    def controller(self):
+        controller = AdmissionController(max_concurrency=1, max_queue=0, deadline_seconds=7)
+        install_nlq_handler(None, admission=controller)
+        yield controller
+        nlq_handler._admission = None
+
+    def _handler(self):
+        return ProcurementNLQHandler(MagicMock(api_key="test-key", model="gpt-4o"))
+
+    def test_deadline_is_passed_to_the_llm(self, controller):
+        """Test that the LLM call gets the remaining deadline as its timeout."""
+        client = MagicMock()
+        client.query.return_value = {"max_cost": 5.0}
+        with patch.object(nlq_handler, "_openai_client", return_value=client):
+            assert self._handler()._execute_query("cheap", "prompt", dict) == {"max_cost": 5.0}
+
+        timeout = client.query.call_args.args[3]
+        assert 6.9 < timeout <= 7
+
+    def test_rejection_is_not_wrapped(self, controller):
+        """Test that a shed call raises AdmissionRejected rather than QueryException."""
+        with controller.admit():
+            with pytest.raises(AdmissionRejected):
+                self._handler()._execute_query("cheap", "prompt", dict)
+
+    def test_timeouts_are_counted(self, controller):
+        """Test that an LLM call that runs past its deadline is counted."""
+        client = MagicMock()
+        client.query.side_effect = APITimeoutError(httpx.Request("POST", "http://stub/v1/chat/completions"))
+        with patch.object(nlq_handler, "_openai_client", return_value=client):
+            with pytest.raises(QueryException):
+                self._handler()._execute_query("cheap", "prompt", dict)
+
+        assert controller.stats()["deadline_exceeded"] == 1
+
+
+class CostParams(BaseModel):
+    max_cost: float
+
+
+class TestTimedClient:
+    """Test that a timed LLM call stays within its timeout across instructor's retries."""
+
+    def _client(self, handler) -> ProcurementOpenAIClient:
+        client = ProcurementOpenAIClient(MagicMock(api_key="test-key", model="gpt-4o"))
+        http_client = httpx.Client(transport=httpx.MockTransport(handler))
+        client._openai = OpenAI(api_key="test-key", base_url="http://stub/v1", http_client=http_client)
+        client._client = instructor.from_openai(client._openai)
+        return client
+
+    def test_retries_share_the_timeout(self, monkeypatch):
+        """Test that each validation retry gets only the time left, and no retry starts after the timeout."""
+        monkeypatch.setattr(Settings(), "SUPERLINKED_NLQ_MAX_RETRIES", 10)
+        attempts = []
+
+        def invalid_answer(request):
+            attempts.append((time.monotonic() - start, request.extensions["timeout"]["read"]))
+            time.sleep(0.1)
+            return httpx.Response(200, json=completion(json.loads(request.content), '{"max_cost": "cheap"}'))
+
+        client = self._client(invalid_answer)
+        start = time.monotonic()
+        with pytest.raises(InstructorRetryException):
+            client.query("cheap", "prompt", CostParams, timeout=0.35)
+
+        assert 2 <= len(attempts) <= 4
+        # Every attempt must end by the deadline, give or take the time to set the call up
+        assert all(started < 0.35 and 0 < timeout and started + timeout < 0.4 for started, timeout in attempts)
+
+    def test_answer_within_the_timeout(self):
+        """Test that a valid answer is returned as with the untimed call."""
+        def answer(request):
+            return httpx.Response(200, json=completion(json.loads(request.content), '{"max_cost": 5}'))
+
+        client = self._client(answer)
+
+        assert client.query("cheap", "prompt", CostParams, timeout=1.0) == {"max_cost": 5.0}
+
+    def test_concurrent_calls_complete(self):
+        """Test that calls from several threads, timed or not, all return their answer."""
+        def answer(request):
+            time.sleep(0.05)
+            return httpx.Response(200, json=completion(json.loads(request.content), '{"max_cost": 5}'))
+
+        client = self._client(answer)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            futures = [
+                pool.submit(client.query, "cheap", "prompt", CostParams, 1.0 if index % 2 else None)
+                for index in range(16)
+            ]
+            results = [future.result(timeout=5) for future in futures]
+
+        assert results == [{"max_cost": 5.0}] * 16
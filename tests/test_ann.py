@@ -0,0 +1,123 @@
+"""
+Unit tests for the in-process approximate (IVF) index.
+"""
+import numpy as np
+import pytest
+from superlinked_app.ann import IVFIndex, IVFParams
+from superlinked_app.planner import ANN_SCAN, EXACT_SCAN, QueryPlanner, plan_scope
+from superlinked_app.scoring import VectorMatrix
+
+from .test_vector_store import SCORING_ROWS, _ranking, _scoring_app
+
+
+def _clustered(rows: int, dimension: int = 32, clusters: int = 20, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """Unit vectors around a few centres, like embeddings of a catalog, and queries drawn the same way."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dimension))
+    vectors = centres[rng.integers(clusters, size=rows + 20)] + 0.3 * rng.standard_normal((rows + 20, dimension))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors[:rows].astype(np.float32), vectors[rows:]
+
+
+def _index(vectors: np.ndarray, **params) -> tuple[VectorMatrix, IVFIndex]:
+    matrix = VectorMatrix(vectors.shape[1])
+    matrix.upsert([f"r{number}" for number in range(len(vectors))], vectors)
+    index = IVFIndex(matrix, IVFParams(**{"nlist": 16, "nprobe": 4, "min_rows": 1000, **params}))
+    index.add(np.arange(len(vectors)))
+    return matrix, index
+
+
+class TestIVFIndex:
+    """Test training, probing and incremental writes."""
+
+    def test_recall(self):
+        """Test that probing a quarter of the lists finds nearly all of the exact top 10."""
+        vectors, queries = _clustered(4000)
+        matrix, index = _index(vectors)
+
+        def found(query, candidates=None):
+            return {row for row, _ in matrix.top_k(query, 10, candidates)}
+
+        recall = np.mean([len(found(query) & found(query, index.probe(query))) / 10 for query in queries])
+
+        assert index.lists == 16
+        assert recall >= 0.9
+
+    def test_probing_every_list_is_exact(self):
+        """Test that the lists partition the rows."""
+        vectors, queries = _clustered(2000)
+        _, index = _index(vectors)
+
+        assert sorted(index.probe(queries[0], nprobe=16).tolist()) == list(range(2000))
+
+    def test_small_catalogs_are_not_indexed(self):
+        """Test that no index is trained below `min_rows`."""
+        vectors, queries = _clustered(500)
+        _, index = _index(vectors)
+
+        assert not index.ready
+        assert index.probe(queries[0]) is None
+
+    def test_incremental_writes(self):
+        """Test that new rows join a list, rewritten rows move, and doubling the rows retrains."""
+        vectors, queries = _clustered(2000)
+        matrix, index = _index(vectors)
+        query = queries[0].astype(np.float32)
+
+        matrix.upsert(["new", "r0"], np.vstack([query, -query]))
+        index.add(np.array([matrix.position("new"), matrix.position("r0")]))
+        probed = index.probe(query, nprobe=1)
+
+        assert matrix.position("new") in probed and 0 not in probed
+        assert matrix.top_k(query, 1, probed)[0][0] == "new"
+
+        more, _ = _clustered(2000, seed=1)
+        matrix.upsert([f"s{number}" for number in range(2000)], more)
+        index.add(np.arange(2001, 4001))
+
+        assert index.stats()["trainings"] == 2
+        assert index.stats()["trained_rows"] == 4001
+
+
+class TestAnnSearch:
+    """Test searches of the in-memory store through the approximate index."""
+
+    @pytest.fixture
+    def baseline(self):
+        _, source, app = _scoring_app(False)
+        source.put(SCORING_ROWS)
+        return app
+
+    def _ann_app(self, nprobe: int, planner: QueryPlanner | None = None):
+        database, source, app = _scoring_app(True, planner=planner, ann=IVFParams(nlist=4, nprobe=nprobe, min_rows=100))
+        source.put(SCORING_ROWS)
+        return database, app
+
+    @pytest.mark.parametrize("params", [{}, {"brands": ["Puma"]}, {"max_cost": 20.0, "orders_weight": 0.5, "limit": 40}])
+    def test_probing_every_list_matches_exact_search(self, baseline, params):
+        """Test that filtered searches through the index find what the per-product search does."""
+        database, app = self._ann_app(nprobe=4)
+
+        assert [stats["ready"] for stats in database.connector.ann_stats().values()] == [True]
+        assert _ranking(app, **params) == _ranking(baseline, **params)
+
+    def test_filtered_results_pass_the_filters(self):
+        """Test that a search probing one list returns only matching products, falling back when it finds too few."""
+        _, app = self._ann_app(nprobe=1)
+        brands = {row["id"]: row["brand"] for row in SCORING_ROWS}
+
+        results = _ranking(app, brands=["Puma"], limit=20)
+        everything = _ranking(app, brands=["Puma"], limit=100)
+
+        assert len(results) == 20 and {brands[product] for product, _ in results} == {"Puma"}
+        assert len(everything) == 100
+
+    def test_planner_reports_ann_plans(self):
+        """Test that the planner chooses the index for broad searches and exact scans for searches for every match."""
+        _, app = self._ann_app(nprobe=1, planner=QueryPlanner())
+
+        with plan_scope() as plans:
+            _ranking(app)
+            _ranking(app, limit=-1)
+
+        assert [plan.strategy for plan in plans] == [ANN_SCAN, EXACT_SCAN]
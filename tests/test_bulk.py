@@ -0,0 +1,137 @@
+"""
+Unit tests for the streaming bulk ingest.
+"""
+import asyncio
+import json
+import threading
+
+import pytest
+from superlinked_app.bulk import BulkParseError, RowStreamParser, bulk_ingest
+
+
+def _rows(count):
+    return [{"product_id": f"PROD{i:03d}", "name": f"Product é {i}"} for i in range(count)]
+
+
+def _chunks(data: bytes, size: int) -> list[bytes]:
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def _parse(chunks) -> list[dict]:
+    parser = RowStreamParser()
+    rows = []
+    for chunk in chunks:
+        rows.extend(parser.feed(chunk))
+    return rows + parser.close()
+
+
+async def _stream(chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+class TestRowStreamParser:
+    """Test incremental parsing of NDJSON and JSON array bodies."""
+
+    @pytest.mark.parametrize("size", [1, 7, 10_000])
+    def test_ndjson_split_anywhere(self, size):
+        """Test that NDJSON parses the same however the body is chunked, including inside UTF-8 characters."""
+        body = "\n".join(json.dumps(row, ensure_ascii=False) for row in _rows(5)).encode()
+
+        assert _parse(_chunks(body, size)) == _rows(5)
+
+    @pytest.mark.parametrize("size", [1, 7, 10_000])
+    def test_json_array_split_anywhere(self, size):
+        """Test that a JSON array parses the same however the body is chunked."""
+        body = json.dumps(_rows(5), ensure_ascii=False, indent=2).encode()
+
+        assert _parse(_chunks(body, size)) == _rows(5)
+
+    def test_rows_are_returned_as_they_complete(self):
+        """Test that a complete row is available before the rest of the body arrives."""
+        parser = RowStreamParser()
+
+        assert parser.feed(b'[{"product_id": "A"}, {"product_id": "B"') == [{"product_id": "A"}]
+        assert parser.feed(b"}]") == [{"product_id": "B"}]
+
+    def test_blank_lines_are_skipped(self):
+        """Test that empty NDJSON lines and a trailing newline are ignored."""
+        assert _parse([b'{"a": 1}\n\n{"a": 2}\n']) == [{"a": 1}, {"a": 2}]
+
+    def test_invalid_line(self):
+        """Test that a malformed NDJSON line names its line number."""
+        with pytest.raises(BulkParseError, match="line 2"):
+            _parse([b'{"a": 1}\n{"a": \n'])
+
+    def test_non_object_row(self):
+        """Test that rows must be JSON objects."""
+        with pytest.raises(BulkParseError, match="not a JSON object"):
+            _parse([b"[1, 2]"])
+
+    def test_unclosed_array(self):
+        """Test that a truncated array is reported."""
+        with pytest.raises(BulkParseError):
+            _parse([b'[{"a": 1}, {"a": 2}'])
+
+
+class TestBulkIngest:
+    """Test micro-batched writes with backpressure."""
+
+    def test_rows_are_written_in_batches(self):
+        """Test that rows are written in order in batches of at most batch_rows, with one ack each."""
+        written = []
+        body = "\n".join(json.dumps(row) for row in _rows(7)).encode()
+
+        report = asyncio.run(bulk_ingest(_stream(_chunks(body, 13)), written.append, batch_rows=3, max_pending_batches=1))
+
+        assert [len(batch) for batch in written] == [3, 3, 1]
+        assert [row for batch in written for row in batch] == _rows(7)
+        assert report.rows == 7
+        assert [(ack.batch, ack.rows) for ack in report.batches] == [(1, 3), (2, 3), (3, 1)]
+
+    def test_reading_waits_for_slow_writer(self):
+        """Test that the body is not read more than max_pending_batches ahead of the writer."""
+        release = threading.Event()
+        chunks_read = []
+
+        def slow_put(batch):
+            release.wait(timeout=5)
+
+        async def body():
+            for i, row in enumerate(_rows(10)):
+                chunks_read.append(i)
+                yield (json.dumps(row) + "\n").encode()
+
+        async def run():
+            task = asyncio.create_task(bulk_ingest(body(), slow_put, batch_rows=1, max_pending_batches=2))
+            await asyncio.sleep(0.2)
+            # One batch being written, two queued, one parsed and waiting for a slot
+            read_while_blocked = len(chunks_read)
+            release.set()
+            return read_while_blocked, await task
+
+        read_while_blocked, report = asyncio.run(run())
+
+        assert read_while_blocked == 4
+        assert report.rows == 10
+
+    def test_parse_error_keeps_earlier_batches(self):
+        """Test that batches before a malformed row are written and counted on the error."""
+        written = []
+        body = [b'{"a": 1}\n{"a": 2}\n', b'{"a": 3}\n{"a": \n']
+
+        with pytest.raises(BulkParseError) as error:
+            asyncio.run(bulk_ingest(_stream(body), written.append, batch_rows=2, max_pending_batches=1))
+
+        assert written == [[{"a": 1}, {"a": 2}]]
+        assert error.value.rows_written == 2
+
+    def test_write_error_stops_reading(self):
+        """Test that a failing write is raised instead of reading the rest of the body."""
+        def failing_put(batch):
+            raise RuntimeError("vector store down")
+
+        body = "\n".join(json.dumps(row) for row in _rows(50)).encode()
+
+        with pytest.raises(RuntimeError, match="vector store down"):
+            asyncio.run(bulk_ingest(_stream(_chunks(body, 5)), failing_put, batch_rows=1, max_pending_batches=1))
@@ -0,0 +1,150 @@
+"""
+Unit tests for degraded mode of natural-query extraction.
+"""
+import threading
+import time
+
+import pytest
+from unittest.mock import patch
+from superlinked_app.degraded import LOCAL_PARSE, RAW_TEXT, SIMILAR_QUERY, DegradedMode, degradation_scope
+from superlinked_app.nlq_cache import ParamCache, SemanticParamCache
+from superlinked_app.nlq_handler import ProcurementNLQHandler, install_nlq_handler
+from superlinked_app.nlq_rules import RuleBasedParser
+
+from .test_nlq_cache import _query, app, bag_of_words  # noqa: F401
+
+
+class SlowLLM:
+    """Stands in for _execute_query: answers after `delay` seconds, and signals when it has."""
+
+    def __init__(self, delay: float, params: dict | None = None) -> None:
+        self.delay = delay
+        self.params = params or {"cost_weight": 1.0}
+        self.calls = 0
+        self.done = threading.Event()
+
+    def __call__(self, *args):
+        self.calls += 1
+        time.sleep(self.delay)
+        self.done.set()
+        return self.params
+
+
+class TestDegradedMode:
+    """Test the latency budget itself."""
+
+    def test_fast_extraction_is_returned(self):
+        """Test that a call within the budget returns its result."""
+        mode = DegradedMode(budget_seconds=1)
+
+        assert mode.run(lambda: {"max_cost": 5.0}, 1, lambda params: None) == {"max_cost": 5.0}
+        assert mode.stats()["degraded"] == 0
+
+    def test_slow_extraction_times_out_and_finishes_late(self):
+        """Test that a slow call raises TimeoutError and hands its result over when it finishes."""
+        mode, late = DegradedMode(budget_seconds=0.02), []
+        llm = SlowLLM(0.1)
+
+        with pytest.raises(TimeoutError):
+            mode.run(llm, 0.02, late.append)
+        llm.done.wait(1)
+        time.sleep(0.05)
+
+        assert late == [{"cost_weight": 1.0}]
+        assert mode.stats()["late_completions"] == 1
+
+    def test_errors_are_raised(self):
+        """Test that a failing call raises its exception within the budget."""
+        mode = DegradedMode(budget_seconds=1)
+
+        def fail():
+            raise ValueError("provider down")
+
+        with pytest.raises(ValueError):
+            mode.run(fail, 1, lambda params: None)
+
+    def test_scope_collects_the_fallback(self):
+        """Test that a fallback taken inside a scope flags it, and is counted."""
+        mode = DegradedMode(budget_seconds=1)
+
+        with degradation_scope() as degradation:
+            mode.record(LOCAL_PARSE, "timeout")
+
+        assert (degradation.fallback, degradation.reason) == (LOCAL_PARSE, "timeout")
+        assert mode.stats()["fallbacks"][LOCAL_PARSE] == 1
+
+
+class TestDegradedExtraction:
+    """Test the fallbacks the handler takes when the LLM is too slow."""
+
+    @pytest.fixture
+    def installed(self):
+        """Install the handler with a short latency budget and the given helpers, and undo it afterwards."""
+        installed = {}
+
+        def install(**kwargs):
+            installed["cache"] = ParamCache(max_entries=8, ttl_seconds=60)
+            installed["mode"] = DegradedMode(budget_seconds=0.05, similarity=0.8, text_param=None)
+            install_nlq_handler(installed["cache"], degraded_mode=installed["mode"], **kwargs)
+            return installed["mode"]
+
+        yield install
+        install_nlq_handler(None)
+
+    def _search(self, app, natural_query):
+        with degradation_scope() as degradation:
+            result = app.query(_query(), natural_query=natural_query)
+        return [entry.id for entry in result.entries], degradation
+
+    def test_similar_query_is_reused(self, app, installed):
+        """Test that a slow extraction falls back to the params of a similar earlier query."""
+        installed(semantic_cache=SemanticParamCache(bag_of_words, threshold=0.99))
+        with patch.object(ProcurementNLQHandler, "_execute_query", return_value={"max_cost": 10.0}):
+            self._search(app, "cheap dresses")
+        with patch.object(ProcurementNLQHandler, "_execute_query", SlowLLM(0.3)):
+            ids, degradation = self._search(app, "cheap popular dresses")
+
+        assert degradation.fallback == SIMILAR_QUERY
+        assert ids == ["cheap"]
+
+    def test_local_parse_is_used(self, app, installed):
+        """Test that a low-confidence rule parse is used when nothing similar was seen."""
+        installed(rule_parser=RuleBasedParser(departments=["Women"], categories=["Jeans"], brands=[]))
+        with patch.object(ProcurementNLQHandler, "_execute_query", SlowLLM(0.3)):
+            ids, degradation = self._search(app, "something nice under 20 dollars for my aunt")
+
+        assert degradation.fallback == LOCAL_PARSE
+        assert ids == ["cheap"]
+
+    def test_raw_text_when_nothing_else(self, app, installed):
+        """Test that a failing LLM with no other help searches with the defaults."""
+        mode = installed()
+        with patch.object(ProcurementNLQHandler, "_execute_query", side_effect=RuntimeError("provider down")):
+            ids, degradation = self._search(app, "something for a seasonal promotion")
+
+        assert (degradation.fallback, degradation.reason) == (RAW_TEXT, "provider down")
+        assert sorted(ids) == ["cheap", "dear"]
+        assert mode.stats()["degraded_rate"] == 1.0
+
+    def test_late_result_is_cached(self, app, installed):
+        """Test that an extraction finishing after the budget serves the next identical query."""
+        installed()
+        llm = SlowLLM(0.2, {"max_cost": 10.0})
+        with patch.object(ProcurementNLQHandler, "_execute_query", llm):
+            _, first = self._search(app, "seasonal promotion")
+            llm.done.wait(1)
+            time.sleep(0.05)
+            ids, second = self._search(app, "seasonal promotion")
+
+        assert first.fallback == RAW_TEXT and second.fallback is None
+        assert ids == ["cheap"]
+        assert llm.calls == 1
+
+    def test_fast_extraction_is_not_degraded(self, app, installed):
+        """Test that an extraction within the budget is used as usual."""
+        installed()
+        with patch.object(ProcurementNLQHandler, "_execute_query", return_value={"max_cost": 10.0}):
+            ids, degradation = self._search(app, "seasonal promotion")
+
+        assert degradation.fallback is None
+        assert ids == ["cheap"]
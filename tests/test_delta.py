@@ -0,0 +1,155 @@
+"""
+Unit tests for delta ingestion fingerprints.
+"""
+import pytest
+from unittest.mock import MagicMock
+from superlinked import framework as sl
+from superlinked_app.delta import FingerprintStore
+from superlinked_app.ingestion import ingest_frames
+
+
+@pytest.fixture
+def store_with_catalog(sample_product_dataframe):
+    """Fingerprint store that has already seen the sample catalog."""
+    store = FingerprintStore()
+    store.commit(store.diff(sample_product_dataframe))
+    return store
+
+
+class DeltaSchema(sl.Schema):
+    """Products with the name in a text-like space, so no model has to be loaded."""
+
+    product_id: sl.IdField
+    name: sl.String
+    cost: sl.Float
+    total_orders: sl.Integer
+
+
+delta_schema = DeltaSchema()
+delta_name_space = sl.CategoricalSimilaritySpace(
+    delta_schema.name, categories=["Classic Blue Jeans", "Premium Cotton T-Shirt"]
+)
+delta_cost_space = sl.NumberSpace(delta_schema.cost, min_value=0, max_value=100, mode=sl.Mode.MINIMUM)
+delta_index = sl.Index([delta_name_space, delta_cost_space], fields=[delta_schema.cost, delta_schema.total_orders])
+delta_query = sl.Query(delta_index).find(delta_schema).select_all().limit(10)
+
+
+class TestFingerprintDiff:
+    """Test classification of rows against stored fingerprints."""
+
+    def test_new_products_are_reembedded(self, sample_product_dataframe):
+        """Test that unseen products need a full write."""
+        delta = FingerprintStore().diff(sample_product_dataframe)
+
+        assert delta.reembed.all()
+        assert not delta.payload_only.any()
+        assert len(delta.changed_frame()) == 2
+
+    def test_unchanged_rows_are_skipped(self, store_with_catalog, sample_product_dataframe):
+        """Test that identical rows produce an empty write."""
+        delta = store_with_catalog.diff(sample_product_dataframe)
+
+        assert delta.unchanged_count == 2
+        assert delta.changed_frame().empty
+
+    def test_numeric_change_is_payload_only(self, store_with_catalog, sample_product_dataframe):
+        """Test that a price change is written with the unchanged name."""
+        frame = sample_product_dataframe.copy()
+        frame.loc[0, "cost"] = 19.99
+
+        delta = store_with_catalog.diff(frame)
+        changed = delta.changed_frame()
+
+        assert list(delta.payload_only) == [True, False]
+        assert not delta.reembed.any()
+        assert len(changed) == 1
+        assert changed.iloc[0]["name"] == "Classic Blue Jeans"
+        assert changed.iloc[0]["cost"] == 19.99
+
+    def test_name_change_is_reembedded(self, store_with_catalog, sample_product_dataframe):
+        """Test that a renamed product keeps its name in the write."""
+        frame = sample_product_dataframe.copy()
+        frame.loc[1, "name"] = "Premium Organic Cotton T-Shirt"
+
+        delta = store_with_catalog.diff(frame)
+        changed = delta.changed_frame()
+
+        assert list(delta.reembed) == [False, True]
+        assert changed.iloc[0]["name"] == "Premium Organic Cotton T-Shirt"
+
+    def test_int_float_representation_is_stable(self, store_with_catalog, sample_product_dataframe):
+        """Test that an integer column read back as float is not a change."""
+        frame = sample_product_dataframe.copy()
+        frame["total_orders"] = frame["total_orders"].astype(float)
+
+        assert store_with_catalog.diff(frame).unchanged_count == 2
+
+
+class TestFingerprintPersistence:
+    """Test saving and loading fingerprints."""
+
+    def test_round_trip(self, tmp_path, sample_product_dataframe):
+        """Test that a saved store classifies the same rows as unchanged."""
+        path = str(tmp_path / "fingerprints" / "products.npz")
+        store = FingerprintStore(path)
+        store.commit(store.diff(sample_product_dataframe))
+        store.save()
+
+        reloaded = FingerprintStore(path)
+
+        assert len(reloaded) == 2
+        assert reloaded.diff(sample_product_dataframe).unchanged_count == 2
+
+    def test_in_memory_store_does_not_write(self, tmp_path, sample_product_dataframe):
+        """Test that a store without a path never touches disk."""
+        store = FingerprintStore()
+        store.commit(store.diff(sample_product_dataframe))
+        store.save()
+
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestDeltaIngestion:
+    """Test delta ingestion end to end against a mocked source."""
+
+    def test_second_run_writes_only_changes(self, sample_product_dataframe):
+        """Test that a refresh puts only the changed product."""
+        source = MagicMock()
+        store = FingerprintStore()
+        ingest_frames(source, [sample_product_dataframe], store)
+
+        refreshed = sample_product_dataframe.copy()
+        refreshed.loc[1, "total_orders"] = 301
+        source.reset_mock()
+        report = ingest_frames(source, [refreshed], store)
+
+        written = source.put.call_args.args[0][0]
+        assert list(written["product_id"]) == ["PROD002"]
+        assert report.payload_only == 1
+        assert report.unchanged == 1
+
+    def test_unchanged_catalog_skips_put(self, sample_product_dataframe):
+        """Test that re-ingesting an unchanged catalog writes nothing."""
+        source = MagicMock()
+        store = FingerprintStore()
+        ingest_frames(source, [sample_product_dataframe], store)
+        source.reset_mock()
+
+        ingest_frames(source, [sample_product_dataframe], store)
+
+        source.put.assert_not_called()
+
+    def test_payload_only_change_reaches_the_index(self, sample_product_dataframe):
+        """Test that a refresh changing only numbers is written by a real executor."""
+        source = sl.InteractiveSource(delta_schema, parser=sl.DataFrameParser(delta_schema))
+        app = sl.InteractiveExecutor(sources=[source], indices=[delta_index]).run()
+        store = FingerprintStore()
+        ingest_frames(source, [sample_product_dataframe], store)
+
+        refreshed = sample_product_dataframe.copy()
+        refreshed.loc[1, ["cost", "total_orders"]] = [12.5, 301]
+        report = ingest_frames(source, [refreshed], store)
+
+        entries = {entry.id: entry.fields for entry in app.query(delta_query).entries}
+        assert report.payload_only == 1
+        assert (entries["PROD002"]["cost"], entries["PROD002"]["total_orders"]) == (12.5, 301)
@@ -0,0 +1,136 @@
+"""
+Unit tests for the persistent embedding cache.
+"""
+import os
+
+import numpy as np
+import pytest
+from superlinked_app import embedding_cache
+from superlinked_app.embedding_cache import EmbeddingCache
+
+MODEL = "sentence-transformers/all-MiniLM-L12-v2"
+
+
+@pytest.fixture
+def vectors():
+    """Three distinct 4-dimensional vectors."""
+    return np.arange(12, dtype=np.float32).reshape(3, 4)
+
+
+class TestEmbeddingCache:
+    """Test lookups and writes within one cache instance."""
+
+    def test_empty_cache_misses(self, tmp_path):
+        """Test that a new cache reports every text as missing."""
+        cache = EmbeddingCache(str(tmp_path), MODEL)
+
+        found_vectors, found = cache.get_many(["Organic Cotton T-Shirt"])
+
+        assert found_vectors is None
+        assert not found.any()
+        assert cache.stats()["misses"] == 1
+
+    def test_round_trip(self, tmp_path, vectors):
+        """Test that stored vectors come back for the same texts in any order."""
+        cache = EmbeddingCache(str(tmp_path), MODEL)
+        cache.put_many(["a", "b", "c"], vectors)
+
+        found_vectors, found = cache.get_many(["c", "x", "a"])
+
+        assert list(found) == [True, False, True]
+        np.testing.assert_array_equal(found_vectors[0], vectors[2])
+        np.testing.assert_array_equal(found_vectors[2], vectors[0])
+
+    def test_duplicates_are_stored_once(self, tmp_path, vectors):
+        """Test that repeated texts do not grow the cache."""
+        cache = EmbeddingCache(str(tmp_path), MODEL)
+        cache.put_many(["a", "a", "b"], vectors)
+        cache.put_many(["b"], vectors[:1])
+
+        assert len(cache) == 2
+
+    def test_grows_past_initial_capacity(self, tmp_path, monkeypatch):
+        """Test that the vector file is resized and the index re-sorted as it fills."""
+        monkeypatch.setattr(embedding_cache, "INITIAL_CAPACITY", 4)
+        monkeypatch.setattr(embedding_cache, "PENDING_MERGE_THRESHOLD", 3)
+        cache = EmbeddingCache(str(tmp_path), MODEL)
+        texts = [f"product {i}" for i in range(10)]
+        stored = np.random.default_rng(0).random((10, 4), dtype=np.float32)
+        for start in range(0, 10, 2):
+            cache.put_many(texts[start:start + 2], stored[start:start + 2])
+
+        found_vectors, found = cache.get_many(texts)
+
+        assert found.all()
+        np.testing.assert_array_equal(found_vectors, stored)
+
+
+class TestEmbeddingCachePersistence:
+    """Test reopening a cache directory."""
+
+    def test_reopened_cache_hits(self, tmp_path, vectors):
+        """Test that a new instance serves vectors written by a previous one."""
+        EmbeddingCache(str(tmp_path), MODEL).put_many(["a", "b", "c"], vectors)
+
+        cache = EmbeddingCache(str(tmp_path), MODEL)
+        found_vectors, found = cache.get_many(["b"])
+
+        assert len(cache) == 3
+        assert found.all()
+        np.testing.assert_array_equal(found_vectors[0], vectors[1])
+
+    def test_models_are_isolated(self, tmp_path, vectors):
+        """Test that the same text embedded by another model is a miss."""
+        EmbeddingCache(str(tmp_path), MODEL).put_many(["a"], vectors[:1])
+
+        _, found = EmbeddingCache(str(tmp_path), "other/model").get_many(["a"])
+
+        assert not found.any()
+
+    def test_torn_key_record_is_dropped(self, tmp_path, vectors):
+        """Test that a partially written key record is discarded on load."""
+        cache = EmbeddingCache(str(tmp_path), MODEL)
+        cache.put_many(["a", "b"], vectors[:2])
+        with open(cache._keys_path, "ab") as f:
+            f.write(b"\x00" * 5)
+        cache.close()
+
+        reopened = EmbeddingCache(str(tmp_path), MODEL)
+        reopened.put_many(["c"], vectors[2:])
+
+        assert len(EmbeddingCache(str(tmp_path), MODEL)) == 3
+        assert EmbeddingCache(str(tmp_path), MODEL).get_many(["a", "c"])[1].all()
+
+
+class TestEmbeddingCacheWriters:
+    """Test several processes opening the same cache directory."""
+
+    def test_second_writer_is_read_only(self, tmp_path, vectors):
+        """Test that a second instance cannot append while the first holds the directory, and still reads it."""
+        writer = EmbeddingCache(str(tmp_path), MODEL)
+        writer.put_many(["a"], vectors[:1])
+        other = EmbeddingCache(str(tmp_path), MODEL)
+
+        other.put_many(["b", "c"], vectors[1:])
+        writer.put_many(["d"], vectors[2:])
+        found_vectors, found = other.get_many(["a", "b"])
+
+        assert other.read_only and not writer.read_only
+        assert list(found) == [True, False]
+        np.testing.assert_array_equal(found_vectors[0], vectors[0])
+        writer.close()
+        reopened = EmbeddingCache(str(tmp_path), MODEL)
+        assert not reopened.read_only
+        assert list(reopened.get_many(["a", "b", "d"])[1]) == [True, False, True]
+        np.testing.assert_array_equal(reopened.get_many(["d"])[0][0], vectors[2])
+
+    def test_torn_record_of_a_live_writer_is_kept(self, tmp_path, vectors):
+        """Test that a read-only instance does not truncate the key file under the writer."""
+        writer = EmbeddingCache(str(tmp_path), MODEL)
+        writer.put_many(["a"], vectors[:1])
+        with open(writer._keys_path, "ab") as f:
+            f.write(b"\x00" * 5)
+
+        EmbeddingCache(str(tmp_path), MODEL)
+
+        assert os.path.getsize(writer._keys_path) == embedding_cache.KEY_DTYPE.itemsize + 5
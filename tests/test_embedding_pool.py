@@ -0,0 +1,98 @@
+"""
+Unit tests for the multi-process embedding pool.
+"""
+from pathlib import Path
+
+import numpy as np
+import pytest
+from superlinked_app.embedding_pool import EmbeddingPool, load_sentence_transformer
+
+
+class FakeEncoder:
+    """Deterministic stand-in for a sentence-transformer."""
+
+    def encode(self, texts, prompt_name=None):
+        return np.array([[len(text), sum(map(ord, text)) % 997, 1.0] for text in texts], dtype=np.float32)
+
+
+def fake_loader(model_name):
+    return FakeEncoder()
+
+
+def failing_loader(model_name):
+    raise OSError(f"cannot load {model_name}")
+
+
+@pytest.fixture
+def pool():
+    """Two-worker pool with small batches so every call spans several tasks."""
+    pool = EmbeddingPool("fake-model", workers=2, batch_size=3, loader=fake_loader)
+    yield pool
+    pool.close()
+
+
+class TestEmbeddingPool:
+    """Test embedding across worker processes."""
+
+    def test_results_are_in_input_order(self, pool):
+        """Test that rows line up with the inputs regardless of which worker ran them."""
+        texts = [f"product {i}" * (i % 4 + 1) for i in range(20)]
+
+        vectors = pool.embed(texts)
+
+        np.testing.assert_array_equal(vectors, FakeEncoder().encode(texts))
+
+    def test_buffer_grows_between_calls(self, pool):
+        """Test that a larger call after a smaller one gets a bigger shared buffer."""
+        pool.embed(["a", "b"])
+        texts = [f"name {i}" for i in range(50)]
+
+        vectors = pool.embed(texts)
+
+        assert vectors.shape == (50, 3)
+        np.testing.assert_array_equal(vectors, FakeEncoder().encode(texts))
+
+    def test_empty_input(self, pool):
+        """Test that an empty call returns an empty matrix of the right width."""
+        assert pool.embed([]).shape == (0, 3)
+
+    def test_worker_start_failure_is_raised(self):
+        """Test that a model that fails to load surfaces in the caller."""
+        pool = EmbeddingPool("missing-model", workers=1, loader=failing_loader)
+
+        with pytest.raises(RuntimeError, match="cannot load missing-model"):
+            pool.embed(["a"])
+        pool.close()
+
+
+class TestLoadSentenceTransformer:
+    """Test the arguments the real loader passes to Superlinked's model cache."""
+
+    @pytest.fixture
+    def calls(self, monkeypatch):
+        # Imported here: spawned pool workers import this module and should not pay for sentence-transformers
+        from superlinked.framework.common.space.embedding.sentence_transformer_model_cache import (
+            SentenceTransformerModelCache,
+        )
+
+        calls = []
+        monkeypatch.setattr(
+            SentenceTransformerModelCache, "initialize_model", lambda *args: calls.append(args) or FakeEncoder()
+        )
+        return calls
+
+    def test_default_cache_dir_is_a_path(self, calls, monkeypatch):
+        """Test that without a space directory the model cache gets Superlinked's default as a Path."""
+        monkeypatch.delenv("MODEL_CACHE_DIR", raising=False)
+
+        load_sentence_transformer("fake-model")
+
+        (model_name, device, cache_dir), = calls
+        assert (model_name, device) == ("fake-model", "cpu")
+        assert isinstance(cache_dir, Path) and cache_dir.parts[-1] == "sentence-transformers"
+
+    def test_space_cache_dir_is_kept(self, calls, tmp_path):
+        """Test that a space's own model directory is passed through."""
+        load_sentence_transformer("fake-model", tmp_path)
+
+        assert calls[0][2] == tmp_path
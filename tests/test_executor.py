@@ -0,0 +1,60 @@
+"""
+Unit tests for running executor queries from our own routes.
+"""
+import pytest
+from superlinked import framework as sl
+from superlinked_app.executor import ProcurementRestExecutor
+
+
+class CostSchema(sl.Schema):
+    """Small schema with a number space only, so no model has to be loaded."""
+
+    id: sl.IdField
+    cost: sl.Float
+
+
+cost_schema = CostSchema()
+cost_space = sl.NumberSpace(cost_schema.cost, min_value=0, max_value=100, mode=sl.Mode.MINIMUM)
+cost_index = sl.Index([cost_space], fields=[cost_schema.cost])
+cost_query = (
+    sl.Query(cost_index).find(cost_schema).filter(cost_schema.cost <= sl.Param("max_cost")).select_all().limit(5)
+)
+
+
+@pytest.fixture
+def source():
+    return sl.RestSource(cost_schema)
+
+
+@pytest.fixture
+def executor(source):
+    return ProcurementRestExecutor(
+        sources=[source],
+        indices=[cost_index],
+        queries=[sl.RestQuery(sl.RestDescriptor("cost_query"), cost_query)],
+        vector_database=sl.InMemoryVectorDatabase(),
+    )
+
+
+class TestProcurementRestExecutor:
+    """Test querying the running app through the executor."""
+
+    def test_query_by_path(self, executor, source):
+        """Test that a payload is run against the query registered at the path."""
+        executor.run()
+        source.put([{"id": "cheap", "cost": 5.0}, {"id": "dear", "cost": 50.0}])
+
+        result = executor.query("/api/v1/search/cost_query", {"max_cost": 10})
+
+        assert [entry.id for entry in result.entries] == ["cheap"]
+
+    def test_query_before_run(self, executor):
+        """Test that querying an executor that was not started fails clearly."""
+        with pytest.raises(RuntimeError):
+            executor.query("/api/v1/search/cost_query", {"max_cost": 10})
+
+    def test_query_descriptor_by_path(self, executor):
+        """Test that the query served at a path can be looked up."""
+        assert executor.query_descriptor("/api/v1/search/cost_query") is cost_query
+        with pytest.raises(KeyError):
+            executor.query_descriptor("/api/v1/search/other")
@@ -0,0 +1,119 @@
+"""
+Unit tests for the inverted index of categorical filters.
+"""
+import numpy as np
+import pytest
+from superlinked.framework.common.interface.comparison_operand import ComparisonOperation
+from superlinked.framework.common.interface.comparison_operation_type import ComparisonOperationType
+from superlinked.framework.common.storage.field.field import Field
+from superlinked.framework.common.storage.field.field_data_type import FieldDataType
+from superlinked_app.filter_index import CategoricalFilterIndex
+
+BRAND, COST = Field(FieldDataType.STRING, "brand"), Field(FieldDataType.DOUBLE, "cost")
+ROWS = [
+    {"brand": "Nike", "cost": 10.0},
+    {"brand": "Puma", "cost": 20.0},
+    {"brand": "Nike", "cost": 30.0},
+    {"brand": None, "cost": 40.0},
+    {"brand": "Levi's", "cost": 50.0},
+]
+
+
+def _filter(op: ComparisonOperationType, field: Field, other, group_key=None) -> ComparisonOperation:
+    return ComparisonOperation(op, field, other, group_key)
+
+
+def _index(rows=ROWS) -> CategoricalFilterIndex:
+    index = CategoricalFilterIndex(["brand"])
+    for position, row in enumerate(rows):
+        index.update(position, row)
+    return index
+
+
+def _positions(index: CategoricalFilterIndex, *filters) -> list[int] | None:
+    positions, _ = index.select(list(filters))
+    return None if positions is None else positions.tolist()
+
+
+class TestCategoricalFilterIndex:
+    """Test that the index selects the rows a per-row check would."""
+
+    def test_equality_and_in(self):
+        """Test that `==` and `in_` give the positions of the rows with those values."""
+        index = _index()
+
+        assert _positions(index, _filter(ComparisonOperationType.EQUAL, BRAND, "Nike")) == [0, 2]
+        assert _positions(index, _filter(ComparisonOperationType.IN, BRAND, ["Puma", "Levi's", "Adidas"])) == [1, 4]
+        assert _positions(index, _filter(ComparisonOperationType.EQUAL, BRAND, "Adidas")) == []
+
+    def test_exclusions(self):
+        """Test that `!=` and `not_in_` keep rows without a value, like the per-row check."""
+        index = _index()
+
+        assert _positions(index, _filter(ComparisonOperationType.NOT_EQUAL, BRAND, "Nike")) == [1, 3, 4]
+        assert _positions(index, _filter(ComparisonOperationType.NOT_IN, BRAND, ["Nike", "Puma"])) == [3, 4]
+        assert _positions(index, _filter(ComparisonOperationType.NOT_EQUAL, BRAND, "Adidas")) is None
+
+    def test_filters_every_row_passes_are_free(self, monkeypatch):
+        """Test that filters matching every row select nothing and check no row's codes."""
+        index = _index([{"brand": "Nike"}] * 4 + [{"brand": "Puma"}])
+        monkeypatch.setattr(index, "_narrow", lambda positions, conditions: pytest.fail("every row was checked"))
+
+        assert _positions(index, _filter(ComparisonOperationType.IN, BRAND, ["Nike", "Puma"])) is None
+        assert _positions(index, _filter(ComparisonOperationType.NOT_EQUAL, BRAND, "Adidas")) is None
+
+    def test_rewritten_rows_are_not_counted_twice(self):
+        """Test that a value whose postings still hold moved rows is not taken to match every row."""
+        index = _index([{"brand": "Nike"}] * 4)
+        index.update(3, {"brand": None})
+        index.update(3, {"brand": "Nike"})
+        index.update(2, {"brand": "Puma"})
+
+        assert _positions(index, _filter(ComparisonOperationType.EQUAL, BRAND, "Nike")) == [0, 1, 3]
+        assert _positions(index, _filter(ComparisonOperationType.IN, BRAND, ["Nike", "Nike"])) == [0, 1, 3]
+
+    def test_unanswered_filters_are_returned(self):
+        """Test that filters on other fields, OR groups and None values are left to the caller."""
+        index = _index()
+        range_filter = _filter(ComparisonOperationType.LESS_EQUAL, COST, 30.0)
+        grouped = _filter(ComparisonOperationType.EQUAL, BRAND, "Puma", group_key=1)
+        missing = _filter(ComparisonOperationType.EQUAL, BRAND, None)
+
+        positions, residual = index.select([range_filter, grouped, missing, _filter(ComparisonOperationType.EQUAL, BRAND, "Nike")])
+
+        assert positions.tolist() == [0, 2]
+        assert residual == [range_filter, grouped, missing]
+        assert index.select([range_filter]) == (None, [range_filter])
+
+    def test_update_moves_the_row(self):
+        """Test that rewriting a row drops it from its old value's positions."""
+        index = _index()
+        index.update(0, {"brand": "Puma"})
+        index.update(4, {"brand": None})
+        index.update(5, {"brand": "Nike"})
+
+        assert _positions(index, _filter(ComparisonOperationType.EQUAL, BRAND, "Nike")) == [2, 5]
+        assert _positions(index, _filter(ComparisonOperationType.EQUAL, BRAND, "Puma")) == [0, 1]
+        assert _positions(index, _filter(ComparisonOperationType.EQUAL, BRAND, "Levi's")) == []
+        assert len(index) == 6
+
+    def test_matches_a_per_row_check_at_scale(self):
+        """Test combined filters against filtering the rows one by one."""
+        rng = np.random.default_rng(0)
+        brands, colours = ["Nike", "Puma", "Levi's", "Gap"], ["red", "blue", None]
+        rows = [{"brand": brands[rng.integers(4)], "colour": colours[rng.integers(3)]} for _ in range(5000)]
+        index = CategoricalFilterIndex(["brand", "colour"])
+        for position, row in enumerate(rows):
+            index.update(position, row)
+        colour = Field(FieldDataType.STRING, "colour")
+
+        positions, residual = index.select(
+            [
+                _filter(ComparisonOperationType.IN, BRAND, ["Nike", "Gap"]),
+                _filter(ComparisonOperationType.NOT_EQUAL, colour, "red"),
+            ]
+        )
+
+        expected = [p for p, row in enumerate(rows) if row["brand"] in ("Nike", "Gap") and row["colour"] != "red"]
+        assert positions.tolist() == expected
+        assert residual == []
@@ -0,0 +1,91 @@
+"""
+Unit tests for the batched ingestion module.
+"""
+import pandas as pd
+import pytest
+from unittest.mock import MagicMock
+from superlinked_app.ingestion import (
+    SCHEMA_COLUMNS,
+    IngestionReport,
+    estimate_row_bytes,
+    ingest_csv,
+    ingest_frames,
+    iter_csv_batches,
+    plan_batch_rows,
+)
+
+
+@pytest.fixture
+def catalog_csv(tmp_path, sample_product_dataframe):
+    """Write a small catalog with an extra non-schema column."""
+    frame = pd.concat([sample_product_dataframe] * 10, ignore_index=True)
+    frame["product_id"] = [f"PROD{i:03d}" for i in range(len(frame))]
+    frame["sku"] = "NOT-IN-SCHEMA"
+    path = tmp_path / "products.csv"
+    frame.to_csv(path, index=False)
+    return str(path)
+
+
+class TestBatchPlanning:
+    """Test how batch sizes are derived from the row and byte budgets."""
+
+    def test_estimate_row_bytes(self, catalog_csv):
+        """Test that the estimate matches the average data line length."""
+        with open(catalog_csv, "rb") as f:
+            lines = f.readlines()[1:]
+        expected = sum(len(line) for line in lines) / len(lines)
+        assert estimate_row_bytes(catalog_csv) == pytest.approx(expected)
+
+    def test_row_budget_caps_batch(self, catalog_csv):
+        """Test that the row budget wins when the byte budget is generous."""
+        assert plan_batch_rows(catalog_csv, max_rows=7, max_bytes=10**9) == 7
+
+    def test_byte_budget_caps_batch(self, catalog_csv):
+        """Test that the byte budget wins when rows are large relative to it."""
+        row_bytes = estimate_row_bytes(catalog_csv)
+        assert plan_batch_rows(catalog_csv, max_rows=1000, max_bytes=int(row_bytes * 3) + 1) == 3
+
+    def test_batch_never_empty(self, catalog_csv):
+        """Test that a tiny byte budget still yields one row per batch."""
+        assert plan_batch_rows(catalog_csv, max_rows=1000, max_bytes=1) == 1
+
+
+class TestCsvBatches:
+    """Test reading the catalog in batches."""
+
+    def test_batches_cover_all_rows(self, catalog_csv):
+        """Test that batches are sized by the plan and cover the whole file."""
+        batches = list(iter_csv_batches(catalog_csv, max_rows=6, max_bytes=10**9))
+        assert [len(batch) for batch in batches] == [6, 6, 6, 2]
+
+    def test_only_schema_columns_are_parsed(self, catalog_csv):
+        """Test that non-schema columns are dropped at parse time."""
+        batch = next(iter_csv_batches(catalog_csv, max_rows=5, max_bytes=10**9))
+        assert "sku" not in batch.columns
+        assert set(batch.columns) == set(SCHEMA_COLUMNS)
+
+
+class TestIngestFrames:
+    """Test pushing batches into a source."""
+
+    def test_one_put_per_batch(self, sample_product_dataframe):
+        """Test that each frame is handed to the source in a single put."""
+        source = MagicMock()
+        report = ingest_frames(source, [sample_product_dataframe, sample_product_dataframe])
+
+        assert source.put.call_count == 2
+        assert report.rows == 4
+        assert report.batches == 2
+
+    def test_ingest_csv_reports_throughput(self, catalog_csv):
+        """Test that a full CSV run reports row counts and a positive rate."""
+        source = MagicMock()
+        report = ingest_csv(source, catalog_csv, max_rows=8, max_bytes=10**9)
+
+        assert report.rows == 20
+        assert report.batches == 3
+        assert report.rows_per_second > 0
+
+    def test_empty_report_rate(self):
+        """Test that an empty report does not divide by zero."""
+        assert IngestionReport().rows_per_second == 0.0
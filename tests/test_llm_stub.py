@@ -0,0 +1,119 @@
+"""
+Unit tests for the local OpenAI-compatible stub.
+"""
+import json
+
+import httpx
+import instructor
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from openai import OpenAI
+from pydantic import BaseModel
+from superlinked_app.llm_stub import Recordings, completion, create_stub_app, latency_sampler
+
+
+class Extraction(BaseModel):
+    """Response model like the one built for procurement_query, with every field optional."""
+
+    max_cost: float | None = None
+    cost_weight: float | None = None
+
+
+@pytest.fixture
+def recordings(tmp_path):
+    path = tmp_path / "recordings.jsonl"
+    path.write_text(json.dumps({"query": "Cheap products", "arguments": '{"cost_weight": 1.0}', "latency_seconds": 0.8}) + "\n")
+    return Recordings(str(path))
+
+
+def _extract(app, query):
+    """Run an instructor extraction the way Superlinked's OpenAIClient does, against `app`."""
+    client = instructor.from_openai(OpenAI(api_key="test-key", base_url="http://stub/v1", http_client=TestClient(app)))
+    response = client.chat.completions.create(
+        model="gpt-4o",
+        response_model=Extraction,
+        max_retries=0,
+        messages=[{"role": "system", "content": "Extract parameters."}, {"role": "user", "content": query}],
+        temperature=0.0,
+    )
+    return response.model_dump()
+
+
+class TestReplay:
+    """Test serving recorded extractions."""
+
+    def test_recorded_query_is_replayed(self, recordings):
+        """Test that the OpenAI client gets the recorded arguments for a known query."""
+        app = create_stub_app(recordings, latency="none")
+
+        assert _extract(app, "cheap products.") == {"max_cost": None, "cost_weight": 1.0}
+        assert TestClient(app).get("/stats").json()["replayed"] == 1
+
+    def test_unknown_query_gets_empty_extraction(self, recordings):
+        """Test that a query without a recording is answered with no params."""
+        app = create_stub_app(recordings, latency="none")
+
+        assert _extract(app, "popular jeans") == {"max_cost": None, "cost_weight": None}
+        assert TestClient(app).get("/stats").json()["missing"] == 1
+
+    def test_plain_completion(self):
+        """Test that requests without tools get the arguments as message content."""
+        response = completion({"model": "gpt-4o", "messages": []}, "{}")
+
+        assert response["choices"][0]["message"]["content"] == "{}"
+        assert response["choices"][0]["finish_reason"] == "stop"
+
+
+class TestRecord:
+    """Test capturing upstream responses."""
+
+    def test_responses_are_recorded(self, tmp_path):
+        """Test that record mode forwards the request and stores the extraction for replay."""
+        upstream = FastAPI()
+        seen = {}
+
+        @upstream.post("/v1/chat/completions")
+        async def chat(request: Request):
+            body = await request.json()
+            seen["authorization"] = request.headers["authorization"]
+            return completion(body, '{"max_cost": 20.0}')
+
+        recordings = Recordings(str(tmp_path / "recorded.jsonl"))
+        upstream_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=upstream))
+        app = create_stub_app(recordings, record=True, upstream="http://upstream/v1", upstream_client=upstream_client)
+
+        assert _extract(app, "products under 20 dollars") == {"max_cost": 20.0, "cost_weight": None}
+        assert seen["authorization"] == "Bearer test-key"
+        replay = create_stub_app(Recordings(str(tmp_path / "recorded.jsonl")), latency="none")
+        assert _extract(replay, "Products under 20 dollars")["max_cost"] == 20.0
+
+
+class TestLatency:
+    """Test the latency distributions."""
+
+    @pytest.mark.parametrize(
+        "spec, low, high",
+        [("none", 0.0, 0.0), ("fixed:0.5", 0.5, 0.5), ("uniform:0.1,0.2", 0.1, 0.2), ("normal:0.5,0.1", 0.0, 2.0)],
+    )
+    def test_samples_in_range(self, spec, low, high):
+        """Test that samples fall within the distribution's range."""
+        sample = latency_sampler(spec, seed=1)
+
+        assert all(low <= sample(None) <= high for _ in range(100))
+
+    def test_lognormal_median(self):
+        """Test that the lognormal spec is parameterised by its median."""
+        sample = latency_sampler("lognormal:0.8,0.5", seed=1)
+
+        assert sorted(sample(None) for _ in range(1001))[500] == pytest.approx(0.8, rel=0.1)
+
+    def test_recorded(self):
+        """Test that 'recorded' waits as long as the original response took."""
+        assert latency_sampler("recorded")(1.25) == 1.25
+
+    @pytest.mark.parametrize("spec", ["fixed", "gamma:1,2", "uniform:1"])
+    def test_invalid_spec(self, spec):
+        """Test that malformed specs are rejected."""
+        with pytest.raises(ValueError):
+            latency_sampler(spec)
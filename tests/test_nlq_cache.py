@@ -0,0 +1,331 @@
+"""
+Unit tests for the natural-query parameter cache.
+"""
+import time
+
+import numpy as np
+import pytest
+from unittest.mock import patch
+from superlinked import framework as sl
+from superlinked.framework.dsl.query import query_param_value_setter
+from superlinked_app import nlq_handler
+from superlinked_app.nlq_cache import ParamCache, SemanticParamCache, _QueryIndex, cache_key, normalize_query
+from superlinked_app.nlq_handler import ProcurementNLQHandler, _openai_client, extract_params, install_nlq_handler
+from superlinked_app.nlq_rules import RuleBasedParser
+from superlinked_app.speculation import SpeculativeEmbeddings
+
+
+class NlqSchema(sl.Schema):
+    """Small schema with a number space only, so no model has to be loaded."""
+
+    id: sl.IdField
+    cost: sl.Float
+
+
+nlq_schema = NlqSchema()
+cost_space = sl.NumberSpace(nlq_schema.cost, min_value=0, max_value=100, mode=sl.Mode.MINIMUM)
+nlq_index = sl.Index([cost_space], fields=[nlq_schema.cost])
+
+
+def _query(system_prompt: str = "Extract procurement parameters."):
+    return (
+        sl.Query(nlq_index, weights={cost_space: sl.Param("cost_weight", description="Preference for low cost")})
+        .find(nlq_schema)
+        .filter(nlq_schema.cost <= sl.Param("max_cost", description="Highest cost", default=1000))
+        .with_natural_query(
+            natural_query=sl.Param("natural_query"),
+            client_config=sl.OpenAIClientConfig(api_key="test-key", model="gpt-4o"),
+            system_prompt=system_prompt,
+        )
+        .select_all()
+        .limit(10)
+    )
+
+
+@pytest.fixture
+def app():
+    source = sl.InteractiveSource(nlq_schema)
+    app = sl.InteractiveExecutor(sources=[source], indices=[nlq_index]).run()
+    source.put([{"id": "cheap", "cost": 5.0}, {"id": "dear", "cost": 80.0}])
+    return app
+
+
+@pytest.fixture
+def installed_cache():
+    """Install the handler with a fresh cache, and undo it afterwards."""
+    previous = query_param_value_setter.NLQHandler, nlq_handler._param_cache, nlq_handler._semantic_cache
+    cache = ParamCache(max_entries=8, ttl_seconds=60)
+    install_nlq_handler(cache)
+    yield cache
+    query_param_value_setter.NLQHandler, nlq_handler._param_cache, nlq_handler._semantic_cache = previous
+    nlq_handler._rule_parser = nlq_handler._speculative = nlq_handler._openai_base_url = nlq_handler._admission = None
+
+
+VOCABULARY = ["cheap", "popular", "dresses", "jeans", "under", "dollars", "expensive"]
+SYNONYMS = {"budget": "cheap", "affordable": "cheap", "trending": "popular"}
+
+
+def bag_of_words(texts):
+    """Stand-in for MiniLM: synonyms share a dimension, digits and filler words are ignored."""
+    vectors = np.zeros((len(texts), len(VOCABULARY)), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in text.split():
+            word = SYNONYMS.get(word, word)
+            if word in VOCABULARY:
+                vectors[row, VOCABULARY.index(word)] += 1
+    return vectors
+
+
+@pytest.fixture
+def semantic_cache(installed_cache):
+    """Semantic cache installed next to the exact cache."""
+    cache = SemanticParamCache(bag_of_words, threshold=0.95)
+    install_nlq_handler(installed_cache, cache)
+    return cache
+
+
+class TestParamCache:
+    """Test the LRU, SQLite and TTL behaviour of the cache."""
+
+    def test_normalization(self):
+        """Test that case, spacing and trailing punctuation do not change the key."""
+        assert normalize_query("  Cheap   DRESSES?  ") == "cheap dresses"
+        assert cache_key("Cheap dresses", "prompt") == cache_key("cheap  dresses.", "prompt")
+        assert cache_key("cheap dresses", "prompt") != cache_key("cheap dresses", "other prompt")
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is dropped first."""
+        cache = ParamCache(max_entries=2)
+        cache.put("a", {"x": 1})
+        cache.put("b", {"x": 2})
+        cache.get("a")
+        cache.put("c", {"x": 3})
+
+        assert cache.get("b") is None
+        assert cache.get("a") == {"x": 1}
+        assert cache.stats()["memory_hits"] == 2
+        assert cache.stats()["misses"] == 1
+
+    def test_ttl(self):
+        """Test that expired entries are not served."""
+        cache = ParamCache(ttl_seconds=0.01)
+        cache.put("a", {"x": 1})
+        time.sleep(0.02)
+
+        assert cache.get("a") is None
+
+    def test_disk_tier_survives_restart(self, tmp_path):
+        """Test that a new cache on the same SQLite file serves earlier entries."""
+        path = str(tmp_path / "nlq.sqlite")
+        ParamCache(path=path).put("a", {"max_cost": 5, "categories_include": ["Jeans"]})
+
+        cache = ParamCache(path=path)
+
+        assert cache.get("a") == {"max_cost": 5, "categories_include": ["Jeans"]}
+        assert cache.get("a") is not None
+        assert (cache.disk_hits, cache.memory_hits) == (1, 1)
+
+    def test_evict_expired(self, tmp_path):
+        """Test that expired rows are removed from the SQLite file."""
+        cache = ParamCache(ttl_seconds=0.01, path=str(tmp_path / "nlq.sqlite"))
+        cache.put("a", {"x": 1})
+        time.sleep(0.02)
+
+        assert cache.evict_expired() == 1
+
+
+class TestCachedExtraction:
+    """Test the cache in front of the LLM call during query execution."""
+
+    def test_repeated_query_skips_llm(self, app, installed_cache):
+        """Test that the second identical natural query reuses the extracted params."""
+        extracted = {"cost_weight": 1.0, "max_cost": 50}
+        with patch.object(ProcurementNLQHandler, "_execute_query", return_value=extracted) as llm:
+            first = app.query(_query(), natural_query="Cheap products under 50")
+            second = app.query(_query(), natural_query="cheap products under 50?")
+
+        assert llm.call_count == 1
+        assert [entry.id for entry in first.entries] == [entry.id for entry in second.entries] == ["cheap"]
+        assert installed_cache.stats()["memory_hits"] == 1
+
+    def test_prompt_change_misses(self, app, installed_cache):
+        """Test that changing the system prompt does not reuse old extractions."""
+        with patch.object(ProcurementNLQHandler, "_execute_query", return_value={"cost_weight": 1.0}) as llm:
+            app.query(_query(), natural_query="cheap products")
+            app.query(_query("A different prompt."), natural_query="cheap products")
+
+        assert llm.call_count == 2
+
+    def test_explicit_params_change_the_key(self, app, installed_cache):
+        """Test that a request setting a param itself is not answered with an extraction that set it."""
+        with patch.object(ProcurementNLQHandler, "_execute_query", return_value={"cost_weight": 1.0}) as llm:
+            app.query(_query(), natural_query="cheap products")
+            app.query(_query(), natural_query="cheap products", max_cost=10)
+
+        assert llm.call_count == 2
+
+
+class TestSemanticCache:
+    """Test reuse of extractions for paraphrased queries."""
+
+    def test_paraphrase_is_matched(self):
+        """Test that a query with the same meaning finds the earlier extraction."""
+        cache = SemanticParamCache(bag_of_words, threshold=0.95)
+        vector = cache.embed_query("cheap popular dresses")
+        cache.add("cheap popular dresses", vector, "prompt", {"cost_weight": 1.0})
+
+        match = cache.lookup("popular dresses on a budget", cache.embed_query("popular dresses on a budget"), "prompt")
+
+        assert match.params == {"cost_weight": 1.0}
+        assert match.similarity == pytest.approx(1.0)
+        assert match.natural_query == "cheap popular dresses"
+
+    def test_different_meaning_or_prompt_is_not_matched(self):
+        """Test that dissimilar queries and other prompts miss."""
+        cache = SemanticParamCache(bag_of_words, threshold=0.95)
+        cache.add("cheap popular dresses", cache.embed_query("cheap popular dresses"), "prompt", {"cost_weight": 1.0})
+
+        assert cache.lookup("expensive jeans", cache.embed_query("expensive jeans"), "prompt") is None
+        assert cache.lookup("cheap popular dresses", cache.embed_query("cheap popular dresses"), "other") is None
+        assert cache.stats()["misses"] == 2
+
+    def test_numbers_must_match(self):
+        """Test that queries differing only in a number are not treated as the same."""
+        cache = SemanticParamCache(bag_of_words, threshold=0.95)
+        cache.add("jeans under 5 dollars", cache.embed_query("jeans under 5 dollars"), "prompt", {"max_cost": 5})
+
+        assert cache.lookup("jeans under 50 dollars", cache.embed_query("jeans under 50 dollars"), "prompt") is None
+        assert cache.lookup("Jeans under 5 dollars!", cache.embed_query("Jeans under 5 dollars!"), "prompt") is not None
+
+    def test_oldest_entry_is_replaced(self):
+        """Test that a full index overwrites its oldest entry."""
+        cache = SemanticParamCache(bag_of_words, threshold=0.95, max_entries=2)
+        for query in ["cheap dresses", "popular jeans", "expensive dresses"]:
+            cache.add(query, cache.embed_query(query), "prompt", {"query": query})
+
+        assert cache.stats()["entries"] == 2
+        assert cache.lookup("cheap dresses", cache.embed_query("cheap dresses"), "prompt") is None
+
+    def test_index_grows_without_copying_every_add(self):
+        """Test that the query matrix is reallocated a few times up to max_entries, then overwritten in place."""
+        index = _QueryIndex(dimension=4, max_entries=300)
+        vectors = np.random.default_rng(0).random((400, 4), dtype=np.float32)
+        reallocations, matrix = 0, index._matrix
+        for number, vector in enumerate(vectors):
+            index.add(vector, f"query {number}", {})
+            reallocations += index._matrix is not matrix
+            matrix = index._matrix
+
+        assert reallocations == 5  # 64, 96, 144, 216, then capped at 300 rows
+        assert index.vectors.shape == (300, 4) and index._matrix.shape == (300, 4)
+        np.testing.assert_array_equal(index.vectors[:100], vectors[300:])
+        np.testing.assert_array_equal(index.vectors[100:], vectors[100:300])
+
+    def test_paraphrase_skips_llm(self, app, semantic_cache):
+        """Test that a paraphrased natural query reuses the params during query execution."""
+        with patch.object(ProcurementNLQHandler, "_execute_query", return_value={"cost_weight": 1.0}) as llm:
+            app.query(_query(), natural_query="cheap popular dresses")
+            app.query(_query(), natural_query="trending dresses on a budget")
+
+        assert llm.call_count == 1
+        assert semantic_cache.stats()["hits"] == 1
+
+    def test_verification_counts_disagreements(self, app, semantic_cache):
+        """Test that verified matches are extracted again and compared."""
+        semantic_cache.verify_rate = 1.0
+        extractions = [{"cost_weight": 1.0}, {"cost_weight": 1.0}, {"cost_weight": 1.0, "max_cost": 20}]
+        with patch.object(ProcurementNLQHandler, "_execute_query", side_effect=extractions) as llm:
+            app.query(_query(), natural_query="cheap dresses")
+            app.query(_query(), natural_query="affordable dresses")
+            app.query(_query(), natural_query="budget dresses")
+
+        stats = semantic_cache.stats()
+        assert llm.call_count == 3
+        assert (stats["verified"], stats["disagreements"]) == (2, 1)
+        assert stats["disagreement_rate"] == pytest.approx(0.5)
+
+
+class TestRuleFastPath:
+    """Test that queries the local rules understand skip the LLM."""
+
+    @pytest.fixture
+    def rules(self, installed_cache):
+        rules = RuleBasedParser(departments=["Women", "Men"], categories=["Jeans"], brands=[])
+        install_nlq_handler(installed_cache, rule_parser=rules)
+        return rules
+
+    def test_numeric_query_is_parsed_locally(self, app, rules):
+        """Test that a pure numeric constraint is applied without an LLM call."""
+        with patch.object(ProcurementNLQHandler, "_execute_query") as llm:
+            result = app.query(_query(), natural_query="products with cost less than 50 dollars")
+
+        llm.assert_not_called()
+        assert [entry.id for entry in result.entries] == ["cheap"]
+        assert rules.stats()["handled"] == 1
+
+    def test_vague_query_goes_to_llm(self, app, rules):
+        """Test that a query the rules do not understand is extracted by the LLM."""
+        with patch.object(ProcurementNLQHandler, "_execute_query", return_value={"cost_weight": 1.0}) as llm:
+            app.query(_query(), natural_query="something for a seasonal promotion")
+
+        assert llm.call_count == 1
+        assert rules.stats()["fallbacks"] == 1
+
+
+class TestSpeculativeEmbedding:
+    """Test that likely query texts are embedded before the LLM answers."""
+
+    def test_guesses_are_embedded_during_extraction(self, app, installed_cache):
+        """Test that the raw query and the rules' description are started before the LLM call returns."""
+        embedded = []
+        speculative = SpeculativeEmbeddings("model", lambda texts: embedded.extend(texts) or bag_of_words(texts))
+        rules = RuleBasedParser(departments=["Women"], categories=["Jeans"], brands=[])
+        install_nlq_handler(installed_cache, rule_parser=rules, speculative=speculative)
+
+        def extract(*args):
+            speculative.take(["jeans for a seasonal promotion"])
+            return {"cost_weight": 1.0}
+
+        with patch.object(ProcurementNLQHandler, "_execute_query", side_effect=extract):
+            app.query(_query(), natural_query="Jeans for a seasonal promotion")
+
+        assert sorted(embedded) == sorted(
+            ["jeans for a seasonal promotion", "Jeans for a seasonal promotion", "jeans seasonal promotion"]
+        )
+        assert speculative.stats()["hits"] == 1
+
+
+class TestExtractParams:
+    """Test extracting params of a natural query without searching."""
+
+    def test_extraction_uses_the_handler(self, installed_cache):
+        """Test that the params come from the installed handler and fill its cache."""
+        with patch.object(ProcurementNLQHandler, "_execute_query", return_value={"max_cost": 50}) as llm:
+            first = extract_params(_query(), {"natural_query": "products under 50"})
+            second = extract_params(_query(), {"natural_query": "products under 50"})
+
+        assert first == second == {"max_cost": 50}
+        assert llm.call_count == 1
+
+    def test_without_natural_query(self, installed_cache):
+        """Test that a payload without a natural query extracts nothing."""
+        assert extract_params(_query(), {"max_cost": 10}) == {}
+
+    def test_unknown_params_are_rejected(self, installed_cache):
+        """Test that the payload is validated like a normal search."""
+        with pytest.raises(ValueError):
+            extract_params(_query(), {"natural_query": "jeans", "colour": "blue"})
+
+
+class TestOpenAIClient:
+    """Test the client used for extraction calls."""
+
+    def test_client_is_reused_and_uses_base_url(self, installed_cache):
+        """Test that queries share one client per endpoint, pointed at the configured base URL."""
+        install_nlq_handler(installed_cache, openai_base_url="http://localhost:8090/v1")
+        config = sl.OpenAIClientConfig(api_key="test-key", model="gpt-4o")
+
+        client = _openai_client(config)
+
+        assert _openai_client(config) is client
+        assert str(client._client.client.base_url) == "http://localhost:8090/v1/"
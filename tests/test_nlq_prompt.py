@@ -0,0 +1,140 @@
+"""
+Unit tests for pruning option lists in the extraction prompt.
+"""
+import numpy as np
+import pytest
+from unittest.mock import patch
+from superlinked import framework as sl
+from superlinked.framework.dsl.query import query_param_value_setter
+from superlinked.framework.dsl.query.nlq.nlq_clause_collector import NLQClauseCollector
+from superlinked.framework.dsl.query.nlq.param_filler.query_param_prompt_builder import QueryParamPromptBuilder
+from superlinked.framework.dsl.query.space_weight_param_info import SpaceWeightParamInfo
+from superlinked_app import nlq_handler
+from superlinked_app.nlq_handler import ProcurementNLQHandler, install_nlq_handler
+from superlinked_app.nlq_prompt import OptionPruner, estimate_tokens
+
+
+class BrandSchema(sl.Schema):
+    """Small schema with a brand filter and a number space, so no model has to be loaded."""
+
+    id: sl.IdField
+    cost: sl.Float
+    brand: sl.String
+
+
+brand_schema = BrandSchema()
+cost_space = sl.NumberSpace(brand_schema.cost, min_value=0, max_value=100, mode=sl.Mode.MINIMUM)
+brand_index = sl.Index([cost_space], fields=[brand_schema.cost, brand_schema.brand])
+
+SPORT_BRANDS = ["Nike", "Adidas", "Puma", "Reebok"]
+OTHER_BRANDS = [f"Label {number}" for number in range(40)]
+BRANDS = SPORT_BRANDS + OTHER_BRANDS
+
+
+def embed(texts):
+    """Stand-in for MiniLM: sports brands and sports words share one dimension."""
+    vectors = np.zeros((len(texts), 3), dtype=np.float32)
+    for row, text in enumerate(texts):
+        sporty = text in SPORT_BRANDS or any(word in text.lower() for word in ("running", "sport", "gym"))
+        vectors[row] = [1.0, 0.0, 0.1] if sporty else [0.0, 1.0, 0.1]
+    return vectors
+
+
+def _query():
+    return (
+        sl.Query(brand_index, weights={cost_space: sl.Param("cost_weight", description="Preference for low cost")})
+        .find(brand_schema)
+        .filter(brand_schema.brand.in_(sl.Param("brands_include", description="Brands to include", options=BRANDS)))
+        .with_natural_query(
+            natural_query=sl.Param("natural_query"),
+            client_config=sl.OpenAIClientConfig(api_key="test-key", model="gpt-4o"),
+        )
+        .select_all()
+        .limit(10)
+    )
+
+
+def _render(clauses):
+    return QueryParamPromptBuilder.calculate_instructor_prompt(NLQClauseCollector(clauses, SpaceWeightParamInfo.from_clauses(clauses)))
+
+
+def _options(pruned):
+    return next(
+        sorted(clause.value_param.param.options) for clause in pruned.clauses if hasattr(clause, "value_param")
+    )
+
+
+@pytest.fixture
+def clauses():
+    return _query().clauses
+
+
+class TestOptionPruner:
+    """Test which options stay in the prompt."""
+
+    def test_similar_options_are_kept(self, clauses):
+        """Test that options close to the query are ranked first and the list is cut."""
+        pruner = OptionPruner(embed, ["brands_include"], max_options=4)
+
+        pruned = pruner.prune("running shoes", clauses, _render)
+
+        assert _options(pruned) == sorted(SPORT_BRANDS)
+        assert pruned.tokens < pruned.full_tokens
+        assert "Label 7" not in pruned.prompt
+
+    def test_mentioned_options_are_always_kept(self, clauses):
+        """Test that an option named in the query survives even if it ranks low."""
+        pruner = OptionPruner(embed, ["brands_include"], max_options=2, min_options=1)
+
+        pruned = pruner.prune("running shoes from label 7 or label 12", clauses, _render)
+
+        assert {"Label 7", "Label 12"} <= set(_options(pruned))
+
+    def test_token_budget(self, clauses):
+        """Test that lists shrink until the prompt fits the budget."""
+        full = estimate_tokens(_render(clauses))
+        pruner = OptionPruner(embed, ["brands_include"], max_options=40, token_budget=full - 80, min_options=2)
+
+        pruned = pruner.prune("running shoes", clauses, _render)
+
+        assert pruned.tokens <= pruner.token_budget
+        assert 2 <= pruned.options["brands_include"] < 40
+        assert pruner.stats()["over_budget"] == 0
+
+    def test_other_params_are_untouched(self, clauses):
+        """Test that params not named for pruning keep every option."""
+        pruner = OptionPruner(embed, ["categories_include"], max_options=4)
+
+        assert len(_options(pruner.prune("running shoes", clauses, _render))) == len(BRANDS)
+
+
+class TestPrunedExtraction:
+    """Test the pruned prompt and model during query execution."""
+
+    @pytest.fixture
+    def app(self):
+        source = sl.InteractiveSource(brand_schema)
+        app = sl.InteractiveExecutor(sources=[source], indices=[brand_index]).run()
+        source.put([{"id": "shoe", "cost": 5.0, "brand": "Nike"}, {"id": "bag", "cost": 8.0, "brand": "Label 3"}])
+        return app
+
+    @pytest.fixture
+    def pruner(self):
+        previous = query_param_value_setter.NLQHandler, nlq_handler._param_cache, nlq_handler._semantic_cache
+        pruner = OptionPruner(embed, ["brands_include"], max_options=4)
+        install_nlq_handler(None, option_pruner=pruner)
+        yield pruner
+        query_param_value_setter.NLQHandler, nlq_handler._param_cache, nlq_handler._semantic_cache = previous
+        nlq_handler._option_pruner = None
+
+    def test_llm_sees_pruned_options(self, app, pruner):
+        """Test that the LLM is prompted with, and validated against, the pruned options only."""
+        with patch.object(ProcurementNLQHandler, "_execute_query", return_value={"brands_include": ["Nike"]}) as llm:
+            result = app.query(_query(), natural_query="sport shoes")
+
+        _, prompt, model_class = llm.call_args.args
+        assert "Label 3" not in prompt and "Nike" in prompt
+        with pytest.raises(ValueError):
+            model_class(brands_include=["Label 3"])
+        assert [entry.id for entry in result.entries] == ["shoe"]
+        assert pruner.stats()["requests"] == 1
@@ -0,0 +1,126 @@
+"""
+Unit tests for the local natural-query rules.
+"""
+import pytest
+from superlinked_app.nlq import cost_description, profit_margin_description
+from superlinked_app.nlq_rules import RuleBasedParser, description_keywords
+
+
+@pytest.fixture
+def rules():
+    """Parser with a small catalog vocabulary."""
+    return RuleBasedParser(
+        departments=["Women", "Men", "Kids"],
+        categories=["Dresses", "Jeans", "Shorts", "Socks", "Socks & Hosiery", "Outerwear & Coats"],
+        brands=["Nike", "Under Armour", "Joe's Jeans", "DC"],
+    )
+
+
+class TestKeywords:
+    """Test reading keyword lists from the param descriptions."""
+
+    def test_positive_and_negative_lists(self):
+        """Test that quoted keywords are split by their label."""
+        positive, negative = description_keywords(cost_description)
+
+        assert "cheap" in positive and "lowest cost" in positive
+        assert "expensive" in negative and "cheap" not in negative
+
+    def test_weight_labels(self):
+        """Test the 'positive weight:' / 'negative weight:' form."""
+        positive, negative = description_keywords(profit_margin_description)
+
+        assert "high margin" in positive
+        assert "low margin" in negative
+
+
+class TestParse:
+    """Test what the rules extract and how confident they are."""
+
+    @pytest.mark.parametrize(
+        "query, expected",
+        [
+            ("products with cost less than 5 dollars", {"max_cost": 5.0}),
+            ("cost less than 100 dollars and revenue more than 1000 dollars", {"max_cost": 100.0, "min_revenue": 1000.0}),
+            ("items under $20", {"max_cost": 20.0}),
+            ("price between 10 and 20", {"min_cost": 10.0, "max_cost": 20.0}),
+            ("at least 1k orders", {"min_orders": 1000.0}),
+            ("profit margin above 40%", {"min_profit_margin": 40.0}),
+            ("return rate below 5 percent", {"max_return_rate": 5.0}),
+        ],
+    )
+    def test_numeric_constraints(self, rules, query, expected):
+        """Test that numeric ranges become the matching filter params."""
+        result = rules.parse(query)
+
+        assert {name: result.params[name] for name in expected} == expected
+        assert result.confidence == 1.0
+
+    def test_categorical_mentions(self, rules):
+        """Test that brands, departments and singular/plural categories are recognised."""
+        result = rules.parse("Nike dress for women")
+
+        assert result.params["brands_include"] == ["Nike"]
+        assert result.params["departments_include"] == ["Women"]
+        assert result.params["categories_include"] == ["Dresses"]
+        assert result.params["product_description"] == "dress"
+
+    def test_brand_before_category(self, rules):
+        """Test that a brand containing a category name is taken as the brand."""
+        result = rules.parse("Joe's Jeans for men")
+
+        assert result.params["brands_include"] == ["Joe's Jeans"]
+        assert "categories_include" not in result.params
+
+    def test_short_brand_needs_exact_case(self, rules):
+        """Test that short brand names are not matched inside ordinary lower-case text."""
+        assert rules.parse("DC shorts").params["brands_include"] == ["DC"]
+        assert "brands_include" not in rules.parse("dc shorts").params
+
+    def test_exact_category_wins_over_part(self, rules):
+        """Test that 'socks' selects Socks rather than Socks & Hosiery."""
+        assert rules.parse("kids socks").params["categories_include"] == ["Socks"]
+
+    def test_exclusion(self, rules):
+        """Test that a negated category becomes an exclusion."""
+        result = rules.parse("cheap jeans except shorts")
+
+        assert result.params["categories_exclude"] == ["Shorts"]
+        assert result.params["categories_include"] == ["Jeans"]
+
+    def test_weight_keywords(self, rules):
+        """Test that keywords set their weight and other weights are neutral."""
+        result = rules.parse("cheap best-selling jeans")
+
+        assert result.params["cost_weight"] == 1.0
+        assert result.params["sales_performance_weight"] == 1.0
+        assert result.params["reliability_weight"] == 0.0
+        assert rules.parse("premium jeans").params["cost_weight"] == -1.0
+
+    def test_longer_keyword_wins(self, rules):
+        """Test that 'unpopular' is not read as 'popular'."""
+        assert rules.parse("unpopular jeans").params["sales_performance_weight"] == -1.0
+
+    def test_unknown_words_lower_confidence(self, rules):
+        """Test that words the rules cannot place leave the query to the LLM."""
+        result = rules.parse("reliable suppliers for winter coats")
+
+        assert result.unknown_words == ["suppliers", "winter"]
+        assert result.confidence < rules.min_confidence
+
+    def test_unsupported_constraint(self, rules):
+        """Test that a constraint without a matching param is not silently dropped."""
+        assert rules.parse("revenue below 100").confidence == 0.0
+        assert rules.parse("jeans without holes").confidence == 0.0
+
+    def test_nothing_recognised(self, rules):
+        """Test that a query with no recognised terms has no confidence."""
+        assert rules.parse("something nice").confidence == 0.0
+
+    def test_stats(self, rules):
+        """Test the handled/fallback counters."""
+        rules.record(True)
+        rules.record(True)
+        rules.record(False)
+
+        assert rules.stats()["handled_rate"] == pytest.approx(2 / 3)
@@ -0,0 +1,139 @@
+"""
+Unit tests for the selectivity-aware query planner.
+"""
+import pytest
+from superlinked.framework.common.interface.comparison_operand import ComparisonOperation
+from superlinked.framework.common.interface.comparison_operation_type import ComparisonOperationType
+from superlinked.framework.common.storage.field.field import Field
+from superlinked.framework.common.storage.field.field_data_type import FieldDataType
+from superlinked_app.planner import (
+    EXACT_SCAN,
+    POST_FILTER,
+    RAISED_CANDIDATES,
+    FieldStatistics,
+    QueryPlanner,
+    plan_scope,
+)
+
+from .test_vector_store import SCORING_ROWS, _ranking, _scoring_app
+
+BRAND, COST = Field(FieldDataType.STRING, "brand"), Field(FieldDataType.DOUBLE, "cost")
+
+
+def _filter(op: ComparisonOperationType, field: Field, other, group_key=None) -> ComparisonOperation:
+    return ComparisonOperation(op, field, other, group_key)
+
+
+@pytest.fixture
+def statistics():
+    statistics = FieldStatistics(["brand"], ["cost"])
+    for position in range(1000):
+        statistics.update(position, {"brand": ["Nike", "Puma", "Levi's", None][position % 4], "cost": float(position)})
+    return statistics
+
+
+class TestFieldStatistics:
+    """Test the selectivity estimates."""
+
+    def test_categorical_shares(self, statistics):
+        """Test that value counts give the share of `==`, `in_` and exclusion filters."""
+        assert statistics.selectivity([_filter(ComparisonOperationType.EQUAL, BRAND, "Nike")]) == 0.25
+        assert statistics.selectivity([_filter(ComparisonOperationType.IN, BRAND, ["Nike", "Puma", "Gap"])]) == 0.5
+        assert statistics.selectivity([_filter(ComparisonOperationType.NOT_EQUAL, BRAND, "Nike")]) == 0.75
+
+    def test_numeric_shares(self, statistics):
+        """Test that the histograms estimate range filters, and defaults pass everything."""
+        at_most, at_least = ComparisonOperationType.LESS_EQUAL, ComparisonOperationType.GREATER_EQUAL
+
+        assert statistics.selectivity([_filter(at_most, COST, 100.0)]) == pytest.approx(0.1, abs=0.01)
+        assert statistics.selectivity([_filter(at_least, COST, 900)]) == pytest.approx(0.1, abs=0.01)
+        assert statistics.selectivity([_filter(at_most, COST, 5000.0)]) == 1.0
+
+    def test_combined_shares(self, statistics):
+        """Test AND as a product, OR groups as either, and unknown filters as passing every row."""
+        nike = _filter(ComparisonOperationType.EQUAL, BRAND, "Nike")
+        cheap = _filter(ComparisonOperationType.LESS_EQUAL, COST, 500.0)
+        unknown = _filter(ComparisonOperationType.CONTAINS, Field(FieldDataType.STRING_LIST, "tags"), "eco")
+
+        assert statistics.selectivity([nike, cheap, unknown]) == pytest.approx(0.125, abs=0.01)
+        either = [_filter(ComparisonOperationType.EQUAL, BRAND, brand, group_key=1) for brand in ("Nike", "Puma")]
+        assert statistics.selectivity(either) == pytest.approx(1 - 0.75 * 0.75)
+
+    def test_rewrites_update_the_counts(self, statistics):
+        """Test that rewriting rows moves their value counts, and distinct and missing counts follow."""
+        for position in range(0, 1000, 4):
+            statistics.update(position, {"brand": "Puma", "cost": None})
+
+        assert statistics.selectivity([_filter(ComparisonOperationType.EQUAL, BRAND, "Nike")]) == 0
+        assert statistics.stats()["fields"] == {"brand": {"distinct": 2, "missing": 250}, "cost": {"missing": 250}}
+
+
+class TestQueryPlanner:
+    """Test the plan choices."""
+
+    def _plan(self, selectivity: float, filter_cost: float, limit: int = 10, rows: int = 100_000):
+        return QueryPlanner(oversample=2.0).plan(rows, limit, selectivity, filter_cost)
+
+    def test_indexed_filters_scan_the_matches(self):
+        """Test that cheap filters are applied first, whatever their selectivity."""
+        assert self._plan(0.9, filter_cost=1000).strategy == EXACT_SCAN
+        assert self._plan(0.001, filter_cost=1000).candidates == 100
+
+    def test_expensive_filters_are_applied_after(self):
+        """Test that filters checked row by row are only checked on candidates when they pass enough rows."""
+        broad, narrower, rare = self._plan(0.8, 200_000), self._plan(0.1, 200_000), self._plan(0.00001, 200_000)
+
+        assert (broad.strategy, broad.candidates) == (POST_FILTER, 20)
+        assert (narrower.strategy, narrower.candidates) == (RAISED_CANDIDATES, 200)
+        assert rare.strategy == EXACT_SCAN
+
+    def test_unlimited_searches_scan(self):
+        """Test that a search for every match cannot be post-filtered."""
+        assert self._plan(0.8, 200_000, limit=-1).strategy == EXACT_SCAN
+
+
+class TestPlannedSearch:
+    """Test that planned searches return what the per-product search does, and report their plan."""
+
+    @pytest.fixture
+    def baseline(self):
+        _, source, app = _scoring_app(False)
+        source.put(SCORING_ROWS)
+        return app
+
+    def _planned_app(self, indexes: bool):
+        database, source, app = _scoring_app(True, indexes=indexes, planner=QueryPlanner(oversample=2.0))
+        source.put(SCORING_ROWS)
+        return database, app
+
+    @pytest.mark.parametrize(
+        "indexes, params, strategy",
+        [
+            (True, {"brands": ["Puma"]}, EXACT_SCAN),
+            (False, {}, POST_FILTER),
+            (False, {"brands": ["Nike", "Puma"]}, POST_FILTER),
+            (False, {"brands": ["Puma"], "cost_weight": 0.0}, RAISED_CANDIDATES),
+            (False, {"max_cost": 5.0}, EXACT_SCAN),
+        ],
+    )
+    def test_same_results_as_per_product_search(self, baseline, indexes, params, strategy):
+        """Test each plan against the per-product search."""
+        _, app = self._planned_app(indexes)
+
+        with plan_scope() as plans:
+            ranking = _ranking(app, **params)
+
+        assert [plan.strategy for plan in plans] == [strategy]
+        assert ranking == _ranking(baseline, **params)
+
+    def test_too_few_candidates_fall_back(self, baseline, monkeypatch):
+        """Test that post-filtering that keeps fewer rows than the limit runs the exact scan."""
+        database, app = self._planned_app(False)
+        monkeypatch.setattr(FieldStatistics, "selectivity", lambda self, filters: 1.0)
+
+        with plan_scope() as plans:
+            ranking = _ranking(app, brands=["Puma"], cost_weight=0.0)
+
+        assert (plans[0].strategy, plans[0].fallback) == (POST_FILTER, True)
+        assert ranking == _ranking(baseline, brands=["Puma"], cost_weight=0.0)
+        assert database.connector.planner.stats()["fallbacks"] == 1
@@ -0,0 +1,58 @@
+"""
+Unit tests for import-time profiling and lazy package loading.
+"""
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+from superlinked_app.profiling import parse_importtime, summarize
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+IMPORTTIME_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       150 |        150 |   encodings.utf_8
+import time:       400 |        550 | encodings
+import time:       100 |        100 | superlinked_app
+import time:      2000 |       2000 |       torch._C
+import time:      1000 |       3000 |     torch
+import time:       500 |       3500 |   sentence_transformers
+import time:       300 |       3800 | superlinked_app.index
+"""
+
+
+class TestImportProfile:
+    """Test parsing and summarising -X importtime output."""
+
+    def test_parse_records_depth_and_seconds(self):
+        """Test that each line becomes a timing with its nesting depth."""
+        timings = parse_importtime(IMPORTTIME_OUTPUT)
+
+        assert len(timings) == 7
+        torch = next(timing for timing in timings if timing.module == "torch")
+        assert torch.depth == 2
+        assert torch.cumulative_seconds == 0.003
+
+    def test_summary_splits_own_modules_and_packages(self):
+        """Test that app modules and third-party packages are reported separately."""
+        report = summarize(parse_importtime(IMPORTTIME_OUTPUT))
+
+        assert report["total_seconds"] == pytest.approx(0.00445)
+        assert list(report["modules"]) == ["superlinked_app.index", "superlinked_app"]
+        assert report["slowest_packages"]["torch"] == 0.003
+        assert list(report["slowest_packages"])[0] == "sentence_transformers"
+
+
+class TestLazyPackage:
+    """Test that importing the package does not build the app."""
+
+    def test_import_does_not_load_app(self):
+        """Test that `import superlinked_app` leaves app, query and index unloaded."""
+        code = (
+            "import sys, superlinked_app; "
+            "loaded = [m for m in ('app', 'query', 'index') if f'superlinked_app.{m}' in sys.modules]; "
+            "assert not loaded, loaded"
+        )
+        result = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True)
+
+        assert result.returncode == 0, result.stderr
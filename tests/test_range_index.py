@@ -0,0 +1,108 @@
+"""
+Unit tests for the sorted range indexes of numeric filters.
+"""
+import numpy as np
+import pytest
+from superlinked.framework.common.interface.comparison_operand import ComparisonOperation
+from superlinked.framework.common.interface.comparison_operation_type import ComparisonOperationType
+from superlinked.framework.common.storage.field.field import Field
+from superlinked.framework.common.storage.field.field_data_type import FieldDataType
+from superlinked_app import range_index
+from superlinked_app.range_index import RangeFilterIndex
+
+COST, ORDERS = Field(FieldDataType.DOUBLE, "cost"), Field(FieldDataType.INT, "orders")
+BRAND = Field(FieldDataType.STRING, "brand")
+ROWS = [
+    {"cost": 10.0, "orders": 5},
+    {"cost": 20.0, "orders": 50},
+    {"cost": 30.0, "orders": 500},
+    {"cost": None, "orders": 5000},
+    {"cost": 20.0, "orders": 0},
+]
+LE, GE = ComparisonOperationType.LESS_EQUAL, ComparisonOperationType.GREATER_EQUAL
+LT, GT = ComparisonOperationType.LESS_THAN, ComparisonOperationType.GREATER_THAN
+
+
+def _filter(op: ComparisonOperationType, field: Field, other, group_key=None) -> ComparisonOperation:
+    return ComparisonOperation(op, field, other, group_key)
+
+
+def _index(rows=ROWS, scan_fraction: float = 1.0) -> RangeFilterIndex:
+    index = RangeFilterIndex(["cost", "orders"], scan_fraction)
+    for position, row in enumerate(rows):
+        index.update(position, row)
+    return index
+
+
+def _positions(index: RangeFilterIndex, *filters, candidates=None) -> list[int] | None:
+    positions, _ = index.select(list(filters), candidates)
+    return None if positions is None else positions.tolist()
+
+
+class TestRangeFilterIndex:
+    """Test that the index selects the rows a per-row check would."""
+
+    @pytest.mark.parametrize(
+        "op, other, expected",
+        [(LE, 20.0, [0, 1, 4]), (LT, 20, [0]), (GE, 20.0, [1, 2, 4]), (GT, 20.0, [2]), (GT, 99.0, [])],
+    )
+    def test_comparisons(self, op, other, expected):
+        """Test each comparison, on both a float and an int bound; missing costs never pass."""
+        assert _positions(_index(), _filter(op, COST, other)) == expected
+
+    def test_filters_every_row_passes_are_dropped(self):
+        """Test that default bounds like `max_cost=1000` leave the candidates as they are."""
+        index = _index([{"cost": 1.0, "orders": 1}, {"cost": 2.0, "orders": 2}])
+
+        assert _positions(index, _filter(LE, COST, 1000.0), _filter(GE, ORDERS, 0)) is None
+        assert _positions(index, _filter(LE, COST, 1000.0), candidates=np.array([1])) == [1]
+        # A missing cost fails every range filter, so the bound no longer passes every row
+        assert _positions(_index(), _filter(LE, COST, 1000.0)) == [0, 1, 2, 4]
+
+    def test_combined_with_candidates(self):
+        """Test that ranges on two fields and the categorical candidates are intersected."""
+        index = _index()
+
+        assert _positions(index, _filter(GE, COST, 20.0), _filter(LE, ORDERS, 500)) == [1, 2, 4]
+        assert _positions(index, _filter(GE, COST, 20.0), candidates=np.array([0, 2, 3])) == [2]
+
+    def test_unanswered_filters_are_returned(self):
+        """Test that filters on other fields, OR groups and non-numeric bounds are left to the caller."""
+        index = _index()
+        equal = _filter(ComparisonOperationType.EQUAL, COST, 20.0)
+        grouped = _filter(LE, COST, 20.0, group_key=1)
+        brand = _filter(LE, BRAND, "M")
+
+        positions, residual = index.select([equal, grouped, brand, _filter(LE, COST, 10.0)])
+
+        assert positions.tolist() == [0]
+        assert residual == [equal, grouped, brand]
+
+    def test_writes_after_sorting(self, monkeypatch):
+        """Test that rows written after the columns were sorted are found by their new values."""
+        monkeypatch.setattr(range_index, "RESORT_FRACTION", 1.0)
+        index = _index()
+        assert _positions(index, _filter(LE, COST, 10.0)) == [0]
+
+        index.update(0, {"cost": 40.0, "orders": 5})
+        index.update(3, {"cost": 5.0, "orders": 5000})
+        index.update(5, {"cost": 1.0, "orders": 1})
+
+        assert _positions(index, _filter(LE, COST, 10.0)) == [3, 5]
+        assert _positions(index, _filter(GT, COST, 30.0)) == [0]
+        assert index.stats()["unsorted_rows"]["cost"] == 3
+
+    def test_matches_a_per_row_check_at_scale(self):
+        """Test selective and broad filters, with and without scanning, against checking rows one by one."""
+        rng = np.random.default_rng(0)
+        rows = [
+            {"cost": float(rng.uniform(0, 100)) if rng.random() > 0.05 else None, "orders": int(rng.integers(1000))}
+            for _ in range(5000)
+        ]
+        index = _index(rows, scan_fraction=0.25)
+        filters = [_filter(LE, COST, 10.0), _filter(GE, ORDERS, 300), _filter(GT, COST, 2.5)]
+        candidates = np.arange(0, 5000, 3)
+
+        for chosen in ([filters[0]], filters, [filters[1]], [filters[1], filters[2]]):
+            expected = [p for p in candidates if all(f.evaluate(rows[p][f._operand.name]) for f in chosen)]
+            assert _positions(index, *chosen, candidates=candidates) == expected
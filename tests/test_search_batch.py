@@ -0,0 +1,113 @@
+"""
+Unit tests for running batches of natural-language searches.
+"""
+import asyncio
+import threading
+import time
+
+from superlinked_app.search_batch import run_search_batch
+
+
+class FakeBackend:
+    """Stands in for the LLM extraction and the search, recording calls and peak concurrency."""
+
+    def __init__(self):
+        self.extracted = []
+        self.searched = []
+        self.prefetched = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def _enter(self):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.01)
+        with self._lock:
+            self.active -= 1
+
+    def extract(self, payload):
+        self._enter()
+        self.extracted.append(payload["natural_query"])
+        if payload["natural_query"] == "broken":
+            raise ValueError("extraction failed")
+        return {"product_description": payload["natural_query"].split()[-1], "max_cost": 50, "cost_weight": None}
+
+    def search(self, params):
+        self._enter()
+        self.searched.append(params)
+        if params.get("limit") == 0:
+            raise ValueError("limit must be positive")
+        return {"entries": [params["product_description"]]}
+
+    def prefetch(self, texts):
+        self.prefetched.append(texts)
+
+
+def _run(backend, payloads, **kwargs):
+    return asyncio.run(
+        run_search_batch(
+            payloads, backend.extract, backend.search, backend.prefetch, ["product_description"], **kwargs
+        )
+    )
+
+
+class TestSearchBatch:
+    """Test the extract, prefetch and search stages of a batch."""
+
+    def test_results_in_input_order(self):
+        """Test that every item gets its own result, in the order sent."""
+        backend = FakeBackend()
+
+        results = _run(backend, [{"natural_query": f"cheap {word}"} for word in ["jeans", "dresses", "socks"]])
+
+        assert [result["result"]["entries"] for result in results] == [["jeans"], ["dresses"], ["socks"]]
+
+    def test_descriptions_are_prefetched_once(self):
+        """Test that distinct texts of the whole batch are embedded in one call, before searching."""
+        backend = FakeBackend()
+
+        _run(backend, [{"natural_query": "cheap jeans"}, {"natural_query": "popular jeans"}, {"natural_query": "dresses"}])
+
+        assert backend.prefetched == [["jeans", "dresses"]]
+
+    def test_searches_skip_the_llm(self):
+        """Test that searches run with extracted params instead of the natural query, and request values win."""
+        backend = FakeBackend()
+
+        _run(backend, [{"natural_query": "cheap jeans", "limit": 5, "max_cost": 20}])
+
+        assert backend.searched == [{"product_description": "jeans", "max_cost": 20, "limit": 5}]
+
+    def test_errors_are_per_item(self):
+        """Test that failing items report their error and the others still succeed."""
+        backend = FakeBackend()
+
+        results = _run(
+            backend,
+            [{"natural_query": "broken"}, "not an object", {"natural_query": "cheap jeans", "limit": 0}, {"natural_query": "socks"}],
+        )
+
+        assert results[0] == {"error": "extraction failed"}
+        assert "JSON object" in results[1]["error"]
+        assert results[2] == {"error": "limit must be positive"}
+        assert results[3] == {"result": {"entries": ["socks"]}}
+
+    def test_concurrency_is_bounded(self):
+        """Test that no more than max_concurrency extractions or searches run at once."""
+        backend = FakeBackend()
+
+        _run(backend, [{"natural_query": f"item {row}"} for row in range(12)], max_concurrency=3)
+
+        assert backend.peak <= 3
+        assert len(backend.searched) == 12
+
+    def test_payload_without_natural_query(self):
+        """Test that a plain parameter search is passed through without extraction."""
+        backend = FakeBackend()
+
+        results = _run(backend, [{"product_description": "coats", "limit": 3}])
+
+        assert backend.extracted == []
+        assert results == [{"result": {"entries": ["coats"]}}]
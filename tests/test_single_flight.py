@@ -0,0 +1,101 @@
+"""
+Unit tests for coalescing identical concurrent requests.
+"""
+import asyncio
+
+import pytest
+from superlinked_app.single_flight import SingleFlight, request_key
+
+
+class SlowSearch:
+    """Counts executions and takes a moment, so concurrent callers overlap."""
+
+    def __init__(self, fail: bool = False):
+        self.calls = 0
+        self.fail = fail
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0.02)
+        if self.fail:
+            raise ValueError("bad query")
+        return {"call": self.calls}
+
+
+class TestSingleFlight:
+    """Test sharing of in-flight computations."""
+
+    def test_concurrent_duplicates_share_one_call(self):
+        """Test that callers with the same key wait for the first one's result."""
+        flight, search = SingleFlight(), SlowSearch()
+
+        async def run():
+            return await asyncio.gather(*(flight.do("key", search) for _ in range(5)))
+
+        assert asyncio.run(run()) == [{"call": 1}] * 5
+        assert search.calls == 1
+        assert flight.stats() == {"in_flight": 0, "executed": 1, "coalesced": 4, "coalesced_rate": 0.8}
+
+    def test_different_keys_run_separately(self):
+        """Test that only identical keys are coalesced."""
+        flight, search = SingleFlight(), SlowSearch()
+
+        async def run():
+            return await asyncio.gather(flight.do("a", search), flight.do("b", search))
+
+        asyncio.run(run())
+
+        assert search.calls == 2
+
+    def test_finished_results_are_not_reused(self):
+        """Test that a request arriving after the first finished runs again."""
+        flight, search = SingleFlight(), SlowSearch()
+
+        async def run():
+            await flight.do("key", search)
+            return await flight.do("key", search)
+
+        assert asyncio.run(run()) == {"call": 2}
+
+    def test_errors_are_shared(self):
+        """Test that every waiter gets the exception of the shared call."""
+        flight, search = SingleFlight(), SlowSearch(fail=True)
+
+        async def run():
+            return await asyncio.gather(*(flight.do("key", search) for _ in range(3)), return_exceptions=True)
+
+        results = asyncio.run(run())
+
+        assert all(isinstance(result, ValueError) for result in results)
+        assert search.calls == 1
+
+    def test_cancelled_caller_does_not_cancel_others(self):
+        """Test that the first caller going away leaves the computation running for the rest."""
+        flight, search = SingleFlight(), SlowSearch()
+
+        async def run():
+            first = asyncio.ensure_future(flight.do("key", search))
+            second = asyncio.ensure_future(flight.do("key", search))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+
+        assert asyncio.run(run()) == {"call": 1}
+
+
+class TestRequestKey:
+    """Test which requests count as identical."""
+
+    def test_key_order_does_not_matter(self):
+        """Test that JSON payloads are compared by content."""
+        assert request_key("/q", {"natural_query": "jeans", "limit": 5}, False) == request_key(
+            "/q", {"limit": 5, "natural_query": "jeans"}, False
+        )
+
+    @pytest.mark.parametrize(
+        "other",
+        [("/q", {"natural_query": "jeans", "limit": 6}, False), ("/q", {"natural_query": "jeans", "limit": 5}, True)],
+    )
+    def test_any_difference_changes_the_key(self, other):
+        """Test that a different payload or option gives a different key."""
+        assert request_key("/q", {"natural_query": "jeans", "limit": 5}, False) != request_key(*other)
@@ -0,0 +1,200 @@
+"""
+Unit tests for the Arrow catalog snapshot.
+"""
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+from unittest.mock import MagicMock
+from superlinked_app import snapshot as snapshot_module
+from superlinked_app.ingestion import ingest_catalog
+from superlinked_app.snapshot import (
+    arrow_schema,
+    catalog_options,
+    column_options,
+    convert_csv,
+    is_current,
+    iter_snapshot_batches,
+    open_snapshot,
+)
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+
+
+@pytest.fixture
+def catalog_csv(tmp_path, sample_product_dataframe):
+    """Catalog CSV with an extra column and a missing brand."""
+    frame = pd.concat([sample_product_dataframe] * 3, ignore_index=True)
+    frame["product_id"] = [f"PROD{i:03d}" for i in range(len(frame))]
+    frame.loc[5, "brand"] = None
+    frame["sku"] = "NOT-IN-SCHEMA"
+    path = tmp_path / "products.csv"
+    frame.to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def snapshot(tmp_path, catalog_csv):
+    """Snapshot converted from the catalog CSV."""
+    path = str(tmp_path / "snapshot" / "products.arrow")
+    convert_csv(catalog_csv, path)
+    return path
+
+
+class TestConversion:
+    """Test converting the CSV into a snapshot."""
+
+    def test_schema_matches_product_schema(self, snapshot):
+        """Test that the snapshot carries only schema columns with schema types."""
+        table = open_snapshot(snapshot)
+
+        assert table.schema.equals(arrow_schema(), check_metadata=False)
+        assert table.schema.field("total_orders").type == pa.int64()
+        assert table.schema.field("product_id").type == pa.string()
+        assert "sku" not in table.column_names
+
+    def test_rows_match_csv(self, snapshot, catalog_csv):
+        """Test that batches read back the same values as the CSV."""
+        frame = pd.concat(iter_snapshot_batches(snapshot, max_rows=4, max_bytes=10**9), ignore_index=True)
+        expected = pd.read_csv(catalog_csv)
+
+        assert len(frame) == 6
+        assert list(frame["product_id"]) == list(expected["product_id"])
+        assert list(frame["cost"]) == list(expected["cost"])
+        assert frame["brand"].isna().sum() == 1
+
+    def test_batches_respect_row_budget(self, snapshot):
+        """Test that no batch exceeds the row budget."""
+        sizes = [len(batch) for batch in iter_snapshot_batches(snapshot, max_rows=4, max_bytes=10**9)]
+
+        assert sizes == [4, 2]
+
+    def test_foreign_schema_is_rejected(self, tmp_path):
+        """Test that a file with different columns is not accepted as a snapshot."""
+        path = str(tmp_path / "other.arrow")
+        table = pa.table({"product_id": ["a"]})
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+        with pytest.raises(ValueError, match="does not match ProductSchema"):
+            open_snapshot(path)
+
+
+class TestFreshness:
+    """Test detection of snapshots built from an older CSV."""
+
+    def test_current_snapshot(self, snapshot, catalog_csv):
+        """Test that a freshly converted snapshot is current."""
+        assert is_current(snapshot, catalog_csv)
+
+    def test_edited_csv_makes_snapshot_stale(self, snapshot, catalog_csv):
+        """Test that changing the CSV invalidates the snapshot."""
+        with open(catalog_csv, "a") as f:
+            f.write("PROD999,New,Jeans,Brand,Women,1,2,3,4,5,6,7,8,9,10,11,SKU\n")
+
+        assert not is_current(snapshot, catalog_csv)
+
+    def test_freshness_does_not_read_the_csv(self, snapshot, catalog_csv, monkeypatch):
+        """Test that an untouched or resized CSV is recognised from its size and modification time."""
+        monkeypatch.setattr(snapshot_module, "file_sha256", lambda path: pytest.fail("the CSV was hashed"))
+
+        assert is_current(snapshot, catalog_csv)
+        with open(catalog_csv, "a") as f:
+            f.write("\n")
+        assert not is_current(snapshot, catalog_csv)
+
+    def test_copied_csv_is_hashed_once(self, snapshot, catalog_csv, monkeypatch):
+        """Test that a CSV with a new modification time (a clone or a copy) is compared by content, once."""
+        hashes = []
+        file_sha256 = snapshot_module.file_sha256
+        monkeypatch.setattr(snapshot_module, "file_sha256", lambda path: hashes.append(path) or file_sha256(path))
+        stat = os.stat(catalog_csv)
+        os.utime(catalog_csv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        assert is_current(snapshot, catalog_csv) and is_current(snapshot, catalog_csv)
+        assert hashes == [catalog_csv]
+
+        with open(catalog_csv, "r+") as f:
+            f.write("x")
+        os.utime(catalog_csv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2_000_000_000))
+        assert not is_current(snapshot, catalog_csv)
+
+    def test_shipped_snapshot_is_current(self):
+        """Test that the committed snapshot matches the committed CSV, whatever their modification times."""
+        snapshot, csv = DATA_DIR / "snapshot" / "products_enriched.arrow", DATA_DIR / "csv" / "products_enriched.csv"
+
+        assert is_current(str(snapshot), str(csv))
+
+    def test_missing_snapshot(self, tmp_path, catalog_csv):
+        """Test that a snapshot that was never built is not current."""
+        assert not is_current(str(tmp_path / "missing.arrow"), catalog_csv)
+
+
+class TestConsumers:
+    """Test the readers that use the snapshot."""
+
+    def test_column_options_skip_missing(self, snapshot, catalog_csv):
+        """Test that options keep catalog order and drop missing values."""
+        assert column_options(snapshot, catalog_csv, "brand") == ["TestBrand", "PremiumBrand"]
+
+    def test_column_options_fall_back_to_csv(self, tmp_path, catalog_csv):
+        """Test that options come from the CSV when there is no snapshot."""
+        options = column_options(str(tmp_path / "missing.arrow"), catalog_csv, "brand")
+
+        assert options == ["TestBrand", "PremiumBrand"]
+
+    def test_catalog_is_precomputed(self, tmp_path, catalog_csv):
+        """Test that the converter writes the option lists next to the snapshot."""
+        snapshot = str(tmp_path / "snapshot" / "products.arrow")
+        catalog = str(tmp_path / "snapshot" / "catalog.json")
+        convert_csv(catalog_csv, snapshot, catalog_path=catalog)
+
+        assert catalog_options(catalog, snapshot, catalog_csv, "brand") == ["TestBrand", "PremiumBrand"]
+        assert catalog_options(catalog, snapshot, catalog_csv, "department") == ["Women", "Men"]
+
+    def test_catalog_does_not_read_the_csv(self, tmp_path, catalog_csv, monkeypatch):
+        """Test that reading the option lists does not hash or parse the CSV."""
+        snapshot = str(tmp_path / "snapshot" / "products.arrow")
+        catalog = str(tmp_path / "snapshot" / "catalog.json")
+        convert_csv(catalog_csv, snapshot, catalog_path=catalog)
+        monkeypatch.setattr(snapshot_module, "file_sha256", lambda path: pytest.fail("the CSV was hashed"))
+        monkeypatch.setattr(pd, "read_csv", lambda *args, **kwargs: pytest.fail("the CSV was parsed"))
+
+        assert catalog_options(catalog, snapshot, catalog_csv, "brand") == ["TestBrand", "PremiumBrand"]
+
+    def test_shipped_catalog_is_current(self, monkeypatch):
+        """Test that the committed catalog is used as is with the committed CSV."""
+        monkeypatch.setattr(pd, "read_csv", lambda *args, **kwargs: pytest.fail("the CSV was parsed"))
+        monkeypatch.setattr(snapshot_module, "column_options", lambda *args: pytest.fail("the catalog was stale"))
+        catalog = DATA_DIR / "snapshot" / "catalog.json"
+        snapshot, csv = DATA_DIR / "snapshot" / "products_enriched.arrow", DATA_DIR / "csv" / "products_enriched.csv"
+
+        brands = catalog_options(str(catalog), str(snapshot), str(csv), "brand")
+
+        assert brands == json.loads(catalog.read_text(encoding="utf-8"))["options"]["brand"]
+
+    def test_stale_catalog_is_rebuilt_from_data(self, tmp_path, catalog_csv):
+        """Test that an out-of-date catalog is ignored in favour of the data."""
+        snapshot = str(tmp_path / "snapshot" / "products.arrow")
+        catalog = str(tmp_path / "snapshot" / "catalog.json")
+        convert_csv(catalog_csv, snapshot, catalog_path=catalog)
+        frame = pd.read_csv(catalog_csv)
+        frame.loc[0, "brand"] = "NewBrand"
+        frame.to_csv(catalog_csv, index=False)
+
+        assert catalog_options(catalog, snapshot, catalog_csv, "brand")[0] == "NewBrand"
+
+    def test_ingest_catalog_reads_snapshot(self, snapshot, catalog_csv):
+        """Test that batched ingestion uses the snapshot when it is current."""
+        source = MagicMock()
+
+        report = ingest_catalog(source, catalog_csv, snapshot, max_rows=100, max_bytes=10**9)
+
+        written = source.put.call_args.args[0][0]
+        assert report.rows == 6
+        assert report.source == snapshot
+        assert written["product_id"].dtype == object
+        assert "sku" not in written.columns
@@ -0,0 +1,81 @@
+"""
+Unit tests for speculative query embeddings.
+"""
+import threading
+
+import numpy as np
+import pytest
+from superlinked_app.speculation import SpeculativeEmbeddings
+
+
+class RecordingEmbedder:
+    """Fake model that records its inputs and can be held back until released."""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, texts):
+        self.release.wait(5)
+        self.calls.extend(texts)
+        if "broken" in texts:
+            raise RuntimeError("model failed")
+        return np.array([[len(text), 1.0] for text in texts], dtype=np.float32)
+
+
+@pytest.fixture
+def embedder():
+    return RecordingEmbedder()
+
+
+class TestSpeculativeEmbeddings:
+    """Test starting, sharing and taking speculative embeddings."""
+
+    def test_take_returns_speculated_vectors(self, embedder):
+        """Test that a speculated text is served without embedding it again."""
+        speculative = SpeculativeEmbeddings("model", embedder)
+        speculative.start(["cheap dresses", "dresses"])
+
+        vectors = speculative.take(["dresses", "jeans"])
+
+        assert list(vectors) == ["dresses"]
+        np.testing.assert_array_equal(vectors["dresses"], [7.0, 1.0])
+        assert sorted(embedder.calls) == ["cheap dresses", "dresses"]
+        assert (speculative.hits, speculative.misses) == (1, 1)
+
+    def test_take_waits_for_running_work(self, embedder):
+        """Test that taking a text still being embedded waits for that result."""
+        embedder.release.clear()
+        speculative = SpeculativeEmbeddings("model", embedder)
+        speculative.start(["dresses"])
+        threading.Timer(0.05, embedder.release.set).start()
+
+        assert "dresses" in speculative.take(["dresses"])
+        assert embedder.calls == ["dresses"]
+
+    def test_texts_are_started_once(self, embedder):
+        """Test that repeated and empty texts are not embedded again."""
+        speculative = SpeculativeEmbeddings("model", embedder)
+        speculative.start(["dresses", "dresses", ""])
+        speculative.start(["dresses"])
+        speculative.take(["dresses"])
+
+        assert embedder.calls == ["dresses"]
+        assert speculative.stats()["started"] == 1
+
+    def test_failure_is_left_to_the_caller(self, embedder):
+        """Test that a failed speculation is dropped so the query embeds the text itself."""
+        speculative = SpeculativeEmbeddings("model", embedder)
+        speculative.start(["broken"])
+
+        assert speculative.take(["broken"]) == {}
+        assert speculative.take(["broken"]) == {}
+        assert speculative.misses == 1
+
+    def test_oldest_results_are_dropped(self, embedder):
+        """Test that only the last max_entries texts are kept."""
+        speculative = SpeculativeEmbeddings("model", embedder, max_entries=2)
+        speculative.start(["a", "b", "c"])
+
+        assert sorted(speculative.take(["a", "b", "c"])) == ["b", "c"]
@@ -0,0 +1,123 @@
+"""
+Unit tests for batch validation and the quarantine file.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import MagicMock
+from superlinked_app.ingestion import ingest_csv
+from superlinked_app.schema import product_schema
+from superlinked_app.validation import Quarantine, ValidatingDataFrameParser, validate_frame
+
+
+@pytest.fixture
+def raw_frame(sample_product_dataframe):
+    """Batch as read from a CSV with bad values, so numeric columns come back as strings."""
+    frame = pd.concat([sample_product_dataframe] * 3, ignore_index=True).astype(str)
+    frame["product_id"] = [f"PROD{i:03d}" for i in range(len(frame))]
+    return frame
+
+
+class TestValidateFrame:
+    """Test the column-wise checks against ProductSchema."""
+
+    def test_clean_rows_are_typed(self, raw_frame):
+        """Test that valid rows pass with schema dtypes even when read as strings."""
+        result = validate_frame(raw_frame)
+
+        assert len(result.frame) == 6
+        assert result.rejected.empty
+        assert result.frame["cost"].dtype == np.float64
+        assert result.frame["total_orders"].dtype == np.int64
+
+    def test_bad_numbers_are_rejected(self, raw_frame):
+        """Test that non-numeric, empty and fractional integer values reject their rows only."""
+        raw_frame.loc[0, "cost"] = "n/a"
+        raw_frame.loc[1, "total_orders"] = ""
+        raw_frame.loc[2, "total_items_sold"] = "3.5"
+
+        result = validate_frame(raw_frame)
+
+        assert list(result.frame["product_id"]) == ["PROD003", "PROD004", "PROD005"]
+        assert list(result.rejected["reason"]) == [
+            "cost: not a number",
+            "total_orders: missing",
+            "total_items_sold: not an integer",
+        ]
+        assert result.rejected.loc[0, "cost"] == "n/a"
+
+    def test_all_reasons_are_listed(self, raw_frame):
+        """Test that a row failing several checks lists every reason."""
+        raw_frame.loc[0, ["name", "retail_price"]] = [None, "abc"]
+
+        result = validate_frame(raw_frame)
+
+        assert result.rejected["reason"].iloc[0] == "name: missing; retail_price: not a number"
+
+    def test_ids(self, raw_frame):
+        """Test that missing ids are rejected and only the last row of a duplicated id is kept."""
+        raw_frame.loc[0, "product_id"] = None
+        raw_frame.loc[2, "product_id"] = "PROD005"
+
+        result = validate_frame(raw_frame)
+
+        assert list(result.frame["product_id"]) == ["PROD001", "PROD003", "PROD004", "PROD005"]
+        assert result.frame.loc[5, "product_id"] == "PROD005"
+        assert len(result.rejected) == 2
+
+    def test_optional_text_may_be_empty(self, raw_frame):
+        """Test that an empty brand is kept as a missing value."""
+        raw_frame.loc[0, "brand"] = None
+
+        result = validate_frame(raw_frame)
+
+        assert len(result.frame) == 6
+        assert result.frame.loc[0, "brand"] is None
+
+
+class TestQuarantine:
+    """Test where rejected rows end up."""
+
+    def test_rows_are_appended_with_reasons(self, tmp_path, raw_frame):
+        """Test that quarantined rows from several batches share one file and header."""
+        quarantine = Quarantine(str(tmp_path / "quarantine" / "products.csv"))
+        raw_frame.loc[0, "cost"] = "n/a"
+
+        quarantine.write(validate_frame(raw_frame).rejected)
+        quarantine.write(validate_frame(raw_frame).rejected)
+
+        written = pd.read_csv(quarantine.path)
+        assert quarantine.rows == 2
+        assert list(written["reason"]) == ["cost: not a number"] * 2
+        assert list(written["product_id"]) == ["PROD000"] * 2
+
+    def test_batched_csv_load_skips_bad_rows(self, tmp_path, raw_frame):
+        """Test that a bad row no longer fails its batch during batched loading."""
+        raw_frame.loc[1, "cost"] = "n/a"
+        path = tmp_path / "products.csv"
+        raw_frame.to_csv(path, index=False)
+        source = MagicMock()
+        quarantine = Quarantine(str(tmp_path / "quarantine.csv"))
+
+        report = ingest_csv(source, str(path), max_rows=100, max_bytes=10**9, quarantine=quarantine)
+
+        written = source.put.call_args.args[0][0]
+        assert report.quarantined == 1
+        assert len(written) == 5
+        assert written["cost"].dtype == np.float64
+        assert quarantine.rows == 1
+
+    def test_data_loader_parser(self, tmp_path, raw_frame):
+        """Test that the loader parser converts only the valid rows."""
+        raw_frame.loc[0, "total_orders"] = "many"
+        quarantine = Quarantine(str(tmp_path / "quarantine.csv"))
+        parser = ValidatingDataFrameParser(
+            schema=product_schema,
+            mapping={product_schema.product_id: "product_id"},
+            quarantine=quarantine,
+        )
+
+        parsed = parser.unmarshal(raw_frame)
+
+        assert [schema.id_ for schema in parsed] == [f"PROD{i:03d}" for i in range(1, 6)]
+        assert quarantine.rows == 1
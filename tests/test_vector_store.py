@@ -0,0 +1,280 @@
+"""
+Unit tests for the in-memory vector store snapshot.
+"""
+import os
+import numpy as np
+import pytest
+from superlinked import framework as sl
+from superlinked.framework.common.data_types import Vector
+from superlinked_app.scoring import VectorMatrix
+from superlinked_app.vector_store import ProcurementInMemoryVectorDatabase
+
+
+class SnapshotSchema(sl.Schema):
+    """Small schema with number spaces only, so no model has to be loaded."""
+
+    id: sl.IdField
+    name: sl.String
+    cost: sl.Float
+
+
+snapshot_schema = SnapshotSchema()
+
+ROWS = [
+    {"id": "PROD001", "name": "Classic Blue Jeans", "cost": 25.0},
+    {"id": "PROD002", "name": "Premium Cotton T-Shirt", "cost": 12.5},
+]
+
+
+def _index(max_cost: float = 100.0) -> sl.Index:
+    cost_space = sl.NumberSpace(snapshot_schema.cost, min_value=0, max_value=max_cost, mode=sl.Mode.MINIMUM)
+    return sl.Index([cost_space], fields=[snapshot_schema.cost, snapshot_schema.name])
+
+
+def _run(database: ProcurementInMemoryVectorDatabase, index: sl.Index):
+    source = sl.InteractiveSource(snapshot_schema)
+    app = sl.InteractiveExecutor(sources=[source], indices=[index], vector_database=database).run()
+    return source, app
+
+
+def _results(app, index: sl.Index) -> list:
+    query = sl.Query(index).find(snapshot_schema).select_all().limit(10)
+    return [(entry.id, entry.fields, entry.metadata.score) for entry in app.query(query).entries]
+
+
+@pytest.fixture
+def populated(tmp_path):
+    """Database with the sample rows, its index, app and snapshot directory."""
+    snapshot_dir = str(tmp_path / "vector_snapshot")
+    index = _index()
+    database = ProcurementInMemoryVectorDatabase(snapshot_dir)
+    source, app = _run(database, index)
+    source.put(ROWS)
+    return database, index, app, snapshot_dir
+
+
+class TestVectorSnapshot:
+    """Test exporting and reloading the in-memory store."""
+
+    def test_round_trip_gives_same_results(self, populated):
+        """Test that a fresh store loaded from the snapshot answers queries identically."""
+        database, index, app, snapshot_dir = populated
+        assert database.connector.export_snapshot(snapshot_dir) == 2
+
+        restored = ProcurementInMemoryVectorDatabase(snapshot_dir)
+        _, restored_app = _run(restored, index)
+
+        assert restored.connector.load_snapshot(snapshot_dir)
+        assert _results(restored_app, index) == _results(app, index)
+
+    def test_vectors_are_memory_mapped(self, populated):
+        """Test that restored vectors are views onto the snapshot files."""
+        database, index, _, snapshot_dir = populated
+        database.connector.export_snapshot(snapshot_dir)
+
+        restored = ProcurementInMemoryVectorDatabase(snapshot_dir)
+        _run(restored, index)
+        restored.connector.load_snapshot(snapshot_dir)
+
+        row = restored.connector._vdb[f"{snapshot_schema._schema_name}:PROD001"]
+        vectors = [value.value for value in row.values() if isinstance(value, Vector)]
+        assert vectors
+        assert all(isinstance(vector, np.memmap) for vector in vectors)
+
+    def test_stale_snapshot_is_rejected(self, populated):
+        """Test that a snapshot taken with different space settings is not loaded."""
+        database, _, _, snapshot_dir = populated
+        database.connector.export_snapshot(snapshot_dir)
+
+        changed = ProcurementInMemoryVectorDatabase(snapshot_dir)
+        _run(changed, _index(max_cost=500.0))
+
+        assert not changed.connector.load_snapshot(snapshot_dir)
+        assert not changed.connector._vdb
+
+    def test_persist_keeps_snapshot_when_empty(self, populated):
+        """Test that shutting down with an empty store does not overwrite the snapshot."""
+        database, _, _, snapshot_dir = populated
+        database.connector.export_snapshot(snapshot_dir)
+        manifest = os.path.join(snapshot_dir, "manifest.json")
+        before = os.path.getmtime(manifest)
+
+        empty = ProcurementInMemoryVectorDatabase(snapshot_dir)
+        _run(empty, _index(max_cost=500.0))
+        empty.connector.persist(serializer=None)
+
+        assert os.path.getmtime(manifest) == before
+
+    def test_missing_snapshot_starts_empty(self, tmp_path):
+        """Test that restoring without a snapshot is a no-op."""
+        database = ProcurementInMemoryVectorDatabase(str(tmp_path / "missing"))
+        _run(database, _index())
+
+        database.connector.restore(serializer=None)
+
+        assert not database.connector._vdb
+
+
+class ScoringSchema(sl.Schema):
+    """Products with two number spaces and a brand filter, so no model has to be loaded."""
+
+    id: sl.IdField
+    brand: sl.String
+    cost: sl.Float
+    orders: sl.Integer
+
+
+scoring_schema = ScoringSchema()
+scoring_cost_space = sl.NumberSpace(scoring_schema.cost, min_value=0, max_value=100, mode=sl.Mode.MINIMUM)
+scoring_orders_space = sl.NumberSpace(scoring_schema.orders, min_value=0, max_value=1000, mode=sl.Mode.MAXIMUM)
+scoring_index = sl.Index(
+    [scoring_cost_space, scoring_orders_space],
+    fields=[scoring_schema.brand, scoring_schema.cost, scoring_schema.orders],
+)
+scoring_query = (
+    sl.Query(
+        scoring_index,
+        weights={scoring_cost_space: sl.Param("cost_weight"), scoring_orders_space: sl.Param("orders_weight")},
+    )
+    .find(scoring_schema)
+    .filter(scoring_schema.cost <= sl.Param("max_cost"))
+    .filter(scoring_schema.brand.in_(sl.Param("brands")))
+    .select_all()
+    .limit(sl.Param("limit"))
+)
+SCORING_ROWS = [
+    {"id": f"P{number:03d}", "brand": ["Nike", "Puma", "Levi's"][number % 3], "cost": float(number % 97), "orders": number * 7 % 1000}
+    for number in range(300)
+]
+
+
+def _scoring_app(vectorized: bool, snapshot_dir: str | None = None, indexes: bool = True, planner=None, ann=None):
+    database = ProcurementInMemoryVectorDatabase(
+        snapshot_dir,
+        vectorized_scoring=vectorized,
+        filter_index=indexes,
+        range_index=indexes,
+        planner=planner,
+        ann=ann,
+    )
+    source = sl.InteractiveSource(scoring_schema)
+    app = sl.InteractiveExecutor(sources=[source], indices=[scoring_index], vector_database=database).run()
+    return database, source, app
+
+
+def _ranking(app, **params):
+    params = {"cost_weight": 1.0, "orders_weight": 1.0, "max_cost": 1000.0, "brands": None, "limit": 10, **params}
+    return [(entry.id, round(entry.metadata.score, 5)) for entry in app.query(scoring_query, **params).entries]
+
+
+class TestVectorizedScoring:
+    """Test that matrix scoring ranks products like Superlinked's per-product search."""
+
+    @pytest.fixture(params=[True, False], ids=["filter_indexes", "row_filters"])
+    def apps(self, request):
+        apps = []
+        for vectorized in (True, False):
+            _, source, app = _scoring_app(vectorized, indexes=request.param)
+            source.put(SCORING_ROWS)
+            apps.append(app)
+        return apps
+
+    @pytest.mark.parametrize(
+        "params",
+        [
+            {},
+            {"cost_weight": 2.0, "orders_weight": 0.5, "limit": 25},
+            {"cost_weight": 0.0, "max_cost": 20.0},
+            {"orders_weight": -1.0, "brands": ["Puma", "Levi's"], "limit": 300},
+            {"brands": ["Nike"], "max_cost": 30.0, "cost_weight": 0.5, "limit": 20},
+            {"brands": ["Adidas"]},
+            {"max_cost": 5.0, "orders_weight": 0.5, "limit": 300},
+            {"max_cost": -1.0},
+        ],
+    )
+    def test_same_results_as_per_product_search(self, apps, params):
+        """Test that both engines return the same products, scores and order."""
+        vectorized, baseline = apps
+
+        assert _ranking(vectorized, **params) == _ranking(baseline, **params)
+
+    def test_rewritten_product_is_updated(self, apps):
+        """Test that writing a product again replaces its vector instead of adding a row."""
+        vectorized, _ = apps
+        cheapest = _ranking(vectorized, orders_weight=0.0, limit=1)[0][0]
+        assert cheapest == "P000"
+
+        _, source, app = _scoring_app(True)
+        source.put(SCORING_ROWS)
+        source.put([{"id": "P000", "brand": "Nike", "cost": 99.0, "orders": 0}])
+
+        assert _ranking(app, orders_weight=0.0, limit=1)[0][0] != "P000"
+        assert len(app._vector_database._vdb_connector._matrices) == 1
+        assert len(next(iter(app._vector_database._vdb_connector._matrices.values()))) == len(SCORING_ROWS)
+
+    def test_changed_brand_moves_the_product(self, apps):
+        """Test that a product written again with another brand is only found under the new one."""
+        _, baseline = apps
+        _, source, app = _scoring_app(True)
+        source.put(SCORING_ROWS)
+        source.put([{"id": "P000", "brand": "Adidas", "cost": 0.0, "orders": 0}])
+
+        assert [product for product, _ in _ranking(app, brands=["Adidas"])] == ["P000"]
+        assert "P000" not in [product for product, _ in _ranking(app, brands=["Nike"], limit=300)]
+        assert _ranking(app, brands=["Puma"]) == _ranking(baseline, brands=["Puma"])
+
+    def test_changed_cost_moves_the_product(self, apps):
+        """Test that a product written again with another cost is filtered by the new one."""
+        _, source, app = _scoring_app(True)
+        source.put(SCORING_ROWS)
+        assert "P096" not in [product for product, _ in _ranking(app, max_cost=5.0, limit=300)]
+
+        source.put(
+            [
+                {"id": "P096", "brand": "Nike", "cost": 1.0, "orders": 672},
+                {"id": "P000", "brand": "Nike", "cost": 50.0, "orders": 0},
+            ]
+        )
+        products = [product for product, _ in _ranking(app, max_cost=5.0, limit=300)]
+
+        assert "P096" in products and "P000" not in products
+
+    def test_snapshot_fills_the_matrix(self, apps, tmp_path):
+        """Test that a store loaded from a snapshot scores from its matrix."""
+        snapshot_dir = str(tmp_path / "vector_snapshot")
+        database, source, _ = _scoring_app(True, snapshot_dir)
+        source.put(SCORING_ROWS)
+        database.connector.export_snapshot(snapshot_dir)
+
+        restored, _, restored_app = _scoring_app(True, snapshot_dir)
+        restored.connector.load_snapshot(snapshot_dir)
+
+        assert sum(len(matrix) for matrix in restored.connector._matrices.values()) == len(SCORING_ROWS)
+        assert _ranking(restored_app, limit=20) == _ranking(apps[1], limit=20)
+        assert _ranking(restored_app, brands=["Puma"]) == _ranking(apps[1], brands=["Puma"])
+
+
+class TestVectorMatrix:
+    """Test the scoring matrix on its own."""
+
+    def test_top_k(self):
+        """Test best-first order, ties in row order, candidates and a minimum score."""
+        matrix = VectorMatrix(2)
+        matrix.upsert(["a", "b", "c", "d"], np.array([[1, 0], [0, 1], [1, 1], [1, 0]], dtype=np.float32))
+        query = np.array([1.0, 0.5])
+
+        assert matrix.top_k(query, 2) == [("c", 1.5), ("a", 1.0)]
+        assert matrix.top_k(query, -1) == [("c", 1.5), ("a", 1.0), ("d", 1.0), ("b", 0.5)]
+        assert matrix.top_k(query, 5, candidates=np.array([1, 3])) == [("d", 1.0), ("b", 0.5)]
+        assert matrix.top_k(query, 5, min_score=1.0) == [("c", 1.5), ("a", 1.0), ("d", 1.0)]
+
+    def test_growth_keeps_rows(self):
+        """Test that rows survive the matrix growing, and upserts update in place."""
+        matrix = VectorMatrix(3)
+        for start in range(0, 3000, 500):
+            row_ids = [f"r{number}" for number in range(start, start + 500)]
+            matrix.upsert(row_ids, np.full((500, 3), start, dtype=np.float32))
+        matrix.upsert(["r0"], np.full((1, 3), 10_000, dtype=np.float32))
+
+        assert len(matrix) == 3000
+        assert matrix.top_k(np.ones(3), 2) == [("r0", 30_000.0), ("r2500", 7500.0)]
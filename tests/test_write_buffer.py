@@ -0,0 +1,96 @@
+"""
+Unit tests for the single-row write buffer.
+"""
+import asyncio
+
+import pytest
+from superlinked_app.write_buffer import WriteBuffer
+
+
+class RecordingSource:
+    """Stands in for RestSource.put, failing on rows marked bad."""
+
+    def __init__(self):
+        self.calls = []
+
+    def put(self, rows):
+        if any(row.get("bad") for row in rows):
+            raise ValueError("missing id")
+        self.calls.append([row["id"] for row in rows])
+
+
+def _submit_all(buffer, rows):
+    async def run():
+        return await asyncio.gather(*(buffer.submit(row) for row in rows), return_exceptions=True)
+
+    return asyncio.run(run())
+
+
+class TestWriteBuffer:
+    """Test coalescing of concurrent single-row writes."""
+
+    def test_concurrent_rows_share_one_write(self):
+        """Test that rows submitted together are written in one put call, in order."""
+        source = RecordingSource()
+        buffer = WriteBuffer(source.put, max_rows=64, max_wait_seconds=0.01)
+
+        results = _submit_all(buffer, [{"id": i} for i in range(10)])
+
+        assert results == [None] * 10
+        assert source.calls == [list(range(10))]
+
+    def test_batches_are_capped(self):
+        """Test that a full buffer is written without waiting and never exceeds max_rows."""
+        source = RecordingSource()
+        buffer = WriteBuffer(source.put, max_rows=4, max_wait_seconds=0.05)
+
+        _submit_all(buffer, [{"id": i} for i in range(10)])
+
+        assert source.calls[:2] == [[0, 1, 2, 3], [4, 5, 6, 7]]
+        assert [row for call in source.calls for row in call] == list(range(10))
+
+    def test_lone_row_is_written_after_max_wait(self):
+        """Test that a single row does not wait for the buffer to fill."""
+        source = RecordingSource()
+        buffer = WriteBuffer(source.put, max_rows=64, max_wait_seconds=0.01)
+
+        _submit_all(buffer, [{"id": 1}])
+
+        assert source.calls == [[1]]
+
+    def test_bad_row_only_fails_its_own_request(self):
+        """Test that a failing batch is retried row by row so other callers still succeed."""
+        source = RecordingSource()
+        buffer = WriteBuffer(source.put, max_rows=64, max_wait_seconds=0.01)
+
+        results = _submit_all(buffer, [{"id": 1}, {"id": 2, "bad": True}, {"id": 3}])
+
+        assert results[0] is None and results[2] is None
+        assert isinstance(results[1], ValueError)
+        assert source.calls == [[1], [3]]
+
+    def test_close_flushes_pending_rows(self):
+        """Test that closing writes rows that are still waiting for the timer."""
+        source = RecordingSource()
+        buffer = WriteBuffer(source.put, max_rows=64, max_wait_seconds=60)
+
+        async def run():
+            pending = asyncio.create_task(buffer.submit({"id": 1}))
+            await asyncio.sleep(0)
+            await buffer.close()
+            assert pending.done()
+            await buffer.submit({"id": 2})
+
+        asyncio.run(run())
+
+        assert source.calls == [[1], [2]]
+
+    @pytest.mark.parametrize("max_rows", [0, 1])
+    def test_buffering_can_be_disabled(self, max_rows):
+        """Test that max_rows of 1 or less writes every row on its own."""
+        source = RecordingSource()
+        buffer = WriteBuffer(source.put, max_rows=max_rows, max_wait_seconds=60)
+
+        _submit_all(buffer, [{"id": 1}, {"id": 2}])
+
+        assert source.calls == [[1], [2]]